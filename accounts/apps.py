@@ -3,3 +3,10 @@ from django.apps import AppConfig
 
 class AccountsConfig(AppConfig):
     name = 'accounts'
+
+    def ready(self):
+        # Register user cache and blacklist filter signal handlers
+        from . import signals  # noqa: F401
+
+        # The optional token cleanup thread is started by the WSGI/ASGI entry
+        # points, so management commands never run it
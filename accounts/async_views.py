@@ -0,0 +1,35 @@
+"""
+Async entry points for the account creation endpoints.
+
+DRF views are synchronous. Under ASGI, Django runs every sync view on one
+shared thread, so a request that waits for a password hash would hold up
+all the others. async_view() serves a DRF view from an async view that
+runs it on a separate worker thread instead, with password hashes sent to
+the bounded pool in accounts.hashing.
+"""
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from .hashing import pooled_hashing
+
+
+def _call_view(view, request, *args, **kwargs):
+    try:
+        with pooled_hashing():
+            return view(request, *args, **kwargs)
+    finally:
+        # Worker threads do not get the request_finished cleanup
+        close_old_connections()
+
+
+def async_view(view_class, **initkwargs):
+    """Wrap a DRF APIView so it does not occupy the shared sync thread under ASGI"""
+    view = view_class.as_view(**initkwargs)
+    run_view = sync_to_async(_call_view, thread_sensitive=False)
+
+    async def wrapper(request, *args, **kwargs):
+        return await run_view(view, request, *args, **kwargs)
+
+    # DRF views handle CSRF themselves
+    wrapper.csrf_exempt = True
+    wrapper.view_class = view_class
+    return wrapper
@@ -1,11 +1,15 @@
 from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from rest_framework import exceptions
+from .tokens import UserRefreshToken, add_user_claims
+from . import user_cache
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Request bodies that may carry a refresh_token field
+BODY_CONTENT_TYPES = ('application/json', 'application/x-www-form-urlencoded', 'multipart/form-data')
+
 
 class AutoRefreshJWTAuthentication(JWTAuthentication):
     """
@@ -38,103 +42,84 @@ class AutoRefreshJWTAuthentication(JWTAuthentication):
             # Other authentication errors
             raise
     
+    def get_user(self, validated_token):
+        """
+        Resolve the token's user from the per-process user cache.
+        Tokens carrying the 'ver' claim are rejected once the user's
+        token_version has moved on (role or status changed).
+        """
+        user_id = validated_token.get('user_id')
+        if user_id is None:
+            raise InvalidToken('Token contained no recognizable user identification')
+        
+        # Deactivated at issue time, no need to look the user up
+        if validated_token.get('active') is False:
+            raise exceptions.AuthenticationFailed('User is inactive', code='user_inactive')
+        
+        version = validated_token.get('ver')
+        user = user_cache.get_user(user_id, token_version=version)
+        if user is None:
+            raise exceptions.AuthenticationFailed('User not found', code='user_not_found')
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed('User is inactive', code='user_inactive')
+        
+        if version is not None and version != user.token_version:
+            raise InvalidToken('Token has been revoked')
+        
+        return user
+    
     def _try_auto_refresh(self, request, original_error):
         """
         Try to automatically refresh the token if refresh token is available.
         """
-        # Check for refresh token in custom header, request data, or cookies
-        refresh_token = (
-            request.META.get('HTTP_X_REFRESH_TOKEN') or  # Custom header: X-Refresh-Token
-            request.data.get('refresh_token') or  # Request body
-            request.GET.get('refresh_token') or  # Query param (less secure, but available)
-            request.COOKIES.get('refresh_token')  # Cookie (for browser navigation)
-        )
+        refresh_token = self._get_refresh_token(request)
         
         if not refresh_token:
             # No refresh token available, raise original error
             raise original_error
         
         try:
-            # For auto-refresh, we don't want to rotate tokens (which would blacklist the old one)
-            # Instead, we'll manually refresh without rotation
-            # This allows the refresh token to be reused until it expires
-            refresh = RefreshToken(refresh_token)
+            # Decoding verifies the signature, expiry and blacklist once; the
+            # claims are reused below instead of decoding the token again.
+            # Auto-refresh does not rotate the refresh token, so it can be
+            # reused until it expires.
+            refresh = UserRefreshToken(refresh_token)
             
-            # Check if token is blacklisted
-            try:
-                refresh.check_blacklist()
-            except Exception:
-                # Token is blacklisted, can't use it
-                raise InvalidToken('Token is blacklisted')
+            # Same checks as an access token: active claim, cached user, version
+            user = self.get_user(refresh)
             
-            new_access_token = refresh.access_token
+            new_access_token = add_user_claims(refresh.access_token, user)
             
-            # Get user from the refresh token
-            from rest_framework_simplejwt.state import token_backend
-            validated_token = token_backend.decode(refresh_token, verify=True)
-            user_id = validated_token.get('user_id')
+            # Store new access token in request for response headers
+            request._new_access_token = str(new_access_token)
+            request._new_refresh_token = None  # No rotation on auto-refresh
             
-            if user_id:
-                from django.contrib.auth import get_user_model
-                User = get_user_model()
-                try:
-                    user = User.objects.get(id=user_id)
-                    
-                    # Store new access token in request for response headers
-                    # Don't rotate refresh token on auto-refresh - keep using the same one
-                    request._new_access_token = str(new_access_token)
-                    request._new_refresh_token = None  # No rotation on auto-refresh
-                    
-                    # Return authenticated user
-                    return (user, None)  # Return tuple (user, token)
-                except User.DoesNotExist:
-                    raise InvalidToken('User not found')
-            else:
-                raise InvalidToken('Invalid token payload')
-            
-            if serializer.is_valid():
-                # Serializer handles token rotation and blacklisting automatically
-                validated_data = serializer.validated_data
-                new_access_token = validated_data.get('access')
-                new_refresh_token = validated_data.get('refresh')  # Will be None if rotation disabled
-                
-                # Decode the new access token to get user_id
-                from rest_framework_simplejwt.state import token_backend
-                try:
-                    # Decode the new access token to get user info
-                    validated_token = token_backend.decode(new_access_token, verify=True)
-                    user_id = validated_token.get('user_id')
-                    
-                    if user_id:
-                        from django.contrib.auth import get_user_model
-                        User = get_user_model()
-                        try:
-                            user = User.objects.get(id=user_id)
-                            
-                            # Store new tokens in request for response headers
-                            request._new_access_token = new_access_token
-                            # For auto-refresh, don't rotate refresh token to avoid blacklisting issues
-                            # Only rotate on explicit refresh endpoint calls
-                            request._new_refresh_token = None  # Don't rotate on auto-refresh
-                            
-                            # Return authenticated user
-                            return (user, None)  # Return tuple (user, token)
-                        except User.DoesNotExist:
-                            raise InvalidToken('User not found')
-                    else:
-                        raise InvalidToken('Invalid token payload')
-                except Exception as decode_error:
-                    logger.error(f'Failed to decode new access token: {str(decode_error)}', exc_info=True)
-                    raise InvalidToken('Failed to decode tokens')
-            else:
-                # Serializer validation failed
-                raise InvalidToken('Invalid refresh token')
+            return (user, new_access_token)
                 
-        except TokenError as e:
-            # Refresh token is also invalid/expired
+        except (TokenError, InvalidToken, exceptions.AuthenticationFailed) as e:
+            # Refresh token is also invalid, expired, blacklisted or revoked
             logger.warning(f'Auto-refresh failed: {str(e)}')
             raise original_error
         except Exception as e:
             # Other errors during refresh
             logger.error(f'Auto-refresh error: {str(e)}', exc_info=True)
             raise original_error
+    
+    def _get_refresh_token(self, request):
+        """
+        Find a refresh token in the custom header, request body, query string
+        or cookies. The body is only parsed for requests that carry a form or
+        JSON body, so GET requests never pay for it.
+        """
+        refresh_token = request.META.get('HTTP_X_REFRESH_TOKEN')  # Custom header: X-Refresh-Token
+        
+        if not refresh_token and request.method in ('POST', 'PUT', 'PATCH') and request.content_type.startswith(BODY_CONTENT_TYPES):
+            data = request.data
+            if hasattr(data, 'get'):
+                refresh_token = data.get('refresh_token')  # Request body
+        
+        return (
+            refresh_token or
+            request.GET.get('refresh_token') or  # Query param (less secure, but available)
+            request.COOKIES.get('refresh_token')  # Cookie (for browser navigation)
+        )
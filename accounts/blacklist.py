@@ -0,0 +1,137 @@
+"""
+Per-process filter over blacklisted refresh token JTIs.
+
+Checking a refresh token against token_blacklist costs a query every time
+an expired access token is auto-refreshed. BlacklistFilter keeps a Bloom
+filter of blacklisted JTIs so most checks are answered in memory: a
+negative answer is definite, and only a possible hit is confirmed against
+the database.
+
+The filter is loaded from the database on first use, picks up rows that
+other processes blacklisted every TOKEN_BLACKLIST_FILTER_REFRESH seconds,
+and adds tokens blacklisted by this process immediately (see signals).
+It is rebuilt when it fills up so the false positive rate stays bounded.
+
+Each sync re-reads rows blacklisted since the previous sync minus
+TOKEN_BLACKLIST_FILTER_OVERLAP seconds. An id watermark would skip a row
+whose transaction committed after a row with a higher id had been read;
+the overlap picks such rows up as long as they commit within the window.
+"""
+import hashlib
+import logging
+import math
+import threading
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings"""
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.capacity = max(1, capacity)
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value):
+        # Double hashing: position i is h1 + i * h2
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'big')
+        h2 = int.from_bytes(digest[8:], 'big') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class BlacklistFilter:
+    """Bloom filter of blacklisted JTIs, kept in sync with token_blacklist"""
+
+    def __init__(self, capacity=100000, error_rate=0.001, refresh_interval=5, overlap=60):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.refresh_interval = refresh_interval
+        self.overlap = overlap
+        self._filter = None
+        self._synced_at = None
+        self._loaded_at = 0
+        self._lock = threading.Lock()
+
+    def might_contain(self, jti):
+        """False means the token is definitely not blacklisted"""
+        try:
+            self._sync()
+        except Exception as e:
+            # Without a usable filter every token has to be checked in the DB
+            logger.warning(f'Blacklist filter unavailable: {str(e)}')
+            return True
+        return jti in self._filter
+
+    def add(self, jti):
+        """Record a token blacklisted by this process"""
+        with self._lock:
+            if self._filter is not None:
+                self._filter.add(jti)
+
+    def reset(self):
+        with self._lock:
+            self._filter = None
+            self._synced_at = None
+
+    def _sync(self):
+        """Load the filter on first use and pull in rows blacklisted elsewhere"""
+        now = time.monotonic()
+        if self._filter is not None and now - self._loaded_at < self.refresh_interval:
+            return
+        with self._lock:
+            if self._filter is not None and now - self._loaded_at < self.refresh_interval:
+                return
+            if self._filter is None or self._filter.count >= self._filter.capacity:
+                self._rebuild()
+            else:
+                self._load_since(self._filter, self._synced_at)
+            self._loaded_at = now
+
+    def _rebuild(self):
+        """Build a fresh filter from the unexpired blacklisted tokens"""
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+        started = timezone.now()
+        jtis = BlacklistedToken.objects.filter(token__expires_at__gt=started).values_list('token__jti', flat=True)
+        bloom = BloomFilter(max(self.capacity, jtis.count() * 2), self.error_rate)
+        for jti in jtis.iterator(chunk_size=2000):
+            bloom.add(jti)
+        self._filter = bloom
+        self._synced_at = started
+
+    def _load_since(self, bloom, synced_at):
+        """Add rows blacklisted since the last sync, re-reading the overlap window"""
+        from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+        started = timezone.now()
+        jtis = BlacklistedToken.objects.filter(
+            blacklisted_at__gte=synced_at - timedelta(seconds=self.overlap)
+        ).values_list('token__jti', flat=True)
+        for jti in jtis.iterator(chunk_size=2000):
+            # Rows in the overlap were usually seen last time; don't count them twice
+            if jti not in bloom:
+                bloom.add(jti)
+        self._synced_at = started
+
+
+blacklist_filter = BlacklistFilter(
+    capacity=getattr(settings, 'TOKEN_BLACKLIST_FILTER_CAPACITY', 100000),
+    refresh_interval=getattr(settings, 'TOKEN_BLACKLIST_FILTER_REFRESH', 5),
+    overlap=getattr(settings, 'TOKEN_BLACKLIST_FILTER_OVERLAP', 60)
+)
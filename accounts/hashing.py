@@ -0,0 +1,145 @@
+"""
+Bounded worker pool for password hashing.
+
+Hashing a password is deliberately slow CPU work. Sync views hash inline on
+their own request thread; handing the hash to a pool and blocking on it
+would only add a queue. The async account creation routes
+(accounts.async_views) run their view inside pooled_hashing(), which sends
+the hash to a small thread pool so a burst of sign-ups cannot occupy every
+worker thread. PASSWORD_HASH_WORKERS caps how many hashes run at once and
+PASSWORD_HASH_MAX_PENDING caps how many may wait; callers beyond that get
+HashingBusyError instead of queueing indefinitely.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class HashingBusyError(APIException):
+    """Raised when too many passwords are already waiting to be hashed"""
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_code = 'SERVICE_BUSY'
+
+    def __init__(self):
+        super().__init__()
+        # Plain dict so status_code stays an integer in the response body
+        self.detail = {
+            'error_code': 'SERVICE_BUSY',
+            'message': 'Too many accounts are being created right now. Please try again shortly.',
+            'status_code': 503
+        }
+
+
+class HashingPool:
+    """Thread pool with an admission limit and queue-time counters"""
+
+    def __init__(self, workers=2, max_pending=32, wait_timeout=5):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.wait_timeout = wait_timeout
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        self._lock = threading.Lock()
+        self._stats = {
+            'submitted': 0, 'completed': 0, 'rejected': 0, 'in_flight': 0,
+            'queue_time_total': 0.0, 'queue_time_max': 0.0, 'hash_time_total': 0.0,
+        }
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hash')
+            return self._executor
+
+    def submit(self, raw_password):
+        """Queue a hash and return its Future; raises HashingBusyError when full"""
+        if not self._slots.acquire(timeout=self.wait_timeout):
+            self._count('rejected')
+            raise HashingBusyError()
+        self._count('in_flight')
+        queued_at = time.monotonic()
+        try:
+            future = self._get_executor().submit(self._hash, raw_password, queued_at)
+        except Exception:
+            # The executor refused the job: free the slot, nothing was hashed
+            self._release('rejected')
+            raise
+        self._count('submitted')
+        return future
+
+    def _hash(self, raw_password, queued_at):
+        started = time.monotonic()
+        try:
+            password_hash = make_password(raw_password)
+        except Exception:
+            self._release()
+            raise
+        self._release('completed', started - queued_at, time.monotonic() - started)
+        return password_hash
+
+    def _release(self, outcome=None, queue_time=0.0, hash_time=0.0):
+        """Give back a slot; timings only count towards finished hashes"""
+        with self._lock:
+            self._stats['in_flight'] -= 1
+            if outcome == 'completed':
+                self._stats['completed'] += 1
+                self._stats['queue_time_total'] += queue_time
+                self._stats['queue_time_max'] = max(self._stats['queue_time_max'], queue_time)
+                self._stats['hash_time_total'] += hash_time
+            elif outcome is not None:
+                self._stats[outcome] += 1
+        self._slots.release()
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def get_stats(self):
+        """Counters plus average/maximum queue and hash times in milliseconds"""
+        with self._lock:
+            stats = dict(self._stats)
+        completed = stats['completed'] or 1
+        return {
+            'workers': self.workers,
+            'max_pending': self.max_pending,
+            'submitted': stats['submitted'],
+            'completed': stats['completed'],
+            'rejected': stats['rejected'],
+            'in_flight': stats['in_flight'],
+            'avg_queue_ms': round(stats['queue_time_total'] / completed * 1000, 2),
+            'max_queue_ms': round(stats['queue_time_max'] * 1000, 2),
+            'avg_hash_ms': round(stats['hash_time_total'] / completed * 1000, 2),
+        }
+
+
+pool = HashingPool(
+    workers=getattr(settings, 'PASSWORD_HASH_WORKERS', 2),
+    max_pending=getattr(settings, 'PASSWORD_HASH_MAX_PENDING', 32),
+    wait_timeout=getattr(settings, 'PASSWORD_HASH_WAIT_TIMEOUT', 5)
+)
+
+
+_use_pool = ContextVar('password_hash_use_pool', default=False)
+
+
+@contextmanager
+def pooled_hashing():
+    """Send hash_password() calls made inside the block to the pool"""
+    token = _use_pool.set(True)
+    try:
+        yield
+    finally:
+        _use_pool.reset(token)
+
+
+def hash_password(raw_password):
+    """Hash a password inline, or on the pool and wait inside pooled_hashing()"""
+    if not _use_pool.get():
+        return make_password(raw_password)
+    return pool.submit(raw_password).result()
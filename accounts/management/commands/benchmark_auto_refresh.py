@@ -0,0 +1,55 @@
+import timeit
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework_simplejwt.state import token_backend
+from rest_framework_simplejwt.tokens import RefreshToken
+from accounts.authentication import AutoRefreshJWTAuthentication
+from accounts.models import User
+from accounts.tokens import UserRefreshToken, add_user_claims
+
+
+class Command(BaseCommand):
+    help = 'Time auto-refresh with one refresh token verification against the old double decode (nothing is asserted or saved)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='Existing user to issue the refresh token for')
+        parser.add_argument('--rounds', type=int, default=200, help='Refreshes per timing run')
+        parser.add_argument('--repeat', type=int, default=3, help='Timing runs; the fastest is reported')
+
+    def handle(self, *args, **options):
+        if options['rounds'] < 1 or options['repeat'] < 1:
+            raise CommandError('--rounds and --repeat must be at least 1')
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['username']}' does not exist")
+
+        authentication = AutoRefreshJWTAuthentication()
+
+        with transaction.atomic():
+            token = str(UserRefreshToken.for_user(user))
+
+            def refresh_twice():
+                # The previous path: decode and blacklist check, a second
+                # blacklist check, a second decode and an uncached user query
+                refresh = RefreshToken(token)
+                refresh.check_blacklist()
+                validated_token = token_backend.decode(token, verify=True)
+                return add_user_claims(refresh.access_token, User.objects.get(id=validated_token['user_id']))
+
+            def refresh_once():
+                refresh = UserRefreshToken(token)
+                return add_user_claims(refresh.access_token, authentication.get_user(refresh))
+
+            # Warm the user cache and blacklist filter
+            refresh_once()
+            twice = min(timeit.repeat(refresh_twice, number=options['rounds'], repeat=options['repeat']))
+            once = min(timeit.repeat(refresh_once, number=options['rounds'], repeat=options['repeat']))
+
+            # Drop the outstanding token issued for the run
+            transaction.set_rollback(True)
+
+        self.stdout.write(
+            f"auto-refresh x{options['rounds']}: double decode {twice * 1000:.1f} ms, "
+            f"single verify {once * 1000:.1f} ms ({twice / once:.1f}x)"
+        )
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from accounts.token_cleanup import purge_expired_tokens
+
+
+class Command(BaseCommand):
+    help = 'Delete expired outstanding and blacklisted refresh tokens in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Tokens deleted per transaction')
+        parser.add_argument('--max-batches', type=int, help='Stop after this many batches')
+        parser.add_argument('--pause', type=float, default=0, help='Seconds to sleep between batches')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        verbose = options['verbosity'] > 1
+
+        def progress(stats, batch_elapsed):
+            if verbose:
+                self.stdout.write(
+                    f"Batch {stats['batches']}: {stats['outstanding']} tokens deleted so far "
+                    f"({batch_elapsed * 1000:.0f} ms)"
+                )
+
+        stats = purge_expired_tokens(
+            batch_size=options['batch_size'],
+            max_batches=options.get('max_batches'),
+            pause=options['pause'],
+            progress=progress
+        )
+
+        rate = stats['outstanding'] / stats['elapsed'] if stats['elapsed'] else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {stats['outstanding']} expired tokens ({stats['blacklisted']} blacklisted) "
+            f"in {stats['batches']} batches, {stats['elapsed']:.2f}s ({rate:.0f} tokens/s)"
+        ))
@@ -0,0 +1,30 @@
+# Generated by Django 6.0.1 on 2026-10-17 09:12
+
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    # FULLTEXT ngram indexes are MySQL-only; other backends use icontains search
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    schema_editor.execute(
+        'CREATE FULLTEXT INDEX ft_users_search '
+        'ON users (username, email, first_name, last_name) WITH PARSER ngram'
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    schema_editor.execute('DROP INDEX ft_users_search ON users')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_alter_user_updated_by'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -1,7 +1,6 @@
 from rest_framework.response import Response
 from django.shortcuts import redirect
 from django.urls import reverse
-from django.conf import settings
 
 
 class AutoRefreshTokenMixin:
@@ -37,7 +36,7 @@ class AutoRefreshTokenMixin:
 class RequirePasswordChangeMixin:
     """
     Mixin to check if user needs to change password before accessing views.
-    Redirects to password change page if user is using default password.
+    Redirects to password change page if user still has to replace the default password.
     """
     
     def dispatch(self, request, *args, **kwargs):
@@ -46,8 +45,8 @@ class RequirePasswordChangeMixin:
         """
         # Only check for authenticated users
         if request.user and request.user.is_authenticated:
-            # Check if user is using default password
-            if request.user.check_password(settings.DEFAULT_CUSTOMER_PASSWORD):
+            # Check the stored flag instead of hashing the default password every request
+            if getattr(request.user, 'must_change_password', False):
                 # Allow access to change password page and logout
                 if request.path not in ['/api/accounts/change-password/', '/api/accounts/logout/']:
                     # Check if this is an HTML request
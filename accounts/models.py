@@ -8,12 +8,21 @@ from django.contrib.auth.models import AbstractUser
 class CustomUserManager(BaseUserManager):
     use_in_migrations = True
 
-    def create_user(self, email, password=None, **extra_fields):
+    def create_user(self, email, password=None, password_hash=None, **extra_fields):
         if not email:
             raise ValueError('The Email must be set')
         email = self.normalize_email(email)
         user = self.model(email=email, **extra_fields)
-        user.set_password(password)
+        if password_hash is not None:
+            # Already hashed by the caller (e.g. outside its transaction)
+            user.password = password_hash
+        elif password is not None:
+            # Inline, or on the bounded pool for the async creation routes
+            from .hashing import hash_password
+            user.password = hash_password(password)
+            user._password = password
+        else:
+            user.set_unusable_password()
         user.save(using=self._db)
         return user
 
@@ -45,6 +54,9 @@ class User(AbstractUser):
     date_joined = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     updated_by = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, db_column='updated_by')
+    must_change_password = models.BooleanField(default=False)
+    # Bumped when role or status change; tokens carry it in the 'ver' claim
+    token_version = models.PositiveIntegerField(default=0)
 
     objects = CustomUserManager()
 
@@ -0,0 +1,183 @@
+"""
+Shared pagination helpers for list endpoints.
+
+KeysetPaginator pages through a queryset with a fixed ordering by
+remembering the last row's sort values in an opaque cursor, so every page
+is an indexed range scan with no OFFSET and no COUNT(*). ListPagination
+wraps it for the user list views, with an opt-in page-number mode.
+"""
+import base64
+import hashlib
+import json
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Q
+
+
+class InvalidCursorError(Exception):
+    """Raised when a pagination cursor cannot be decoded"""
+    pass
+
+
+class KeysetPaginator:
+    """Cursor pagination over a unique ordering such as ('-created_at', 'id')"""
+
+    cursor_param = 'cursor'
+    page_size_param = 'page_size'
+
+    def __init__(self, ordering, default_page_size=20, max_page_size=100):
+        self.ordering = tuple(ordering)
+        self.default_page_size = default_page_size
+        self.max_page_size = max_page_size
+
+    def get_page_size(self, request):
+        """Requested page size, capped at max_page_size"""
+        try:
+            page_size = int(request.query_params.get(self.page_size_param, self.default_page_size))
+        except (TypeError, ValueError):
+            page_size = self.default_page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def paginate(self, queryset, request):
+        """Return (rows, next_cursor, page_size) for the page after the request's cursor"""
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+
+        cursor = request.query_params.get(self.cursor_param)
+        if cursor:
+            values = self.decode_cursor(cursor, queryset.model)
+            queryset = queryset.filter(self._after(values))
+
+        # Fetch one extra row to know whether there is a next page
+        rows = list(queryset[:page_size + 1])
+        next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            next_cursor = self.encode_cursor(rows[-1])
+        return rows, next_cursor, page_size
+
+    def encode_cursor(self, obj):
+        """Encode the ordering values of a row as an opaque cursor"""
+        values = []
+        for field_name in self._field_names():
+            value = getattr(obj, field_name)
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        raw = json.dumps(values, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, cursor, model):
+        """Decode a cursor back into typed ordering values"""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            field_names = self._field_names()
+            if not isinstance(values, list) or len(values) != len(field_names):
+                raise ValueError('cursor does not match ordering')
+            return [
+                self._to_python(model, name, value)
+                for name, value in zip(field_names, values)
+            ]
+        except Exception:
+            raise InvalidCursorError('Invalid pagination cursor')
+
+    def _to_python(self, model, name, value):
+        """Convert a cursor value for a model field; annotations keep their JSON value"""
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return value
+        return field.to_python(value)
+
+    def _field_names(self):
+        return [field.lstrip('-') for field in self.ordering]
+
+    def _after(self, values):
+        """Filter for rows that sort strictly after the given ordering values"""
+        condition = Q()
+        equal_prefix = Q()
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal_prefix & Q(**{f'{name}__{lookup}': value})
+            equal_prefix &= Q(**{name: value})
+        return condition
+
+
+def get_cached_count(queryset, timeout=60):
+    """COUNT(*) for a queryset, cached briefly so paging does not recount every request"""
+    sql, params = queryset.order_by().query.sql_with_params()
+    key = 'list-count:' + hashlib.md5(f'{sql}|{params!r}'.encode()).hexdigest()
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, timeout=timeout)
+    return count
+
+
+class ListPagination:
+    """Pagination for list endpoints.
+
+    Pages are keyset-based on ``id`` by default. Passing ``page`` switches
+    to the legacy page-number response (count/page/total_pages); passing
+    ``include_count=1`` adds a cached total to keyset responses.
+    """
+
+    def __init__(self, default_page_size=20, max_page_size=100, count_cache_timeout=60):
+        self.keyset = KeysetPaginator(
+            ordering=('id',),
+            default_page_size=default_page_size,
+            max_page_size=max_page_size
+        )
+        self.count_cache_timeout = count_cache_timeout
+
+    def paginate(self, queryset, request, serializer_class, ordering=None):
+        """Return response data for one page of the queryset.
+
+        ``ordering`` overrides the default id ordering (e.g. ranked search
+        results); it must end with a unique field.
+        """
+        keyset = self.keyset
+        if ordering:
+            keyset = KeysetPaginator(
+                ordering=ordering,
+                default_page_size=keyset.default_page_size,
+                max_page_size=keyset.max_page_size
+            )
+
+        if request.query_params.get('page') is not None:
+            return self._paginate_by_page(queryset, request, serializer_class, keyset)
+
+        rows, next_cursor, page_size = keyset.paginate(queryset, request)
+        data = {
+            'page_size': page_size,
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None,
+            'results': serializer_class(rows, many=True).data
+        }
+        if request.query_params.get('include_count', '').lower() in ('1', 'true', 'yes'):
+            count = get_cached_count(queryset, self.count_cache_timeout)
+            data['count'] = count
+            data['total_pages'] = (count + page_size - 1) // page_size if count > 0 else 0
+        return data
+
+    def _paginate_by_page(self, queryset, request, serializer_class, keyset):
+        """Legacy page-number pagination kept for compatibility"""
+        try:
+            page = int(request.query_params.get('page', 1))
+        except (TypeError, ValueError):
+            page = 1
+        if page < 1:
+            page = 1
+        page_size = keyset.get_page_size(request)
+
+        total_count = get_cached_count(queryset, self.count_cache_timeout)
+        start = (page - 1) * page_size
+        rows = queryset.order_by(*keyset.ordering)[start:start + page_size]
+
+        return {
+            'count': total_count,
+            'page': page,
+            'page_size': page_size,
+            'total_pages': (total_count + page_size - 1) // page_size if total_count > 0 else 0,
+            'results': serializer_class(rows, many=True).data
+        }
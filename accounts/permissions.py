@@ -1,37 +1,38 @@
 from rest_framework import permissions
+from .policy import get_policy
 
 
 class IsSuperadmin(permissions.BasePermission):
     """Permission check for superadmin role"""
     def has_permission(self, request, view):
-        return request.user and request.user.is_authenticated and request.user.role == 'superadmin'
+        return get_policy(request).is_superadmin
 
 
 class IsAdmin(permissions.BasePermission):
     """Permission check for admin role"""
     def has_permission(self, request, view):
-        return request.user and request.user.is_authenticated and request.user.role == 'admin'
+        return get_policy(request).is_admin
 
 
 class IsAdminOrSuperadmin(permissions.BasePermission):
     """Permission check for admin or superadmin role"""
     def has_permission(self, request, view):
-        return request.user and request.user.is_authenticated and request.user.role in ['admin', 'superadmin']
+        return get_policy(request).is_manager
 
 
 class IsEmployee(permissions.BasePermission):
     """Permission check for employee role"""
     def has_permission(self, request, view):
-        return request.user and request.user.is_authenticated and request.user.role == 'employee'
+        return get_policy(request).is_employee
 
 
 class IsClient(permissions.BasePermission):
     """Permission check for client role"""
     def has_permission(self, request, view):
-        return request.user and request.user.is_authenticated and request.user.role == 'client'
+        return get_policy(request).is_client
 
 
 class IsStaff(permissions.BasePermission):
     """Permission check for staff (admin, employee, or superadmin)"""
     def has_permission(self, request, view):
-        return request.user and request.user.is_authenticated and request.user.role in ['admin', 'employee', 'superadmin']
+        return get_policy(request).is_staff
@@ -0,0 +1,85 @@
+"""
+Role and capability resolution for a request.
+
+Views and permission classes ask get_policy(request) instead of reading
+request.user.role and looking up the customer profile themselves. The
+Policy is built once per request and memoized on it, so a permission
+class, the view and any helper it calls share one role check and at
+most one customer lookup.
+"""
+from functools import cached_property
+
+STAFF_ROLES = ('superadmin', 'admin', 'employee')
+MANAGER_ROLES = ('superadmin', 'admin')
+
+# capability -> roles that hold it
+CAPABILITIES = {
+    'view_all_orders': STAFF_ROLES,
+    'manage_orders': STAFF_ROLES,
+    'make_payments': ('client',),
+    'view_revenue': MANAGER_ROLES,
+    'manage_services': MANAGER_ROLES,
+}
+
+
+class Policy:
+    """What the user of one request is and what they may do"""
+
+    def __init__(self, user):
+        self.user = user
+        self.is_authenticated = bool(user and user.is_authenticated)
+        self.role = getattr(user, 'role', None) if self.is_authenticated else None
+
+    @property
+    def is_superadmin(self):
+        return self.role == 'superadmin'
+
+    @property
+    def is_admin(self):
+        return self.role == 'admin'
+
+    @property
+    def is_employee(self):
+        return self.role == 'employee'
+
+    @property
+    def is_client(self):
+        return self.role == 'client'
+
+    @property
+    def is_staff(self):
+        """Superadmin, admin or employee"""
+        return self.role in STAFF_ROLES
+
+    @property
+    def is_manager(self):
+        """Superadmin or admin"""
+        return self.role in MANAGER_ROLES
+
+    @cached_property
+    def customer(self):
+        """The client's customer profile, or None (looked up at most once)"""
+        if not self.is_client:
+            return None
+        from customers.models import Customer
+        return Customer.objects.filter(user_id=self.user.pk).first()
+
+    @property
+    def customer_id(self):
+        customer = self.customer
+        return customer.id if customer else None
+
+    def can(self, capability):
+        """Whether the user's role holds the named capability"""
+        return self.role in CAPABILITIES.get(capability, ())
+
+
+def get_policy(request):
+    """Return the request's Policy, building it on first use"""
+    policy = getattr(request, '_policy', None)
+    user = getattr(request, 'user', None)
+    # Rebuild if authentication swapped the user after the policy was made
+    if policy is None or policy.user is not user:
+        policy = Policy(user)
+        request._policy = policy
+    return policy
@@ -0,0 +1,93 @@
+"""
+Relevance-ranked search for users, customers and services.
+
+On MySQL, searches use FULLTEXT indexes built with the ngram parser (see the
+schema script and the accounts/customers migrations), so partial names and
+partial phone numbers are answered from the index instead of scanning with
+LIKE '%term%'. Other databases fall back to icontains filters.
+
+Phone searches compare digits only on both paths: the term is stripped
+of spaces, dashes, brackets and '+', and matched against the customers'
+digits-only phone_digits/whatsapp_digits columns, so "024-123" finds a
+number stored as "024 123 4567".
+
+Every search annotates ``search_rank``; list views order by RANKED_ORDERING
+when a search term is present.
+"""
+import re
+from django.db import connections
+from django.db.models import F, Q, Func, FloatField, Value
+
+# Ordering for ranked search results (id breaks ties for keyset pagination)
+RANKED_ORDERING = ('-search_rank', 'id')
+
+# Matches the server's ngram_token_size default; shorter words cannot use the index
+NGRAM_TOKEN_SIZE = 2
+
+USER_SEARCH_FIELDS = ('username', 'email', 'first_name', 'last_name')
+# Digits-only copies of phone_number and whatsapp_number
+CONTACT_SEARCH_FIELDS = ('phone_digits', 'whatsapp_digits')
+SERVICE_SEARCH_FIELDS = ('name', 'description')
+
+PHONE_PATTERN = re.compile(r'^\+?[\d\s\-()]{3,}$')
+
+
+class MatchAgainst(Func):
+    """MATCH (columns) AGAINST (query IN BOOLEAN MODE) relevance score"""
+    output_field = FloatField()
+
+    def __init__(self, *columns, query):
+        super().__init__(*[F(column) for column in columns])
+        self.query = query
+
+    def as_sql(self, compiler, connection, **extra_context):
+        columns, params = [], []
+        for expression in self.source_expressions:
+            sql, expression_params = compiler.compile(expression)
+            columns.append(sql)
+            params.extend(expression_params)
+        return f"MATCH ({', '.join(columns)}) AGAINST (%s IN BOOLEAN MODE)", (*params, self.query)
+
+
+def is_phone_like(term):
+    """Check if a search term looks like (part of) a phone number"""
+    return bool(PHONE_PATTERN.match(term.strip()))
+
+
+def boolean_query(term):
+    """Build a BOOLEAN MODE query requiring every word, or None if no word is long enough"""
+    words = [word for word in re.split(r'\W+', term) if len(word) >= NGRAM_TOKEN_SIZE]
+    if not words:
+        return None
+    # Quoted words are matched as ngram phrases, so partial words still hit the index
+    return ' '.join(f'+"{word}"' for word in words)
+
+
+def search_users(queryset, term, include_contacts=False):
+    """Filter users by name/username/email, or by customer phone numbers when the term looks like one"""
+    term = term.strip()
+    if include_contacts and is_phone_like(term):
+        digits = re.sub(r'\D', '', term)
+        contact_fields = [f'customer_profile__{field}' for field in CONTACT_SEARCH_FIELDS]
+        return _rank(queryset, contact_fields, digits)
+    return _rank(queryset, USER_SEARCH_FIELDS, term)
+
+
+def search_services(queryset, term):
+    """Filter services by name and description"""
+    return _rank(queryset, SERVICE_SEARCH_FIELDS, term.strip())
+
+
+def _rank(queryset, fields, term):
+    """Annotate search_rank and keep matching rows"""
+    query = boolean_query(term)
+    if connections[queryset.db].vendor == 'mysql' and query:
+        return queryset.annotate(
+            search_rank=MatchAgainst(*fields, query=query)
+        ).filter(search_rank__gt=0)
+
+    # Fallback for other databases and terms too short for the ngram index
+    condition = Q()
+    for field in fields:
+        condition |= Q(**{f'{field}__icontains': term})
+    return queryset.filter(condition).annotate(search_rank=Value(1.0, output_field=FloatField()))
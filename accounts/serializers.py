@@ -1,9 +1,10 @@
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 from .models import User
-from django.contrib.auth import authenticate
 from django.utils import timezone
 from customers.models import Customer
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from .tokens import UserRefreshToken
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -270,38 +271,39 @@ class UserLoginSerializer(serializers.Serializer):
                 'status_code': 400
             })
         
-        # First check if user exists and is inactive (before authentication)
-        try:
-            user = User.objects.get(username=username)
-            if not user.is_active:
-                raise AccountInactiveError({
-                    'error_code': 'ACCOUNT_INACTIVE',
-                    'message': 'Your account has been deactivated. Please contact the administrator for assistance.',
-                    'status_code': 401
-                })
-        except User.DoesNotExist:
-            pass  # User doesn't exist, will be caught by authenticate below
-        
-        # Authenticate user
-        user = authenticate(username=username, password=password)
-        if user is None:
-            raise InvalidCredentialsError({
-                'error_code': 'INVALID_CREDENTIALS',
-                'message': 'Invalid username or password',
-                'status_code': 401
-            })
+        # Fetch the user once; the password is then hashed exactly once
+        user = User.objects.filter(username=username).first()
         
-        # Double check if account is active (in case authenticate returned an inactive user)
-        if not user.is_active:
+        # Inactive accounts are rejected before checking the password
+        if user is not None and not user.is_active:
             raise AccountInactiveError({
                 'error_code': 'ACCOUNT_INACTIVE',
                 'message': 'Your account has been deactivated. Please contact the administrator for assistance.',
                 'status_code': 401
             })
         
+        if user is None:
+            # Hash anyway so unknown usernames take as long as wrong passwords
+            User().set_password(password)
+            password_valid = False
+        else:
+            password_valid = user.check_password(password)
+        
+        if not password_valid:
+            raise InvalidCredentialsError({
+                'error_code': 'INVALID_CREDENTIALS',
+                'message': 'Invalid username or password',
+                'status_code': 401
+            })
+        
         attrs['user'] = user
         return attrs
 
+class UserTokenRefreshSerializer(TokenRefreshSerializer):
+    """Token refresh that checks the blacklist through the in-memory filter"""
+    token_class = UserRefreshToken
+
+
 class ChangePasswordSerializer(serializers.Serializer):
     """
     Serializer for changing password.
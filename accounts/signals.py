@@ -0,0 +1,40 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from .models import User
+from . import user_cache
+from .blacklist import blacklist_filter
+
+# Changes to these fields revoke tokens issued before the change
+TOKEN_FIELDS = ('role', 'is_active')
+
+
+@receiver(pre_save, sender=User)
+def bump_token_version(sender, instance, update_fields=None, **kwargs):
+    """Bump token_version when a field baked into tokens changes"""
+    if not instance.pk:
+        return
+    if update_fields is not None and not set(update_fields) & set(TOKEN_FIELDS):
+        return
+    previous = User.objects.filter(pk=instance.pk).values(*TOKEN_FIELDS, 'token_version').first()
+    if previous is None:
+        return
+    if any(previous[field] != getattr(instance, field) for field in TOKEN_FIELDS):
+        instance.token_version = previous['token_version'] + 1
+        if update_fields is not None and 'token_version' not in update_fields:
+            # Partial saves would not write the new version themselves
+            User.objects.filter(pk=instance.pk).update(token_version=instance.token_version)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def evict_cached_user(sender, instance, **kwargs):
+    """Drop cached copies so every process reloads the user"""
+    user_cache.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def add_to_blacklist_filter(sender, instance, created, **kwargs):
+    """Tokens blacklisted by this process are rejected without waiting for the next sync"""
+    if created:
+        blacklist_filter.add(instance.token.jti)
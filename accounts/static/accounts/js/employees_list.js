@@ -1,5 +1,7 @@
 // Employees list functionality
 let currentPage = 1;
+// Cursor for each visited page (index 0 is the first page)
+let pageCursors = [null];
 let pageSize = 20;
 let searchTerm = '';
 let statusFilter = '';
@@ -31,6 +33,7 @@ function setupEventListeners() {
         searchTerm = document.getElementById('searchInput').value;
         statusFilter = document.getElementById('statusFilter').value;
         currentPage = 1;
+        pageCursors = [null];
         loadEmployees();
     });
     
@@ -44,10 +47,13 @@ function setupEventListeners() {
 async function loadEmployees() {
     try {
         const params = new URLSearchParams({
-            page: currentPage,
-            page_size: pageSize
+            page_size: pageSize,
+            include_count: 1
         });
         
+        const cursor = pageCursors[currentPage - 1];
+        if (cursor) params.append('cursor', cursor);
+        
         if (searchTerm) params.append('search', searchTerm);
         if (statusFilter) params.append('is_active', statusFilter);
         
@@ -136,12 +142,17 @@ function renderPagination(data) {
     const info = pagination.querySelector('.pagination-info');
     const controls = pagination.querySelector('.pagination-controls');
     
-    info.textContent = `Showing ${((data.page - 1) * data.page_size) + 1} to ${Math.min(data.page * data.page_size, data.count)} of ${data.count} employees`;
+    // Remember where the next page starts
+    pageCursors[currentPage] = data.next_cursor;
+    
+    const count = data.count || 0;
+    const first = count > 0 ? ((currentPage - 1) * data.page_size) + 1 : 0;
+    info.textContent = `Showing ${first} to ${Math.min(currentPage * data.page_size, count)} of ${count} employees`;
     
     controls.innerHTML = `
-        <button class="pagination-btn" ${data.page === 1 ? 'disabled' : ''} onclick="goToPage(${data.page - 1})">Previous</button>
-        <span>Page ${data.page} of ${data.total_pages || 1}</span>
-        <button class="pagination-btn" ${data.page >= data.total_pages ? 'disabled' : ''} onclick="goToPage(${data.page + 1})">Next</button>
+        <button class="pagination-btn" ${currentPage === 1 ? 'disabled' : ''} onclick="goToPage(${currentPage - 1})">Previous</button>
+        <span>Page ${currentPage} of ${data.total_pages || 1}</span>
+        <button class="pagination-btn" ${!data.has_more ? 'disabled' : ''} onclick="goToPage(${currentPage + 1})">Next</button>
     `;
 }
 
@@ -1,3 +1,276 @@
-from django.test import TestCase
+from datetime import timedelta
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.cache import cache
+from unittest import mock
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.state import token_backend
+from rest_framework_simplejwt.tokens import RefreshToken
+from .authentication import AutoRefreshJWTAuthentication
+from .blacklist import BlacklistFilter, blacklist_filter
+from . import hashing
+from .models import User
+from .search import search_users
+from . import token_cleanup
+from .tokens import UserRefreshToken, add_user_claims
+from .user_cache import user_cache
 
-# Create your tests here.
+
+class CachedUserWriteTests(TestCase):
+    """Views must not write a cached request.user back over newer rows"""
+
+    def setUp(self):
+        user_cache.clear()
+        cache.clear()
+        self.admin = User.objects.create_user(
+            username='admin1', email='admin1@example.com', password='old-password', role='admin', is_staff=True
+        )
+        self.client = APIClient()
+        response = self.client.post(
+            '/api/accounts/login/', {'username': 'admin1', 'password': 'old-password'},
+            format='json', HTTP_ACCEPT='application/json'
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.json()['access']}")
+        # Warm the user cache
+        self.client.get('/api/accounts/admins/', HTTP_ACCEPT='application/json')
+
+    def test_self_update_keeps_changes_made_elsewhere(self):
+        # Another worker changes the password and email without touching this process
+        User.objects.filter(pk=self.admin.pk).update(password=make_password('new-password'), email='new@example.com')
+
+        response = self.client.patch(
+            '/api/accounts/admin/update/', {'first_name': 'Z'}, format='json', HTTP_ACCEPT='application/json'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        admin = User.objects.get(pk=self.admin.pk)
+        self.assertEqual(admin.first_name, 'Z')
+        self.assertEqual(admin.email, 'new@example.com')
+        self.assertTrue(admin.check_password('new-password'))
+
+    def test_changed_stamp_drops_cached_user(self):
+        # Deactivated by another process, which changes the shared stamp
+        User.objects.filter(pk=self.admin.pk).update(is_active=False)
+        cache.set(f'auth:user:{self.admin.pk}:stamp', 'changed-elsewhere', timeout=None)
+
+        response = self.client.get('/api/accounts/admins/', HTTP_ACCEPT='application/json')
+
+        self.assertEqual(response.status_code, 401)
+
+
+class AutoRefreshTests(TestCase):
+    """Auto-refresh verifies the refresh token once and reuses its claims"""
+
+    def setUp(self):
+        user_cache.clear()
+        cache.clear()
+        blacklist_filter.reset()
+        self.user = User.objects.create_user(
+            username='client1', email='client1@example.com', password='password', role='client'
+        )
+        self.refresh = UserRefreshToken.for_user(self.user)
+        self.token = str(self.refresh)
+        self.authentication = AutoRefreshJWTAuthentication()
+
+    def refresh_twice(self):
+        # The previous path: decode and blacklist check, a second blacklist
+        # check, a second decode and an uncached user query
+        refresh = RefreshToken(self.token)
+        refresh.check_blacklist()
+        validated_token = token_backend.decode(self.token, verify=True)
+        user = User.objects.get(id=validated_token['user_id'])
+        return add_user_claims(refresh.access_token, user)
+
+    def refresh_once(self):
+        refresh = UserRefreshToken(self.token)
+        user = self.authentication.get_user(refresh)
+        return add_user_claims(refresh.access_token, user)
+
+    def expired_request(self):
+        access = self.refresh.access_token
+        access.set_exp(lifetime=-timedelta(minutes=1))
+        request = APIRequestFactory().get(
+            '/', HTTP_AUTHORIZATION=f'Bearer {access}', HTTP_X_REFRESH_TOKEN=self.token
+        )
+        return Request(request)
+
+    def test_single_verify_does_not_query_per_refresh(self):
+        self.refresh_once()
+        with self.assertNumQueries(0):
+            self.refresh_once()
+        with self.assertNumQueries(3):
+            self.refresh_twice()
+
+    def test_refresh_token_is_decoded_and_verified_once_per_refresh(self):
+        request = self.expired_request()
+
+        with mock.patch.object(token_backend, 'decode', wraps=token_backend.decode) as decode, \
+                mock.patch.object(UserRefreshToken, 'verify', autospec=True, side_effect=UserRefreshToken.verify) as verify, \
+                mock.patch.object(UserRefreshToken, 'check_blacklist', autospec=True,
+                                  side_effect=UserRefreshToken.check_blacklist) as check_blacklist:
+            user, access = self.authentication.authenticate(request)
+
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(request._new_access_token, str(access))
+        refresh_decodes = [call for call in decode.call_args_list if call.args[0] == self.token]
+        self.assertEqual(len(refresh_decodes), 1)
+        self.assertEqual(verify.call_count, 1)
+        self.assertEqual(check_blacklist.call_count, 1)
+
+
+class BlacklistFilterSyncTests(TestCase):
+    """Rows blacklisted by other processes reach the filter even when they commit late"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='client2', email='client2@example.com', password='password', role='client'
+        )
+        self.filter = BlacklistFilter(capacity=100, refresh_interval=0, overlap=60)
+
+    def blacklist_elsewhere(self, blacklisted_at):
+        # bulk_create skips the signal that adds this process's own blacklistings
+        jti = UserRefreshToken.for_user(self.user)['jti']
+        token = OutstandingToken.objects.get(jti=jti)
+        BlacklistedToken.objects.bulk_create([BlacklistedToken(token=token)])
+        BlacklistedToken.objects.filter(token=token).update(blacklisted_at=blacklisted_at)
+        return jti
+
+    def test_new_rows_are_picked_up(self):
+        self.assertFalse(self.filter.might_contain('unknown'))
+        jti = self.blacklist_elsewhere(timezone.now())
+        self.assertTrue(self.filter.might_contain(jti))
+
+    def test_row_committed_after_the_last_sync_is_picked_up(self):
+        self.filter.might_contain('unknown')
+        # Stamped before the last sync but only visible after it
+        jti = self.blacklist_elsewhere(self.filter._synced_at - timedelta(seconds=30))
+        self.assertTrue(self.filter.might_contain(jti))
+
+    def test_overlap_does_not_inflate_the_count(self):
+        self.blacklist_elsewhere(timezone.now())
+        self.filter.might_contain('unknown')
+        self.filter.might_contain('unknown')
+        self.filter.might_contain('unknown')
+        self.assertEqual(self.filter._filter.count, 1)
+
+
+class ContactSearchTests(TestCase):
+    """Phone searches match digits only, however the number was typed or stored"""
+
+    def setUp(self):
+        from customers.models import Customer
+        self.user = User.objects.create_user(
+            username='client3', email='client3@example.com', password='password', role='client'
+        )
+        Customer.objects.create(user=self.user, phone_number='024 123-4567', whatsapp_number='+233 (20) 555 0000')
+
+    def search(self, term):
+        return list(search_users(User.objects.all(), term, include_contacts=True).values_list('pk', flat=True))
+
+    def test_formatted_term_matches_formatted_number(self):
+        self.assertEqual(self.search('0241-234'), [self.user.pk])
+        self.assertEqual(self.search('(024) 123 4567'), [self.user.pk])
+        self.assertEqual(self.search('+233 20 555'), [self.user.pk])
+
+    def test_non_matching_number(self):
+        self.assertEqual(self.search('0549 999'), [])
+
+
+class LoginCacheTests(TestCase):
+    """Login writes last_login with update(), which must still evict the cached user"""
+
+    def setUp(self):
+        user_cache.clear()
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='client4', email='client4@example.com', password='password', role='client'
+        )
+
+    def test_login_evicts_cached_user(self):
+        user_cache.set(User.objects.get(pk=self.user.pk))
+
+        response = APIClient().post(
+            '/api/accounts/login/', {'username': 'client4', 'password': 'password'},
+            format='json', HTTP_ACCEPT='application/json'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(user_cache.get(self.user.pk))
+
+
+class TokenCleanupSchedulerTests(SimpleTestCase):
+    """Workers sharing the lock cache purge once per interval between them"""
+
+    class Stop(Exception):
+        pass
+
+    def setUp(self):
+        cache.clear()
+
+    def run_one_tick(self):
+        with mock.patch.object(token_cleanup.time, 'sleep', side_effect=[None, self.Stop]), \
+                mock.patch.object(token_cleanup, 'purge_expired_tokens') as purge:
+            purge.return_value = {'outstanding': 0, 'blacklisted': 0, 'elapsed': 0.0}
+            with self.assertRaises(self.Stop):
+                token_cleanup._run_periodically(60, 1000)
+        return purge.call_count
+
+    def test_only_one_worker_purges_per_interval(self):
+        self.assertEqual(self.run_one_tick(), 1)
+        self.assertEqual(self.run_one_tick(), 0)
+
+        cache.delete(token_cleanup.LOCK_KEY)  # The interval has passed
+        self.assertEqual(self.run_one_tick(), 1)
+
+    def test_disabled_by_default(self):
+        with self.settings(TOKEN_CLEANUP_INTERVAL=0):
+            self.assertIsNone(token_cleanup.start_scheduler_from_settings())
+
+
+class PasswordHashingTests(SimpleTestCase):
+    """Sync callers hash inline; only pooled_hashing() blocks uses the pool"""
+
+    def setUp(self):
+        self.pool = hashing.HashingPool(workers=1, max_pending=0, wait_timeout=0)
+        patcher = mock.patch.object(hashing, 'pool', self.pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_sync_callers_hash_inline(self):
+        with mock.patch.object(self.pool, 'submit') as submit:
+            password_hash = hashing.hash_password('secret-password')
+        submit.assert_not_called()
+        self.assertTrue(check_password('secret-password', password_hash))
+
+    def test_pooled_hashing_uses_the_pool(self):
+        with hashing.pooled_hashing():
+            password_hash = hashing.hash_password('secret-password')
+        self.assertTrue(check_password('secret-password', password_hash))
+        stats = self.pool.get_stats()
+        self.assertEqual((stats['submitted'], stats['completed'], stats['in_flight']), (1, 1, 0))
+
+    def test_refused_submission_is_not_counted_as_completed(self):
+        executor = mock.Mock()
+        executor.submit.side_effect = RuntimeError('cannot schedule new futures after shutdown')
+        self.pool._get_executor = lambda: executor
+
+        with hashing.pooled_hashing(), self.assertRaises(RuntimeError):
+            hashing.hash_password('secret-password')
+
+        stats = self.pool.get_stats()
+        self.assertEqual((stats['submitted'], stats['completed'], stats['rejected'], stats['in_flight']), (0, 0, 1, 0))
+        self.assertEqual(stats['avg_hash_ms'], 0)
+        # The slot was given back
+        self.assertTrue(self.pool._slots.acquire(timeout=0))
+
+    def test_failed_hash_is_not_counted_as_completed(self):
+        with mock.patch.object(hashing, 'make_password', side_effect=ValueError('bad hasher')):
+            with hashing.pooled_hashing(), self.assertRaises(ValueError):
+                hashing.hash_password('secret-password')
+
+        stats = self.pool.get_stats()
+        self.assertEqual((stats['completed'], stats['in_flight']), (0, 0))
+        self.assertTrue(self.pool._slots.acquire(timeout=0))
@@ -0,0 +1,110 @@
+"""
+Deletion of expired refresh tokens.
+
+With ROTATE_REFRESH_TOKENS and BLACKLIST_AFTER_ROTATION every refresh
+leaves an outstanding and a blacklisted row behind. Expired tokens can
+never be used again, so purge_expired_tokens() removes them in bounded
+batches (short transactions, no long table locks). It runs from the
+purge_expired_tokens command (the recommended setup, from cron) or, when
+TOKEN_CLEANUP_INTERVAL is set, from a background thread in the serving
+processes. The thread is started from capstone/wsgi.py and asgi.py, never
+from management commands.
+
+Each worker runs its own thread. Before purging, a tick takes a lock in
+the TOKEN_CLEANUP_CACHE_ALIAS cache for one interval. Only when that alias
+points at a cache shared by the workers (file, database or memcached) does
+a single worker purge per interval; with the default per-process locmem
+cache every worker purges. For several workers, cron is the supported setup.
+"""
+import logging
+import threading
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+def purge_expired_tokens(batch_size=1000, max_batches=None, pause=0, progress=None):
+    """Delete expired outstanding tokens and their blacklist rows; return run statistics"""
+    from rest_framework_simplejwt.token_blacklist.models import OutstandingToken, BlacklistedToken
+
+    cutoff = timezone.now()
+    stats = {'batches': 0, 'outstanding': 0, 'blacklisted': 0, 'elapsed': 0.0}
+    started = time.monotonic()
+    last_id = 0
+
+    while max_batches is None or stats['batches'] < max_batches:
+        # Walk the primary key so each batch is a short range scan
+        ids = list(
+            OutstandingToken.objects.filter(id__gt=last_id, expires_at__lt=cutoff)
+            .order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        last_id = ids[-1]
+
+        batch_started = time.monotonic()
+        with transaction.atomic():
+            # Blacklist rows first, so the second delete has nothing to cascade
+            blacklisted, _ = BlacklistedToken.objects.filter(token_id__in=ids).delete()
+            outstanding, _ = OutstandingToken.objects.filter(id__in=ids).delete()
+        stats['batches'] += 1
+        stats['blacklisted'] += blacklisted
+        stats['outstanding'] += outstanding
+        if progress:
+            progress(stats, time.monotonic() - batch_started)
+        if pause:
+            time.sleep(pause)
+
+    stats['elapsed'] = time.monotonic() - started
+    return stats
+
+
+LOCK_KEY = 'accounts:token-cleanup:lock'
+
+
+def _run_periodically(interval, batch_size):
+    while True:
+        time.sleep(interval)
+        try:
+            # Another worker sharing the lock cache has already purged this interval
+            lock_cache = caches[getattr(settings, 'TOKEN_CLEANUP_CACHE_ALIAS', 'default')]
+            if not lock_cache.add(LOCK_KEY, 1, timeout=interval):
+                continue
+            stats = purge_expired_tokens(batch_size=batch_size)
+            if stats['outstanding']:
+                logger.info(
+                    f"Purged {stats['outstanding']} expired tokens "
+                    f"({stats['blacklisted']} blacklisted) in {stats['elapsed']:.2f}s"
+                )
+        except Exception as e:
+            logger.error(f'Token cleanup failed: {str(e)}', exc_info=True)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def start_scheduler(interval, batch_size=1000):
+    """Start the background cleanup thread once per process"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is not None:
+            return _scheduler
+        _scheduler = threading.Thread(
+            target=_run_periodically, args=(interval, batch_size),
+            name='token-cleanup', daemon=True
+        )
+        _scheduler.start()
+        return _scheduler
+
+
+def start_scheduler_from_settings():
+    """Start the cleanup thread if TOKEN_CLEANUP_INTERVAL is set; called by the server entry points"""
+    interval = getattr(settings, 'TOKEN_CLEANUP_INTERVAL', 0)
+    if interval > 0:
+        return start_scheduler(interval)
+    return None
@@ -0,0 +1,24 @@
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from .blacklist import blacklist_filter
+
+
+def add_user_claims(token, user):
+    """Embed the claims needed to authorize requests without loading the user"""
+    token['role'] = user.role
+    token['active'] = user.is_active
+    token['ver'] = user.token_version
+    return token
+
+
+class UserRefreshToken(RefreshToken):
+    """Refresh token whose access tokens carry role, status and version claims"""
+
+    @classmethod
+    def for_user(cls, user):
+        return add_user_claims(super().for_user(user), user)
+
+    def check_blacklist(self):
+        """Only query token_blacklist when the in-memory filter reports a possible hit"""
+        if blacklist_filter.might_contain(self.payload[api_settings.JTI_CLAIM]):
+            super().check_blacklist()
@@ -30,7 +30,9 @@ from .views import (
     getalladminsview,
     getallemployeesview,
     getallclientsview,
+    PasswordHashingStatsView,
 )
+from .async_views import async_view
 
 urlpatterns = [
     # Authentication endpoints
@@ -46,11 +48,13 @@ urlpatterns = [
     
     # Admin endpoints
     path('admin/create/', CreateAdminView.as_view(), name='create_admin'),
+    path('admin/create/async/', async_view(CreateAdminView), name='create_admin_async'),
     path('admin/update/', AdminSelfUpdateView.as_view(), name='admin_self_update'),
     path('admin/employee/<int:user_id>/update/', AdminUpdateEmployeeView.as_view(), name='admin_update_employee'),
     
     # Employee endpoints
     path('employee/create/', CreateEmployeeView.as_view(), name='create_employee'),
+    path('employee/create/async/', async_view(CreateEmployeeView), name='create_employee_async'),
     path('employee/update/', EmployeeSelfUpdateView.as_view(), name='employee_self_update'),
     
     # Staff endpoints (employee, admin, superadmin can update clients)
@@ -59,6 +63,8 @@ urlpatterns = [
     
     # Superadmin endpoints
     path('superadmin/create/', CreateSuperadminView.as_view(), name='create_superadmin'),
+    path('superadmin/create/async/', async_view(CreateSuperadminView), name='create_superadmin_async'),
+    path('superadmin/hashing-stats/', PasswordHashingStatsView.as_view(), name='password_hashing_stats'),
     path('superadmin/admin/<int:user_id>/update/', SuperadminUpdateAdminView.as_view(), name='superadmin_update_admin'),
     path('superadmin/employee/<int:user_id>/update/', SuperadminUpdateEmployeeView.as_view(), name='superadmin_update_employee'),
     path('superadmin/client/<int:user_id>/update/', SuperadminUpdateClientView.as_view(), name='superadmin_update_client'),
@@ -0,0 +1,115 @@
+"""
+Per-process cache of authenticated users.
+
+Access tokens carry ``role``, ``active`` and ``ver`` (the user's
+token_version) claims. Authentication resolves the token's user from this
+bounded LRU cache, so most requests do not query the users table at all.
+Entries expire after a short TTL. Saving or deleting a user evicts the
+local entry and changes the user's stamp in the shared cache
+(AUTH_USER_CACHE_ALIAS); other processes compare that stamp on every hit,
+so they drop their copy too when the alias points at a cache all workers
+share. token_version is bumped on role and status changes, so tokens
+issued before the change stop being accepted.
+
+Cached users are read-only snapshots for authorization. Code that writes
+to the user must reload it first (see fresh_user).
+"""
+import copy
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+
+
+class UserCache:
+    """Thread-safe LRU cache of User instances with a time-to-live"""
+
+    def __init__(self, max_size=1024, ttl=60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        """Return a private copy of the cached user, or None if missing or expired"""
+        # Token claims may carry the id as a string
+        user_id = str(user_id)
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires_at, stamp, user = entry
+            if expires_at <= time.monotonic() or stamp != get_stamp(user_id):
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+        # Views may modify request.user, so never hand out the cached instance
+        return copy.copy(user)
+
+    def set(self, user, stamp=None):
+        """Cache a user until the TTL runs out, evicting the least recently used entry"""
+        if self.max_size <= 0:
+            return
+        user_id = str(user.pk)
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, stamp, copy.copy(user))
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def evict(self, user_id):
+        with self._lock:
+            self._entries.pop(str(user_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache(
+    max_size=getattr(settings, 'AUTH_USER_CACHE_SIZE', 1024),
+    ttl=getattr(settings, 'AUTH_USER_CACHE_TTL', 10)
+)
+
+
+def _stamp_key(user_id):
+    return f'auth:user:{user_id}:stamp'
+
+
+def get_stamp(user_id):
+    """The user's current stamp in the shared cache (None until first invalidated)"""
+    return caches[getattr(settings, 'AUTH_USER_CACHE_ALIAS', 'default')].get(_stamp_key(user_id))
+
+
+def invalidate(user_id):
+    """Evict the user here and, through the shared stamp, in every other process"""
+    user_cache.evict(user_id)
+    caches[getattr(settings, 'AUTH_USER_CACHE_ALIAS', 'default')].set(
+        _stamp_key(user_id), uuid.uuid4().hex, timeout=None
+    )
+
+
+def get_user(user_id, token_version=None):
+    """Return the user from the cache, loading and caching it on a miss"""
+    from .models import User
+
+    user = user_cache.get(user_id)
+    # A token newer than the cached copy means the user changed elsewhere
+    if user is not None and token_version is not None and token_version > user.token_version:
+        user = None
+    if user is None:
+        # Read the stamp before the row so a concurrent change is not hidden
+        stamp = get_stamp(user_id)
+        user = User.objects.filter(pk=user_id).first()
+        if user is not None:
+            user_cache.set(user, stamp)
+    return user
+
+
+def fresh_user(user):
+    """Reload a (possibly cached) user from the database before writing to it"""
+    from .models import User
+
+    return User.objects.get(pk=user.pk)
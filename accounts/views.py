@@ -1,18 +1,21 @@
 from django.shortcuts import render, redirect
 from django.urls import reverse
 from django.utils import timezone
-from django.db.models import Q
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.exceptions import TokenError, InvalidToken
-from rest_framework_simplejwt.serializers import TokenRefreshSerializer
 from rest_framework.exceptions import ValidationError, AuthenticationFailed, NotAuthenticated
 from .models import User
 from .mixins import AutoRefreshTokenMixin
+from .tokens import UserRefreshToken
+from .user_cache import fresh_user, invalidate as invalidate_cached_user
+from .hashing import pool as hashing_pool
+from .policy import get_policy
 from .permissions import IsSuperadmin, IsAdmin, IsAdminOrSuperadmin, IsClient, IsEmployee, IsStaff
+from .pagination import ListPagination, InvalidCursorError
+from .search import search_users, RANKED_ORDERING
 from .serializers import (
     UserSerializer, 
     UserListSerializer,
@@ -20,6 +23,7 @@ from .serializers import (
     UserByIdSerializer,
     UserLoginSerializer, 
     ChangePasswordSerializer, 
+    UserTokenRefreshSerializer,
     UserCreationSerializer,
     ClientSelfUpdateSerializer,
     AdminSelfUpdateSerializer,
@@ -102,16 +106,27 @@ class userloginview(APIView):
             
             user = serializer.validated_data['user']
             
-            # Check if user is using default password
+            # Default password status comes from the stored flag
             from django.conf import settings
-            requires_password_change = user.check_password(settings.DEFAULT_CUSTOMER_PASSWORD)
+            from django.utils.crypto import constant_time_compare
+            login_updates = {'last_login': timezone.now()}
+            # Accounts created before the flag existed are caught by comparing the
+            # submitted password, which the serializer has already verified
+            if not user.must_change_password and constant_time_compare(
+                serializer.validated_data['password'], settings.DEFAULT_CUSTOMER_PASSWORD
+            ):
+                login_updates['must_change_password'] = True
             
-            # Update last login
-            user.last_login = timezone.now()
-            user.save()
+            # Update last login with a single-column write instead of a full save
+            User.objects.filter(pk=user.pk).update(**login_updates)
+            # update() sends no post_save, so evict the cached user here
+            invalidate_cached_user(user.pk)
+            for field, value in login_updates.items():
+                setattr(user, field, value)
+            requires_password_change = user.must_change_password
             
             # Generate JWT tokens
-            refresh = RefreshToken.for_user(user)
+            refresh = UserRefreshToken.for_user(user)
             access_token = str(refresh.access_token)
             refresh_token = str(refresh)
             
@@ -257,7 +272,7 @@ class userlogoutview(APIView):
             
             # Try to blacklist the refresh token
             try:
-                RefreshToken(refresh_token).blacklist()
+                UserRefreshToken(refresh_token).blacklist()
             except TokenError as e:
                 # Handle invalid or expired refresh token
                 return Response({
@@ -302,7 +317,7 @@ class userlogoutview(APIView):
 class TokenRefreshView(APIView):
     """Custom token refresh view with custom error codes - works like default Simple JWT view"""
     permission_classes = [AllowAny]
-    serializer_class = TokenRefreshSerializer
+    serializer_class = UserTokenRefreshSerializer
     
     def post(self, request):
         """Handle token refresh with custom error codes"""
@@ -365,13 +380,15 @@ class ChangePasswordView(APIView):
         """Handle change password API request (POST for form submission)"""
         # request.user is automatically set from the JWT token
         # This ensures the user can only change their own password
-        serializer = self.serializer_class(data=request.data, context={'user': request.user})
+        # request.user may be a cached copy; check and write the current row
+        user = fresh_user(request.user)
+        serializer = self.serializer_class(data=request.data, context={'user': user})
         serializer.is_valid(raise_exception=True)
-        user = request.user
+        # Clear the requires_password_change flag
         user.set_password(serializer.validated_data['new_password'])
-        user.save()
+        user.must_change_password = False
+        user.save(update_fields=['password', 'must_change_password'])
         
-        # Clear the requires_password_change flag
         response_data = {
             'message': 'Password changed successfully',
             'password_changed': True
@@ -383,11 +400,12 @@ class ChangePasswordView(APIView):
         """Handle change password API request (PUT for API calls)"""
         # request.user is automatically set from the JWT token
         # This ensures the user can only change their own password
-        serializer = self.serializer_class(data=request.data, context={'user': request.user})
+        user = fresh_user(request.user)
+        serializer = self.serializer_class(data=request.data, context={'user': user})
         serializer.is_valid(raise_exception=True)
-        user = request.user
         user.set_password(serializer.validated_data['new_password'])
-        user.save()
+        user.must_change_password = False
+        user.save(update_fields=['password', 'must_change_password'])
         return Response({'message': 'Password changed successfully'}, status=status.HTTP_200_OK)
 
 
@@ -406,16 +424,17 @@ class ClientSelfUpdateView(AutoRefreshTokenMixin, APIView):
     
     def patch(self, request):
         """Partial update - only updates fields that are provided"""
-        user = request.user
-        
         # Ensure client can only update themselves
-        if user.role != 'client':
+        if not get_policy(request).is_client:
             return Response({
                 'error_code': 'PERMISSION_DENIED',
                 'message': 'Only clients can use this endpoint',
                 'status_code': 403
             }, status=status.HTTP_403_FORBIDDEN)
         
+        # request.user may be a cached copy; update the current row
+        user = fresh_user(request.user)
+        
         serializer = self.serializer_class(
             user, 
             data=request.data, 
@@ -466,7 +485,8 @@ class CreateAdminView(AutoRefreshTokenMixin, APIView):
             role='admin',
             is_active=True,
             is_staff=True,
-            is_superuser=False
+            is_superuser=False,
+            must_change_password=True
         )
         
         user.updated_by = request.user
@@ -490,16 +510,17 @@ class AdminSelfUpdateView(AutoRefreshTokenMixin, APIView):
     
     def patch(self, request):
         """Partial update - only updates fields that are provided"""
-        user = request.user
-        
         # Ensure admin or superadmin can only update themselves
-        if user.role not in ['admin', 'superadmin']:
+        if not get_policy(request).is_manager:
             return Response({
                 'error_code': 'PERMISSION_DENIED',
                 'message': 'Only admins and superadmins can use this endpoint',
                 'status_code': 403
             }, status=status.HTTP_403_FORBIDDEN)
         
+        # request.user may be a cached copy; update the current row
+        user = fresh_user(request.user)
+        
         serializer = self.serializer_class(
             user, 
             data=request.data, 
@@ -518,7 +539,7 @@ class AdminSelfUpdateView(AutoRefreshTokenMixin, APIView):
         if updated_fields:
             user.updated_at = timezone.now()
             user.updated_by = user
-            user.save()
+            user.save(update_fields=updated_fields + ['updated_at', 'updated_by'])
         
         return Response({
             'message': 'Profile updated successfully',
@@ -554,7 +575,8 @@ class CreateEmployeeView(AutoRefreshTokenMixin, APIView):
             role='employee',
             is_active=True,
             is_staff=True,
-            is_superuser=False
+            is_superuser=False,
+            must_change_password=True
         )
         
         user.updated_by = request.user
@@ -578,16 +600,17 @@ class EmployeeSelfUpdateView(AutoRefreshTokenMixin, APIView):
     
     def patch(self, request):
         """Partial update - only updates fields that are provided"""
-        user = request.user
-        
         # Ensure employee can only update themselves
-        if user.role != 'employee':
+        if not get_policy(request).is_employee:
             return Response({
                 'error_code': 'PERMISSION_DENIED',
                 'message': 'Only employees can use this endpoint',
                 'status_code': 403
             }, status=status.HTTP_403_FORBIDDEN)
         
+        # request.user may be a cached copy; update the current row
+        user = fresh_user(request.user)
+        
         serializer = self.serializer_class(
             user, 
             data=request.data, 
@@ -606,7 +629,7 @@ class EmployeeSelfUpdateView(AutoRefreshTokenMixin, APIView):
         if updated_fields:
             user.updated_at = timezone.now()
             user.updated_by = user
-            user.save()
+            user.save(update_fields=updated_fields + ['updated_at', 'updated_by'])
         
         return Response({
             'message': 'Profile updated successfully',
@@ -688,7 +711,8 @@ class CreateSuperadminView(AutoRefreshTokenMixin, APIView):
             role='superadmin',
             is_active=True,
             is_staff=True,
-            is_superuser=True
+            is_superuser=True,
+            must_change_password=True
         )
         
         user.updated_by = request.user
@@ -701,6 +725,17 @@ class CreateSuperadminView(AutoRefreshTokenMixin, APIView):
             'note': 'Superadmin must change password on first login'
         }, status=status.HTTP_201_CREATED)
 
+class PasswordHashingStatsView(AutoRefreshTokenMixin, APIView):
+    """Get password hashing pool queue and timing counters"""
+    permission_classes = [IsAuthenticated, IsSuperadmin]
+    
+    def get(self, request):
+        """Get hashing pool statistics"""
+        return Response({
+            'status': 'success',
+            'data': hashing_pool.get_stats()
+        }, status=status.HTTP_200_OK)
+
 class SuperadminUpdateAdminView(AutoRefreshTokenMixin, APIView):
     """Superadmin can update admin - full control including role promotion"""
     permission_classes = [IsAuthenticated, IsSuperadmin]
@@ -862,10 +897,33 @@ class SuperadminUpdateClientView(AutoRefreshTokenMixin, APIView):
         }, status=status.HTTP_200_OK)
 
 
+def filter_user_list(queryset, request, include_contacts=False):
+    """Apply the role, is_active and search filters shared by the user list views.
+
+    Returns the filtered queryset and the ordering to paginate it with
+    (relevance first when searching, otherwise the default id ordering).
+    """
+    role_filter = request.query_params.get('role')
+    if role_filter:
+        queryset = queryset.filter(role=role_filter)
+    
+    is_active_filter = request.query_params.get('is_active')
+    if is_active_filter is not None:
+        is_active_bool = is_active_filter.lower() in ('true', '1', 'yes')
+        queryset = queryset.filter(is_active=is_active_bool)
+    
+    search_term = request.query_params.get('search', '').strip()
+    if search_term:
+        queryset = search_users(queryset, search_term, include_contacts=include_contacts)
+        return queryset, RANKED_ORDERING
+    
+    return queryset, None
+
 class getalladminsview(AutoRefreshTokenMixin, APIView):
     """Superadmin can get all admins - returns only first_name, last_name, email, and status"""
     permission_classes = [IsAuthenticated, IsSuperadmin]
     serializer_class = UserListSerializer
+    pagination = ListPagination()
     
     def get(self, request):
         """Get all admins with pagination, filtering, and search - render template or return JSON"""
@@ -882,56 +940,20 @@ class getalladminsview(AutoRefreshTokenMixin, APIView):
             # Base queryset - filter by admin role
             queryset = User.objects.filter(role='admin')
             
-            # Apply filters
-            role_filter = request.query_params.get('role')
-            if role_filter:
-                queryset = queryset.filter(role=role_filter)
-            
-            is_active_filter = request.query_params.get('is_active')
-            if is_active_filter is not None:
-                is_active_bool = is_active_filter.lower() in ('true', '1', 'yes')
-                queryset = queryset.filter(is_active=is_active_bool)
-            
-            # Apply search
-            search_term = request.query_params.get('search')
-            if search_term:
-                queryset = queryset.filter(
-                    Q(username__icontains=search_term) |
-                    Q(email__icontains=search_term) |
-                    Q(first_name__icontains=search_term) |
-                    Q(last_name__icontains=search_term)
-                )
-            
-            # Pagination
-            page = int(request.query_params.get('page', 1))
-            page_size = int(request.query_params.get('page_size', 20))
-            
-            # Validate page_size (max 100)
-            if page_size > 100:
-                page_size = 100
-            if page_size < 1:
-                page_size = 20
-            if page < 1:
-                page = 1
-            
-            # Calculate pagination
-            total_count = queryset.count()
-            start = (page - 1) * page_size
-            end = start + page_size
+            # Apply filters and search
+            queryset, ordering = filter_user_list(queryset, request)
             
-            # Get paginated results
-            admins = queryset.order_by('id')[start:end]
-            
-            # Serialize data
-            serializer = UserListSerializer(admins, many=True)
+            # Keyset pagination on id (pass ?page= for the legacy page-number response)
+            try:
+                data = self.pagination.paginate(queryset, request, UserListSerializer, ordering=ordering)
+            except InvalidCursorError:
+                return Response({
+                    'error_code': 'INVALID_CURSOR',
+                    'message': 'Invalid pagination cursor',
+                    'status_code': 400
+                }, status=status.HTTP_400_BAD_REQUEST)
             
-            return Response({
-                'count': total_count,
-                'page': page,
-                'page_size': page_size,
-                'total_pages': (total_count + page_size - 1) // page_size if total_count > 0 else 0,
-                'results': serializer.data
-            }, status=status.HTTP_200_OK)
+            return Response(data, status=status.HTTP_200_OK)
             
         except (AuthenticationFailed, NotAuthenticated, InvalidToken) as e:
             # Handle authentication errors
@@ -952,6 +974,7 @@ class getallemployeesview(AutoRefreshTokenMixin, APIView):
     """Admin or Superadmin can get all employees - returns only first_name, last_name, email, and status"""
     permission_classes = [IsAuthenticated, IsAdminOrSuperadmin]
     serializer_class = UserListSerializer
+    pagination = ListPagination()
     
     def get(self, request):
         """Get all employees with pagination, filtering, and search - render template or return JSON"""
@@ -968,56 +991,20 @@ class getallemployeesview(AutoRefreshTokenMixin, APIView):
             # Base queryset - filter by employee role
             queryset = User.objects.filter(role='employee')
             
-            # Apply filters
-            role_filter = request.query_params.get('role')
-            if role_filter:
-                queryset = queryset.filter(role=role_filter)
-            
-            is_active_filter = request.query_params.get('is_active')
-            if is_active_filter is not None:
-                is_active_bool = is_active_filter.lower() in ('true', '1', 'yes')
-                queryset = queryset.filter(is_active=is_active_bool)
+            # Apply filters and search
+            queryset, ordering = filter_user_list(queryset, request)
             
-            # Apply search
-            search_term = request.query_params.get('search')
-            if search_term:
-                queryset = queryset.filter(
-                    Q(username__icontains=search_term) |
-                    Q(email__icontains=search_term) |
-                    Q(first_name__icontains=search_term) |
-                    Q(last_name__icontains=search_term)
-                )
-            
-            # Pagination
-            page = int(request.query_params.get('page', 1))
-            page_size = int(request.query_params.get('page_size', 20))
-            
-            # Validate page_size (max 100)
-            if page_size > 100:
-                page_size = 100
-            if page_size < 1:
-                page_size = 20
-            if page < 1:
-                page = 1
-            
-            # Calculate pagination
-            total_count = queryset.count()
-            start = (page - 1) * page_size
-            end = start + page_size
-            
-            # Get paginated results
-            employees = queryset.order_by('id')[start:end]
-            
-            # Serialize data
-            serializer = UserListSerializer(employees, many=True)
+            # Keyset pagination on id (pass ?page= for the legacy page-number response)
+            try:
+                data = self.pagination.paginate(queryset, request, UserListSerializer, ordering=ordering)
+            except InvalidCursorError:
+                return Response({
+                    'error_code': 'INVALID_CURSOR',
+                    'message': 'Invalid pagination cursor',
+                    'status_code': 400
+                }, status=status.HTTP_400_BAD_REQUEST)
             
-            return Response({
-                'count': total_count,
-                'page': page,
-                'page_size': page_size,
-                'total_pages': (total_count + page_size - 1) // page_size if total_count > 0 else 0,
-                'results': serializer.data
-            }, status=status.HTTP_200_OK)
+            return Response(data, status=status.HTTP_200_OK)
             
         except (AuthenticationFailed, NotAuthenticated, InvalidToken) as e:
             # Handle authentication errors
@@ -1038,6 +1025,7 @@ class getallclientsview(AutoRefreshTokenMixin, APIView):
     """Staff can get all clients - returns first_name, last_name, email, status, and customer fields"""
     permission_classes = [IsAuthenticated, IsStaff]
     serializer_class = ClientListSerializer
+    pagination = ListPagination()
     
     def get(self, request):
         """Get all clients with pagination, filtering, and search - render template or return JSON"""
@@ -1054,56 +1042,20 @@ class getallclientsview(AutoRefreshTokenMixin, APIView):
             # Base queryset - filter by client role, use select_related to optimize customer_profile queries
             queryset = User.objects.filter(role='client').select_related('customer_profile')
             
-            # Apply filters
-            role_filter = request.query_params.get('role')
-            if role_filter:
-                queryset = queryset.filter(role=role_filter)
-            
-            is_active_filter = request.query_params.get('is_active')
-            if is_active_filter is not None:
-                is_active_bool = is_active_filter.lower() in ('true', '1', 'yes')
-                queryset = queryset.filter(is_active=is_active_bool)
-            
-            # Apply search
-            search_term = request.query_params.get('search')
-            if search_term:
-                queryset = queryset.filter(
-                    Q(username__icontains=search_term) |
-                    Q(email__icontains=search_term) |
-                    Q(first_name__icontains=search_term) |
-                    Q(last_name__icontains=search_term)
-                )
-            
-            # Pagination
-            page = int(request.query_params.get('page', 1))
-            page_size = int(request.query_params.get('page_size', 20))
-            
-            # Validate page_size (max 100)
-            if page_size > 100:
-                page_size = 100
-            if page_size < 1:
-                page_size = 20
-            if page < 1:
-                page = 1
+            # Apply filters and search
+            queryset, ordering = filter_user_list(queryset, request, include_contacts=True)
             
-            # Calculate pagination
-            total_count = queryset.count()
-            start = (page - 1) * page_size
-            end = start + page_size
-            
-            # Get paginated results
-            clients = queryset.order_by('id')[start:end]
-            
-            # Serialize data
-            serializer = ClientListSerializer(clients, many=True)
+            # Keyset pagination on id (pass ?page= for the legacy page-number response)
+            try:
+                data = self.pagination.paginate(queryset, request, ClientListSerializer, ordering=ordering)
+            except InvalidCursorError:
+                return Response({
+                    'error_code': 'INVALID_CURSOR',
+                    'message': 'Invalid pagination cursor',
+                    'status_code': 400
+                }, status=status.HTTP_400_BAD_REQUEST)
             
-            return Response({
-                'count': total_count,
-                'page': page,
-                'page_size': page_size,
-                'total_pages': (total_count + page_size - 1) // page_size if total_count > 0 else 0,
-                'results': serializer.data
-            }, status=status.HTTP_200_OK)
+            return Response(data, status=status.HTTP_200_OK)
             
         except (AuthenticationFailed, NotAuthenticated, InvalidToken) as e:
             # Handle authentication errors
@@ -1132,7 +1084,7 @@ class UserByIdView(AutoRefreshTokenMixin, APIView):
             if request.headers.get('Accept', '').startswith('application/json'):
                 # Optimize query for clients to include customer profile
                 user = request.user
-                if user.role == 'client':
+                if get_policy(request).is_client:
                     # Use select_related to avoid N+1 query
                     from .models import User
                     user = User.objects.select_related('customer_profile').get(id=user.id)
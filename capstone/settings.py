@@ -36,6 +36,30 @@ PAYSTACK_SECRET_KEY = env('PAYSTACK_SECRET_KEY', default='sk_test_5b46571c49f982
 BASE_URL = env('BASE_URL', default='http://localhost:808')
 PAYSTACK_CALLBACK_URL = f'{BASE_URL}/api/payments/callback/'
 
+# Paystack HTTP client (see payments/gateway.py): connect/read timeouts in
+# seconds, retries for transaction verification, pooled connections, and
+# consecutive failures before the client stops calling Paystack for
+# PAYSTACK_CIRCUIT_RESET seconds
+PAYSTACK_BASE_URL = env('PAYSTACK_BASE_URL', default='https://api.paystack.co')
+PAYSTACK_CONNECT_TIMEOUT = env.float('PAYSTACK_CONNECT_TIMEOUT', default=3.05)
+PAYSTACK_READ_TIMEOUT = env.float('PAYSTACK_READ_TIMEOUT', default=15)
+PAYSTACK_MAX_RETRIES = env.int('PAYSTACK_MAX_RETRIES', default=2)
+PAYSTACK_POOL_SIZE = env.int('PAYSTACK_POOL_SIZE', default=10)
+PAYSTACK_CIRCUIT_THRESHOLD = env.int('PAYSTACK_CIRCUIT_THRESHOLD', default=5)
+PAYSTACK_CIRCUIT_RESET = env.int('PAYSTACK_CIRCUIT_RESET', default=30)
+
+# Background payment verification (see payments/verification.py): worker
+# threads, and seconds before a pending payment is re-verified on a poll.
+# PAYMENT_VERIFY_CACHE_ALIAS holds the per-reference retry throttle; point it
+# at a cache shared by all workers so the limit holds across processes.
+PAYMENT_VERIFY_WORKERS = env.int('PAYMENT_VERIFY_WORKERS', default=2)
+PAYMENT_VERIFY_RETRY_INTERVAL = env.int('PAYMENT_VERIFY_RETRY_INTERVAL', default=10)
+PAYMENT_VERIFY_CACHE_ALIAS = env('PAYMENT_VERIFY_CACHE_ALIAS', default='default')
+
+# Paystack webhook events claimed per batch; each event is processed in its
+# own transaction (see payments/webhooks.py)
+PAYMENT_WEBHOOK_BATCH_SIZE = env.int('PAYMENT_WEBHOOK_BATCH_SIZE', default=100)
+
 
 # Application definition
 
@@ -87,6 +111,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'capstone.wsgi.application'
+ASGI_APPLICATION = 'capstone.asgi.application'
 
 
 # Database
@@ -170,11 +195,74 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
-    'UPDATE_LAST_LOGIN': True,
+    # The login view records last_login itself with a single-column update
+    'UPDATE_LAST_LOGIN': False,
     'ALGORITHM': 'HS256',
     'SIGNING_KEY': SECRET_KEY,
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
 
+# Authenticated users are cached per process for this many seconds (see accounts/user_cache.py).
+# AUTH_USER_CACHE_ALIAS names the cache holding the per-user invalidation stamps;
+# point it at a cache shared by all workers so saves evict every process at once.
+AUTH_USER_CACHE_SIZE = env.int('AUTH_USER_CACHE_SIZE', default=1024)
+AUTH_USER_CACHE_TTL = env.int('AUTH_USER_CACHE_TTL', default=10)
+AUTH_USER_CACHE_ALIAS = env('AUTH_USER_CACHE_ALIAS', default='default')
+
+# Blacklisted refresh tokens are checked against an in-memory Bloom filter first
+# (see accounts/blacklist.py); rows blacklisted by other processes are picked
+# up every TOKEN_BLACKLIST_FILTER_REFRESH seconds, re-reading the last
+# TOKEN_BLACKLIST_FILTER_OVERLAP seconds so rows that commit late are not missed.
+TOKEN_BLACKLIST_FILTER_CAPACITY = env.int('TOKEN_BLACKLIST_FILTER_CAPACITY', default=100000)
+TOKEN_BLACKLIST_FILTER_REFRESH = env.int('TOKEN_BLACKLIST_FILTER_REFRESH', default=5)
+TOKEN_BLACKLIST_FILTER_OVERLAP = env.int('TOKEN_BLACKLIST_FILTER_OVERLAP', default=60)
+
+# Seconds between in-process purges of expired refresh tokens (0 disables;
+# run `python manage.py purge_expired_tokens` from cron instead, which is the
+# supported setup with several workers). When set, the thread starts only in
+# serving processes (capstone/wsgi.py, asgi.py and runserver), and every worker
+# purges unless TOKEN_CLEANUP_CACHE_ALIAS names a cache shared by the workers.
+TOKEN_CLEANUP_INTERVAL = env.int('TOKEN_CLEANUP_INTERVAL', default=0)
+TOKEN_CLEANUP_CACHE_ALIAS = env('TOKEN_CLEANUP_CACHE_ALIAS', default='default')
+
+# Password hashing pool for the async account creation routes (see
+# accounts/hashing.py; sync views hash inline): hashes running at once,
+# hashes allowed to wait, and seconds to wait for a slot
+PASSWORD_HASH_WORKERS = env.int('PASSWORD_HASH_WORKERS', default=2)
+PASSWORD_HASH_MAX_PENDING = env.int('PASSWORD_HASH_MAX_PENDING', default=32)
+PASSWORD_HASH_WAIT_TIMEOUT = env.int('PASSWORD_HASH_WAIT_TIMEOUT', default=5)
+
 # Default password for customers created by admin/employee
 DEFAULT_CUSTOMER_PASSWORD = 'ChangeMe123!'
+
+# Cache configuration
+# Dashboard metrics are cached in the 'dashboard' cache. Set DASHBOARD_CACHE_BACKEND
+# to 'file' or 'db' to share it between worker processes (run
+# `python manage.py createcachetable` once when using 'db').
+DASHBOARD_CACHE_BACKEND = env('DASHBOARD_CACHE_BACKEND', default='locmem')
+
+_DASHBOARD_CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'dashboard-metrics',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': env('DASHBOARD_CACHE_LOCATION', default=str(BASE_DIR / 'cache' / 'dashboard')),
+    },
+    'db': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': env('DASHBOARD_CACHE_LOCATION', default='dashboard_cache'),
+    },
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'dashboard': _DASHBOARD_CACHE_BACKENDS[DASHBOARD_CACHE_BACKEND],
+}
+
+# Seconds dashboard metrics stay cached; capped at DASHBOARD_CACHE_MAX_TIMEOUT
+DASHBOARD_CACHE_TIMEOUT = env.int('DASHBOARD_CACHE_TIMEOUT', default=60)
+DASHBOARD_CACHE_MAX_TIMEOUT = 300
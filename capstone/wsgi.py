@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'capstone.settings')
 
 application = get_wsgi_application()
+
+# Optional expired-token cleanup thread (TOKEN_CLEANUP_INTERVAL); only
+# serving processes import this module, management commands do not
+from accounts.token_cleanup import start_scheduler_from_settings  # noqa: E402
+
+start_scheduler_from_settings()
@@ -0,0 +1,30 @@
+# Generated by Django 6.0.1 on 2026-10-17 09:12
+
+from django.db import migrations
+
+
+def create_contact_search_index(apps, schema_editor):
+    # FULLTEXT ngram indexes are MySQL-only; other backends use icontains search
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    schema_editor.execute(
+        'CREATE FULLTEXT INDEX ft_customers_contact '
+        'ON customers (phone_number, whatsapp_number) WITH PARSER ngram'
+    )
+
+
+def drop_contact_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    schema_editor.execute('DROP INDEX ft_customers_contact ON customers')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0002_alter_customer_created_by_alter_customer_updated_by'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_contact_search_index, drop_contact_search_index),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 6.0.1 on 2026-10-17 07:33
+
+from django.db import migrations, models
+
+
+CONTACT_KEYS = (
+    ('phone_number', 'customers_phone_number_key'),
+    ('whatsapp_number', 'customers_whatsapp_number_key'),
+)
+
+
+def add_missing_contact_keys(apps, schema_editor):
+    # Databases built from "laundry database.sql" already have these keys;
+    # only add them where no unique index covers the column yet
+    Customer = apps.get_model('customers', 'Customer')
+    table = Customer._meta.db_table
+    with schema_editor.connection.cursor() as cursor:
+        existing = schema_editor.connection.introspection.get_constraints(cursor, table)
+    for column, name in CONTACT_KEYS:
+        if any(info['unique'] and info['columns'] == [column] for info in existing.values()):
+            continue
+        schema_editor.add_constraint(
+            Customer, models.UniqueConstraint(fields=[column], name=name)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0003_customer_contact_search_index'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunPython(add_missing_contact_keys, migrations.RunPython.noop),
+            ],
+            state_operations=[
+                migrations.AddConstraint(
+                    model_name='customer',
+                    constraint=models.UniqueConstraint(fields=['phone_number'], name='customers_phone_number_key'),
+                ),
+                migrations.AddConstraint(
+                    model_name='customer',
+                    constraint=models.UniqueConstraint(fields=['whatsapp_number'], name='customers_whatsapp_number_key'),
+                ),
+            ],
+        ),
+    ]
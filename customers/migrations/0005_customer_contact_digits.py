@@ -0,0 +1,62 @@
+# Generated by Django 6.0.1 on 2026-10-17 12:40
+
+import re
+from django.db import migrations, models
+
+
+def fill_contact_digits(apps, schema_editor):
+    Customer = apps.get_model('customers', 'Customer')
+    customers = Customer.objects.order_by('id').only('id', 'phone_number', 'whatsapp_number')
+    batch = []
+    for customer in customers.iterator(chunk_size=1000):
+        customer.phone_digits = re.sub(r'\D', '', customer.phone_number or '')
+        customer.whatsapp_digits = re.sub(r'\D', '', customer.whatsapp_number or '')
+        batch.append(customer)
+        if len(batch) >= 1000:
+            Customer.objects.bulk_update(batch, ['phone_digits', 'whatsapp_digits'])
+            batch = []
+    if batch:
+        Customer.objects.bulk_update(batch, ['phone_digits', 'whatsapp_digits'])
+
+
+def index_contact_digits(apps, schema_editor):
+    # Phone search matches digits only, so index the digits-only columns
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    schema_editor.execute('DROP INDEX ft_customers_contact ON customers')
+    schema_editor.execute(
+        'CREATE FULLTEXT INDEX ft_customers_contact '
+        'ON customers (phone_digits, whatsapp_digits) WITH PARSER ngram'
+    )
+
+
+def index_contact_numbers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    schema_editor.execute('DROP INDEX ft_customers_contact ON customers')
+    schema_editor.execute(
+        'CREATE FULLTEXT INDEX ft_customers_contact '
+        'ON customers (phone_number, whatsapp_number) WITH PARSER ngram'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0004_customer_unique_contact_numbers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='phone_digits',
+            field=models.CharField(blank=True, default='', editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='whatsapp_digits',
+            field=models.CharField(blank=True, default='', editable=False, max_length=20),
+        ),
+        migrations.RunPython(fill_contact_digits, migrations.RunPython.noop),
+        migrations.RunPython(index_contact_digits, index_contact_numbers),
+    ]
@@ -1,12 +1,21 @@
+import re
 from django.db import models
 from accounts.models import User
 
 # Create your models here.
 
+def digits_only(value):
+    """Phone number with spaces, dashes, brackets and '+' removed"""
+    return re.sub(r'\D', '', value or '')
+
+
 class Customer(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='customer_profile')
     phone_number = models.CharField(max_length=20)
     whatsapp_number = models.CharField(max_length=20)
+    # Digits-only copies for search, kept in step by save()
+    phone_digits = models.CharField(max_length=20, blank=True, default='', editable=False)
+    whatsapp_digits = models.CharField(max_length=20, blank=True, default='', editable=False)
     address = models.TextField()
     preferred_contact_method = models.CharField(max_length=20)
     notes = models.TextField()
@@ -21,7 +30,25 @@ class Customer(models.Model):
     def __str__(self):
         return self.user.username
 
+    def save(self, *args, **kwargs):
+        self.phone_digits = digits_only(self.phone_number)
+        self.whatsapp_digits = digits_only(self.whatsapp_number)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if 'phone_number' in update_fields:
+                update_fields.add('phone_digits')
+            if 'whatsapp_number' in update_fields:
+                update_fields.add('whatsapp_digits')
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+
     class Meta:
         db_table = 'customers'
         verbose_name = 'Customer'
-        verbose_name_plural = 'Customers'
\ No newline at end of file
+        verbose_name_plural = 'Customers'
+        # Named as in "laundry database.sql" so both define the same keys
+        constraints = [
+            models.UniqueConstraint(fields=['phone_number'], name='customers_phone_number_key'),
+            models.UniqueConstraint(fields=['whatsapp_number'], name='customers_whatsapp_number_key'),
+        ]
\ No newline at end of file
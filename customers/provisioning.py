@@ -0,0 +1,206 @@
+"""
+Bulk provisioning of customer accounts.
+
+Creating customers one request at a time runs four uniqueness queries and
+one password hash per customer. CustomerProvisioner validates every row's
+fields first, checks usernames, emails, phone and WhatsApp numbers for the
+whole batch with one query each, hashes the default password once and
+inserts the users and customers with bulk_create in a single transaction.
+Invalid rows are reported per row and do not stop the valid ones.
+
+Emails are normalized before the checks, and values are compared
+casefolded within the batch, matching MySQL's case-insensitive
+collation: 'Bob' and 'bob' in one batch are reported as a repeat instead
+of failing the whole insert on the unique index.
+"""
+import logging
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from accounts.models import User
+from accounts.hashing import hash_password
+from .models import Customer, digits_only
+from .serializers import AdminCustomerCreationSerializer
+
+logger = logging.getLogger(__name__)
+
+# (field, model, column, error_code, message) for the batch uniqueness checks
+UNIQUE_CHECKS = (
+    ('username', User, 'username', 'USERNAME_EXISTS', 'Username already taken'),
+    ('email', User, 'email', 'EMAIL_EXISTS', 'Email already registered'),
+    ('phone_number', Customer, 'phone_number', 'PHONE_EXISTS', 'Phone number already registered'),
+    ('whatsapp_number', Customer, 'whatsapp_number', 'WHATSAPP_EXISTS', 'WhatsApp number already registered'),
+)
+
+
+class ProvisioningError(Exception):
+    """Raised when a provisioning request cannot be processed at all"""
+    pass
+
+
+class BulkCustomerRowSerializer(AdminCustomerCreationSerializer):
+    """Field validation for one provisioning row; uniqueness is checked per batch"""
+    check_existing = False
+
+
+class CustomerProvisioner:
+    """Create many customer accounts with the default password"""
+
+    def __init__(self, creator, max_rows=1000):
+        self.creator = creator
+        self.max_rows = max_rows
+
+    def run(self, rows):
+        """Provision the rows and return a summary with one result per row"""
+        if not isinstance(rows, list) or not rows:
+            raise ProvisioningError('Provide a non-empty "customers" list')
+        if len(rows) > self.max_rows:
+            raise ProvisioningError(f'At most {self.max_rows} customers can be provisioned per request')
+
+        results = [None] * len(rows)
+        valid = []
+        for index, row in enumerate(rows):
+            serializer = BulkCustomerRowSerializer(data=row if isinstance(row, dict) else {})
+            if serializer.is_valid():
+                data = serializer.validated_data
+                data['email'] = User.objects.normalize_email(data['email'])
+                valid.append((index, data))
+            else:
+                results[index] = self._error(index, row, *_first_error(serializer.errors))
+
+        valid = self._check_uniqueness(valid, results)
+        if valid:
+            created = self._create(valid)
+            for index, data in valid:
+                user_id, customer_id = created[data['username']]
+                results[index] = {
+                    'row': index + 1,
+                    'status': 'created',
+                    'username': data['username'],
+                    'user_id': user_id,
+                    'customer_id': customer_id,
+                }
+
+        created_count = sum(1 for result in results if result['status'] == 'created')
+        return {
+            'total_rows': len(rows),
+            'created': created_count,
+            'failed': len(rows) - created_count,
+            'results': results,
+        }
+
+    def _check_uniqueness(self, valid, results):
+        """Reject rows clashing with existing accounts or with earlier rows in the batch"""
+        taken = {}
+        for field, model, column, _, _ in UNIQUE_CHECKS:
+            values = {data[field] for _, data in valid}
+            taken[field] = {
+                value.casefold()
+                for value in model.objects.filter(**{f'{column}__in': values}).values_list(column, flat=True)
+            } if values else set()
+
+        accepted = []
+        seen = {field: set() for field, *_ in UNIQUE_CHECKS}
+        for index, data in valid:
+            error = None
+            for field, _, _, error_code, message in UNIQUE_CHECKS:
+                key = data[field].casefold()
+                if key in taken[field]:
+                    error = (error_code, message)
+                    break
+                if key in seen[field]:
+                    error = ('DUPLICATE_IN_BATCH', f'{field} is repeated in this batch')
+                    break
+            if error:
+                results[index] = self._error(index, data, *error)
+                continue
+            for field in seen:
+                seen[field].add(data[field].casefold())
+            accepted.append((index, data))
+        return accepted
+
+    def _create(self, valid):
+        """Insert users and customers; return {username: (user_id, customer_id)}"""
+        now = timezone.now()
+        # Every provisioned account starts with the same default password
+        password_hash = hash_password(settings.DEFAULT_CUSTOMER_PASSWORD)
+
+        users = [
+            User(
+                username=data['username'],
+                email=data['email'],
+                password=password_hash,
+                first_name=data['first_name'],
+                last_name=data['last_name'],
+                role='client',
+                is_active=True,
+                is_staff=False,
+                is_superuser=False,
+                must_change_password=True,
+                date_joined=now,
+                updated_by=self.creator,
+            )
+            for _, data in valid
+        ]
+        usernames = [user.username for user in users]
+
+        with transaction.atomic():
+            User.objects.bulk_create(users)
+            # MySQL does not return ids from bulk inserts, so read them back
+            user_ids = dict(User.objects.filter(username__in=usernames).values_list('username', 'id'))
+
+            Customer.objects.bulk_create([
+                Customer(
+                    user_id=user_ids[data['username']],
+                    phone_number=data['phone_number'],
+                    whatsapp_number=data['whatsapp_number'],
+                    # bulk_create skips save(), which fills these in
+                    phone_digits=digits_only(data['phone_number']),
+                    whatsapp_digits=digits_only(data['whatsapp_number']),
+                    address=data['address'],
+                    preferred_contact_method=data['preferred_contact_method'],
+                    notes=data.get('notes', ''),
+                    created_by=self.creator,
+                    updated_by=self.creator,
+                )
+                for _, data in valid
+            ])
+            customer_ids = dict(
+                Customer.objects.filter(user_id__in=user_ids.values()).values_list('user_id', 'id')
+            )
+
+        # bulk_create skips post_save, so refresh the dashboard counts here
+        from dashboard import cache as dashboard_cache
+        dashboard_cache.invalidate()
+
+        logger.info(f'Provisioned {len(users)} customers for user {self.creator.pk}')
+        return {
+            username: (user_id, customer_ids.get(user_id))
+            for username, user_id in user_ids.items()
+        }
+
+    def _error(self, index, row, error_code, message):
+        return {
+            'row': index + 1,
+            'status': 'error',
+            'username': row.get('username') if isinstance(row, dict) else None,
+            'error_code': error_code,
+            'message': message,
+        }
+
+
+def _first_error(errors):
+    """Pull (error_code, message) out of serializer errors"""
+    for field, detail in errors.items():
+        if isinstance(detail, dict):
+            error_code = detail.get('error_code')
+            message = detail.get('message')
+            if isinstance(error_code, list):
+                error_code = error_code[0] if error_code else None
+            if isinstance(message, list):
+                message = message[0] if message else None
+            if error_code:
+                return str(error_code), str(message)
+        if isinstance(detail, list) and detail:
+            return 'VALIDATION_ERROR', f'{field}: {detail[0]}'
+    return 'VALIDATION_ERROR', 'Invalid row'
@@ -2,6 +2,7 @@ from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 from .models import Customer
 from accounts.models import User
+from accounts.hashing import hash_password
 import re
 
 # Custom exception classes for customer registration errors
@@ -40,6 +41,64 @@ class MissingFieldsError(ValidationError):
     error_code = 'MISSING_FIELDS'
     status_code = 400
 
+# Field -> (exception, error code, message) for values that are already registered
+EXISTS_ERRORS = {
+    'username': (UsernameExistsError, 'USERNAME_EXISTS', 'Username already taken'),
+    'email': (EmailExistsError, 'EMAIL_EXISTS', 'Email already registered'),
+    'phone_number': (PhoneExistsError, 'PHONE_EXISTS', 'Phone number already registered'),
+    'whatsapp_number': (WhatsAppExistsError, 'WHATSAPP_EXISTS', 'WhatsApp number already registered'),
+}
+
+
+def exists_error_detail(field):
+    """Error body for a value that is already registered"""
+    _, error_code, message = EXISTS_ERRORS[field]
+    return {
+        'error_code': error_code,
+        'message': message,
+        'status_code': 409
+    }
+
+
+def find_taken_fields(username, email, phone_number, whatsapp_number):
+    """Return which of the values are already registered, using one UNION query"""
+    from django.db.models import CharField, Value
+    
+    def taken(queryset, field):
+        return queryset.annotate(taken_field=Value(field, output_field=CharField())).values_list('taken_field', flat=True)
+    
+    query = taken(User.objects.filter(username=username), 'username').union(
+        taken(User.objects.filter(email=email), 'email'),
+        taken(Customer.objects.filter(phone_number=phone_number), 'phone_number'),
+        taken(Customer.objects.filter(whatsapp_number=whatsapp_number), 'whatsapp_number'),
+    )
+    return set(query)
+
+
+def check_unique_fields(attrs):
+    """Raise the matching *ExistsError for the first value that is already registered"""
+    taken = find_taken_fields(
+        attrs['username'], attrs['email'], attrs['phone_number'], attrs['whatsapp_number']
+    )
+    for field, (error_class, _, _) in EXISTS_ERRORS.items():
+        if field in taken:
+            # Nested under the field so views report it like a field error
+            raise error_class({field: exists_error_detail(field)})
+
+
+def duplicate_field(integrity_error):
+    """Map a unique constraint IntegrityError to the field it concerns, or None"""
+    message = str(integrity_error).lower()
+    # MySQL names the violated key ("... for key 'customers.customers_phone_number_key'")
+    key = re.search(r"for key '([^']+)'", message)
+    if key:
+        message = key.group(1)
+    for field in ('whatsapp_number', 'phone_number', 'username', 'email'):
+        if field in message:
+            return field
+    return None
+
+
 class CustomerRegistrationSerializer(serializers.Serializer):
     """Serializer for customer self-registration"""
     # User fields
@@ -59,24 +118,17 @@ class CustomerRegistrationSerializer(serializers.Serializer):
     )
     
     def validate_username(self, value):
-        """Check if username is provided and not already taken"""
+        """Check if username is provided"""
         if not value or value.strip() == '':
             raise MissingFieldsError({
                 'error_code': 'MISSING_FIELDS',
                 'message': 'Required fields missing',
                 'status_code': 400
             })
-        
-        if User.objects.filter(username=value).exists():
-            raise UsernameExistsError({
-                'error_code': 'USERNAME_EXISTS',
-                'message': 'Username already taken',
-                'status_code': 409
-            })
         return value
     
     def validate_email(self, value):
-        """Check if email is valid and not already registered"""
+        """Check if email is provided and valid"""
         if not value or value.strip() == '':
             raise MissingFieldsError({
                 'error_code': 'MISSING_FIELDS',
@@ -92,13 +144,6 @@ class CustomerRegistrationSerializer(serializers.Serializer):
                 'message': 'Invalid email format',
                 'status_code': 422
             })
-        
-        if User.objects.filter(email=value).exists():
-            raise EmailExistsError({
-                'error_code': 'EMAIL_EXISTS',
-                'message': 'Email already registered',
-                'status_code': 409
-            })
         return value
     
     def validate_password(self, value):
@@ -119,37 +164,23 @@ class CustomerRegistrationSerializer(serializers.Serializer):
         return value
     
     def validate_phone_number(self, value):
-        """Check if phone number is provided and not already registered"""
+        """Check if phone number is provided"""
         if not value or value.strip() == '':
             raise MissingFieldsError({
                 'error_code': 'MISSING_FIELDS',
                 'message': 'Required fields missing',
                 'status_code': 400
             })
-        
-        if Customer.objects.filter(phone_number=value).exists():
-            raise PhoneExistsError({
-                'error_code': 'PHONE_EXISTS',
-                'message': 'Phone number already registered',
-                'status_code': 409
-            })
         return value
     
     def validate_whatsapp_number(self, value):
-        """Check if whatsapp number is provided and not already registered"""
+        """Check if whatsapp number is provided"""
         if not value or value.strip() == '':
             raise MissingFieldsError({
                 'error_code': 'MISSING_FIELDS',
                 'message': 'Required fields missing',
                 'status_code': 400
             })
-        
-        if Customer.objects.filter(whatsapp_number=value).exists():
-            raise WhatsAppExistsError({
-                'error_code': 'WHATSAPP_EXISTS',
-                'message': 'WhatsApp number already registered',
-                'status_code': 409
-            })
         return value
     
     def validate_first_name(self, value):
@@ -182,6 +213,11 @@ class CustomerRegistrationSerializer(serializers.Serializer):
             })
         return value
     
+    def validate(self, attrs):
+        """Check username, email and both phone numbers in one query"""
+        check_unique_fields(attrs)
+        return attrs
+    
     def create(self, validated_data):
         """Create User and Customer in a transaction"""
         from django.db import transaction
@@ -194,7 +230,8 @@ class CustomerRegistrationSerializer(serializers.Serializer):
         user_data = {
             'username': validated_data['username'],
             'email': validated_data['email'],
-            'password': validated_data['password'],
+            # Hashed before the transaction so no DB transaction waits on it
+            'password_hash': hash_password(validated_data['password']),
             'first_name': validated_data['first_name'],
             'last_name': validated_data['last_name'],
             'role': 'client',
@@ -253,25 +290,21 @@ class AdminCustomerCreationSerializer(serializers.Serializer):
     )
     notes = serializers.CharField(required=False, allow_blank=True, default='')
     
+    # Bulk provisioning checks uniqueness for the whole batch instead
+    check_existing = True
+    
     def validate_username(self, value):
-        """Check if username is provided and not already exists"""
+        """Check if username is provided"""
         if not value or value.strip() == '':
             raise MissingFieldsError({
                 'error_code': 'MISSING_FIELDS',
                 'message': 'Required fields missing',
                 'status_code': 400
             })
-        
-        if User.objects.filter(username=value).exists():
-            raise UsernameExistsError({
-                'error_code': 'USERNAME_EXISTS',
-                'message': 'Username already taken',
-                'status_code': 409
-            })
         return value
     
     def validate_email(self, value):
-        """Check if email is provided, valid, and not already exists"""
+        """Check if email is provided and valid"""
         if not value or value.strip() == '':
             raise MissingFieldsError({
                 'error_code': 'MISSING_FIELDS',
@@ -287,30 +320,16 @@ class AdminCustomerCreationSerializer(serializers.Serializer):
                 'message': 'Invalid email format',
                 'status_code': 422
             })
-        
-        if User.objects.filter(email=value).exists():
-            raise EmailExistsError({
-                'error_code': 'EMAIL_EXISTS',
-                'message': 'Email already registered',
-                'status_code': 409
-            })
         return value
     
     def validate_phone_number(self, value):
-        """Check if phone number is provided and not already exists"""
+        """Check if phone number is provided"""
         if not value or value.strip() == '':
             raise MissingFieldsError({
                 'error_code': 'MISSING_FIELDS',
                 'message': 'Required fields missing',
                 'status_code': 400
             })
-        
-        if Customer.objects.filter(phone_number=value).exists():
-            raise PhoneExistsError({
-                'error_code': 'PHONE_EXISTS',
-                'message': 'Phone number already registered',
-                'status_code': 409
-            })
         return value
     
     def validate_first_name(self, value):
@@ -344,22 +363,21 @@ class AdminCustomerCreationSerializer(serializers.Serializer):
         return value
     
     def validate_whatsapp_number(self, value):
-        """Check if whatsapp number is provided and not already registered"""
+        """Check if whatsapp number is provided"""
         if not value or value.strip() == '':
             raise MissingFieldsError({
                 'error_code': 'MISSING_FIELDS',
                 'message': 'Required fields missing',
                 'status_code': 400
             })
-        
-        if Customer.objects.filter(whatsapp_number=value).exists():
-            raise WhatsAppExistsError({
-                'error_code': 'WHATSAPP_EXISTS',
-                'message': 'WhatsApp number already registered',
-                'status_code': 409
-            })
         return value
     
+    def validate(self, attrs):
+        """Check username, email and both phone numbers in one query"""
+        if self.check_existing:
+            check_unique_fields(attrs)
+        return attrs
+    
     def create(self, validated_data):
         """Create User and Customer with default password"""
         from django.db import transaction
@@ -376,13 +394,15 @@ class AdminCustomerCreationSerializer(serializers.Serializer):
         user_data = {
             'username': validated_data['username'],
             'email': validated_data['email'],
-            'password': settings.DEFAULT_CUSTOMER_PASSWORD,  # Default password
+            # Default password, hashed before the transaction so no DB transaction waits on it
+            'password_hash': hash_password(settings.DEFAULT_CUSTOMER_PASSWORD),
             'first_name': validated_data['first_name'],
             'last_name': validated_data['last_name'],
             'role': 'client',
             'is_active': True,
             'is_staff': False,
             'is_superuser': False,
+            'must_change_password': True,
         }
         
         customer_data = {
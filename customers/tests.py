@@ -1,3 +1,51 @@
 from django.test import TestCase
+from accounts.models import User
+from .provisioning import CustomerProvisioner
 
-# Create your tests here.
+
+class CustomerProvisionerTests(TestCase):
+    """Batch uniqueness checks must agree with the database's case-insensitive keys"""
+
+    def setUp(self):
+        self.creator = User.objects.create_user(
+            username='staff1', email='staff1@example.com', password='password', role='admin'
+        )
+
+    def row(self, username, email, phone):
+        return {
+            'username': username,
+            'email': email,
+            'first_name': 'First',
+            'last_name': 'Last',
+            'phone_number': phone,
+            'whatsapp_number': phone,
+            'address': 'Accra',
+            'preferred_contact_method': 'phone',
+        }
+
+    def test_case_variants_in_one_batch_are_reported_not_inserted(self):
+        summary = CustomerProvisioner(self.creator).run([
+            self.row('Bob', 'bob@example.com', '0241110001'),
+            self.row('bob', 'other@example.com', '0241110002'),
+            self.row('carol', 'BOB@Example.com', '0241110003'),
+        ])
+
+        self.assertEqual(summary['created'], 1)
+        self.assertEqual(
+            [result['status'] for result in summary['results']], ['created', 'error', 'error']
+        )
+        self.assertEqual(summary['results'][1]['error_code'], 'DUPLICATE_IN_BATCH')
+        self.assertEqual(summary['results'][2]['error_code'], 'DUPLICATE_IN_BATCH')
+
+    def test_email_domain_is_normalized_before_the_check(self):
+        User.objects.create_user(username='dave', email='dave@example.com', password='password')
+
+        summary = CustomerProvisioner(self.creator).run([self.row('dave2', 'dave@EXAMPLE.com', '0241110004')])
+
+        self.assertEqual(summary['results'][0]['error_code'], 'EMAIL_EXISTS')
+
+    def test_summary_does_not_echo_the_default_password(self):
+        summary = CustomerProvisioner(self.creator).run([self.row('erin', 'erin@example.com', '0241110005')])
+
+        self.assertEqual(summary['created'], 1)
+        self.assertNotIn('default_password', summary)
@@ -1,7 +1,11 @@
 from django.urls import path
-from .views import CustomerRegistrationView, AdminCustomerCreationView
+from accounts.async_views import async_view
+from .views import CustomerRegistrationView, AdminCustomerCreationView, BulkCustomerProvisioningView
 
 urlpatterns = [
     path('register/', CustomerRegistrationView.as_view(), name='customer_register'),
+    path('register/async/', async_view(CustomerRegistrationView), name='customer_register_async'),
     path('create/', AdminCustomerCreationView.as_view(), name='admin_create_customer'),
+    path('create/async/', async_view(AdminCustomerCreationView), name='admin_create_customer_async'),
+    path('bulk/', BulkCustomerProvisioningView.as_view(), name='bulk_provision_customers'),
 ]
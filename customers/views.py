@@ -18,9 +18,13 @@ from .serializers import (
     PhoneExistsError,
     WhatsAppExistsError,
     InvalidPasswordError,
-    InvalidEmailError
+    InvalidEmailError,
+    duplicate_field,
+    exists_error_detail
 )
 from accounts.serializers import UserSerializer
+from accounts.hashing import HashingBusyError
+from .provisioning import CustomerProvisioner, ProvisioningError
 import logging
 
 logger = logging.getLogger(__name__)
@@ -192,40 +196,22 @@ class CustomerRegistrationView(APIView):
                 'status_code': 422
             }, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
         
+        except HashingBusyError as e:
+            # Password hashing pool is saturated
+            return Response(e.detail, status=e.status_code)
+        
         except IntegrityError as e:
-            # Handle database integrity errors (duplicate keys, etc.)
-            error_message = str(e)
-            if 'whatsapp_number' in error_message.lower() or 'whatsapp_number_key' in error_message.lower():
-                return Response({
-                    'error_code': 'WHATSAPP_EXISTS',
-                    'message': 'WhatsApp number already registered',
-                    'status_code': 409
-                }, status=status.HTTP_409_CONFLICT)
-            elif 'phone_number' in error_message.lower() or 'phone_number_key' in error_message.lower():
-                return Response({
-                    'error_code': 'PHONE_EXISTS',
-                    'message': 'Phone number already registered',
-                    'status_code': 409
-                }, status=status.HTTP_409_CONFLICT)
-            elif 'username' in error_message.lower():
-                return Response({
-                    'error_code': 'USERNAME_EXISTS',
-                    'message': 'Username already taken',
-                    'status_code': 409
-                }, status=status.HTTP_409_CONFLICT)
-            elif 'email' in error_message.lower():
-                return Response({
-                    'error_code': 'EMAIL_EXISTS',
-                    'message': 'Email already registered',
-                    'status_code': 409
-                }, status=status.HTTP_409_CONFLICT)
-            else:
-                logger.error(f'Database integrity error: {str(e)}', exc_info=True)
-                return Response({
-                    'error_code': 'DUPLICATE_ENTRY',
-                    'message': 'A record with this information already exists',
-                    'status_code': 409
-                }, status=status.HTTP_409_CONFLICT)
+            # A concurrent request registered the same value after validation;
+            # the unique indexes reject it and it is reported like the validation error
+            field = duplicate_field(e)
+            if field:
+                return Response(exists_error_detail(field), status=status.HTTP_409_CONFLICT)
+            logger.error(f'Database integrity error: {str(e)}', exc_info=True)
+            return Response({
+                'error_code': 'DUPLICATE_ENTRY',
+                'message': 'A record with this information already exists',
+                'status_code': 409
+            }, status=status.HTTP_409_CONFLICT)
             
         except Exception as e:
             # Log the error for debugging
@@ -383,40 +369,22 @@ class AdminCustomerCreationView(AutoRefreshTokenMixin, APIView):
                 'status_code': 422
             }, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
         
+        except HashingBusyError as e:
+            # Password hashing pool is saturated
+            return Response(e.detail, status=e.status_code)
+        
         except IntegrityError as e:
-            # Handle database integrity errors (duplicate keys, etc.)
-            error_message = str(e)
-            if 'whatsapp_number' in error_message.lower() or 'whatsapp_number_key' in error_message.lower():
-                return Response({
-                    'error_code': 'WHATSAPP_EXISTS',
-                    'message': 'WhatsApp number already registered',
-                    'status_code': 409
-                }, status=status.HTTP_409_CONFLICT)
-            elif 'phone_number' in error_message.lower() or 'phone_number_key' in error_message.lower():
-                return Response({
-                    'error_code': 'PHONE_EXISTS',
-                    'message': 'Phone number already registered',
-                    'status_code': 409
-                }, status=status.HTTP_409_CONFLICT)
-            elif 'username' in error_message.lower():
-                return Response({
-                    'error_code': 'USERNAME_EXISTS',
-                    'message': 'Username already taken',
-                    'status_code': 409
-                }, status=status.HTTP_409_CONFLICT)
-            elif 'email' in error_message.lower():
-                return Response({
-                    'error_code': 'EMAIL_EXISTS',
-                    'message': 'Email already registered',
-                    'status_code': 409
-                }, status=status.HTTP_409_CONFLICT)
-            else:
-                logger.error(f'Database integrity error: {str(e)}', exc_info=True)
-                return Response({
-                    'error_code': 'DUPLICATE_ENTRY',
-                    'message': 'A record with this information already exists',
-                    'status_code': 409
-                }, status=status.HTTP_409_CONFLICT)
+            # A concurrent request registered the same value after validation;
+            # the unique indexes reject it and it is reported like the validation error
+            field = duplicate_field(e)
+            if field:
+                return Response(exists_error_detail(field), status=status.HTTP_409_CONFLICT)
+            logger.error(f'Database integrity error: {str(e)}', exc_info=True)
+            return Response({
+                'error_code': 'DUPLICATE_ENTRY',
+                'message': 'A record with this information already exists',
+                'status_code': 409
+            }, status=status.HTTP_409_CONFLICT)
             
         except Exception as e:
             # Log the error for debugging
@@ -427,3 +395,46 @@ class AdminCustomerCreationView(AutoRefreshTokenMixin, APIView):
                 'status_code': 500
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+
+class BulkCustomerProvisioningView(AutoRefreshTokenMixin, APIView):
+    """Staff create many customers with the default password in one request"""
+    permission_classes = [IsAuthenticated, IsStaff]
+    
+    def post(self, request):
+        """Provision customers; invalid rows are reported without blocking the rest"""
+        try:
+            summary = CustomerProvisioner(request.user).run(request.data.get('customers'))
+            
+            return Response({
+                'status': 'success',
+                'message': f"Created {summary['created']} of {summary['total_rows']} customers",
+                'data': summary
+            }, status=status.HTTP_200_OK)
+            
+        except ProvisioningError as e:
+            return Response({
+                'error_code': 'INVALID_REQUEST',
+                'message': str(e),
+                'status_code': 400
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        except HashingBusyError as e:
+            # Password hashing pool is saturated
+            return Response(e.detail, status=e.status_code)
+        
+        except IntegrityError as e:
+            # Another request created one of these accounts after the batch was checked
+            logger.warning(f'Bulk customer provisioning conflict: {str(e)}')
+            return Response({
+                'error_code': 'CONFLICT',
+                'message': 'Some of these customers were created by another request. Please retry.',
+                'status_code': 409
+            }, status=status.HTTP_409_CONFLICT)
+        
+        except Exception as e:
+            logger.error(f'Bulk customer provisioning error: {str(e)}', exc_info=True)
+            return Response({
+                'error_code': 'SERVER_ERROR',
+                'message': 'Failed to provision customers',
+                'status_code': 500
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
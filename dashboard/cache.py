@@ -0,0 +1,109 @@
+"""
+Cache layer for dashboard metrics.
+
+Superadmin and admin metrics are shared by every user of that role; employee
+and client metrics are cached per user. Writes to orders, payments and users
+bump a generation counter, which invalidates every cached entry at once.
+"""
+import logging
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import InvalidCacheBackendError
+
+logger = logging.getLogger(__name__)
+
+GENERATION_KEY = 'dashboard:metrics:generation'
+HITS_KEY = 'dashboard:metrics:hits'
+MISSES_KEY = 'dashboard:metrics:misses'
+
+# Roles whose metrics do not depend on the requesting user
+SHARED_ROLES = ('superadmin', 'admin')
+
+
+def get_cache():
+    """Return the cache used for dashboard metrics"""
+    try:
+        return caches['dashboard']
+    except InvalidCacheBackendError:
+        return caches['default']
+
+
+def get_timeout():
+    """Configured TTL, capped at DASHBOARD_CACHE_MAX_TIMEOUT"""
+    timeout = getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 60)
+    ceiling = getattr(settings, 'DASHBOARD_CACHE_MAX_TIMEOUT', 300)
+    return max(0, min(timeout, ceiling))
+
+
+def is_bypassed(request):
+    """Check if the request asked to skip the cache (?nocache=1 or Cache-Control: no-cache)"""
+    if request.query_params.get('nocache', '').lower() in ('1', 'true', 'yes'):
+        return True
+    cache_control = request.META.get('HTTP_CACHE_CONTROL', '')
+    return 'no-cache' in cache_control or 'no-store' in cache_control
+
+
+def make_key(user, generation):
+    """Build the cache key for a user's dashboard metrics"""
+    if user.role in SHARED_ROLES:
+        return f'dashboard:metrics:v{generation}:{user.role}'
+    return f'dashboard:metrics:v{generation}:{user.role}:{user.pk}'
+
+
+def get_metrics(user):
+    """Return cached metrics for the user, or None on a miss"""
+    cache = get_cache()
+    generation = cache.get_or_set(GENERATION_KEY, 1, timeout=None)
+    data = cache.get(make_key(user, generation))
+    _incr(cache, HITS_KEY if data is not None else MISSES_KEY)
+    return data
+
+
+def set_metrics(user, data):
+    """Store metrics for the user"""
+    timeout = get_timeout()
+    if not timeout:
+        return
+    cache = get_cache()
+    generation = cache.get_or_set(GENERATION_KEY, 1, timeout=None)
+    cache.set(make_key(user, generation), data, timeout=timeout)
+
+
+def invalidate():
+    """Invalidate all cached dashboard metrics"""
+    cache = get_cache()
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        # Generation key missing or evicted, start a new one
+        cache.set(GENERATION_KEY, 1, timeout=None)
+    except Exception as e:
+        logger.warning(f'Dashboard cache invalidation failed: {str(e)}')
+
+
+def get_stats():
+    """Return hit/miss counters for the dashboard cache"""
+    cache = get_cache()
+    counters = cache.get_many([HITS_KEY, MISSES_KEY, GENERATION_KEY])
+    hits = counters.get(HITS_KEY, 0)
+    misses = counters.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'backend': getattr(settings, 'DASHBOARD_CACHE_BACKEND', 'locmem'),
+        'timeout': get_timeout(),
+        'generation': counters.get(GENERATION_KEY, 1),
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / total, 4) if total else 0.0
+    }
+
+
+def _incr(cache, key):
+    """Increment a counter, creating it if needed"""
+    try:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, timeout=None)
+    except Exception as e:
+        logger.debug(f'Dashboard cache counter update failed: {str(e)}')
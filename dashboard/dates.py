@@ -0,0 +1,32 @@
+"""
+Date range helpers for filtering timestamp columns.
+
+Filtering with ``created_at__date=...`` wraps the column in DATE() (or a
+timezone conversion), which stops MySQL from using the created_at indexes.
+These helpers turn calendar dates into half-open aware datetime bounds so
+queries can filter with ``created_at__gte=start, created_at__lt=end``.
+"""
+from datetime import datetime, time, timedelta
+from django.db.models import Q
+from django.utils import timezone
+
+
+def day_start(day):
+    """Aware datetime at midnight of a calendar day in the current timezone"""
+    value = datetime.combine(day, time.min)
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return value
+
+
+def date_range_bounds(start_date, end_date=None):
+    """Half-open [start, end) datetimes covering start_date through end_date inclusive"""
+    if end_date is None:
+        end_date = start_date
+    return day_start(start_date), day_start(end_date + timedelta(days=1))
+
+
+def date_range_q(start_date, end_date=None, field='created_at'):
+    """Q object matching rows whose timestamp field falls on the given calendar dates"""
+    start, end = date_range_bounds(start_date, end_date)
+    return Q(**{f'{field}__gte': start, f'{field}__lt': end})
@@ -0,0 +1,34 @@
+import time
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from dashboard.rollups import rebuild_range
+
+
+class Command(BaseCommand):
+    help = 'Backfill or rebuild the daily_rollups table from orders and payments'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='First date to rebuild (YYYY-MM-DD); defaults to all history')
+        parser.add_argument('--end', help='Last date to rebuild (YYYY-MM-DD); defaults to today')
+
+    def handle(self, *args, **options):
+        start_date = self._parse_date(options.get('start'), '--start')
+        end_date = self._parse_date(options.get('end'), '--end')
+        if start_date and end_date and end_date < start_date:
+            raise CommandError('--end must not be before --start')
+
+        started = time.monotonic()
+        rows = rebuild_range(start_date, end_date)
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {rows} daily rollup rows in {elapsed:.2f}s'
+        ))
+
+    def _parse_date(self, value, option):
+        if not value:
+            return None
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f'{option} must be in YYYY-MM-DD format')
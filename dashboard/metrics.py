@@ -0,0 +1,156 @@
+"""
+Aggregate engine for dashboard metrics.
+
+Each role's dashboard numbers are computed with a single conditional
+aggregation per table (one pass over ``orders``, one over ``users``)
+instead of one COUNT/SUM query per metric.
+"""
+from decimal import Decimal
+from django.db.models import Q, Sum, Count
+from orders.models import Order, balance_expression
+from accounts.models import User
+from .dates import date_range_q
+
+
+def aggregate_order_metrics(queryset, today):
+    """Compute status counts, revenue and outstanding balance for an order scope in one query"""
+    today_filter = date_range_q(today)
+
+    totals = queryset.order_by().aggregate(
+        total_orders=Count('id'),
+        pending_orders=Count('id', filter=Q(order_status='pending')),
+        in_progress_orders=Count('id', filter=Q(order_status='in_progress')),
+        ready_orders=Count('id', filter=Q(order_status='ready')),
+        today_orders=Count('id', filter=today_filter),
+        # Revenue is the sum of amount_paid (actual payments received)
+        total_revenue=Sum('amount_paid'),
+        today_revenue=Sum('amount_paid', filter=today_filter),
+        total_billed=Sum('total_amount'),
+        # Outstanding is what is still owed on orders that are not fully paid
+        total_outstanding=Sum(balance_expression(), filter=~Q(payment_status='paid')),
+    )
+
+    # SUM over an empty set returns NULL
+    for key in ('total_revenue', 'today_revenue', 'total_billed', 'total_outstanding'):
+        if totals[key] is None:
+            totals[key] = Decimal('0')
+
+    return totals
+
+
+def aggregate_user_metrics():
+    """Count customers and staff in one query"""
+    return User.objects.aggregate(
+        total_customers=Count('id', filter=Q(role='client')),
+        total_staff=Count('id', filter=Q(role__in=['admin', 'employee'])),
+    )
+
+
+def get_superadmin_metrics(user, today):
+    """Get metrics for superadmin"""
+    orders = aggregate_order_metrics(Order.objects.all(), today)
+    users = aggregate_user_metrics()
+
+    return {
+        'total_customers': users['total_customers'],
+        'total_staff': users['total_staff'],
+        'total_orders': orders['total_orders'],
+        'total_revenue': orders['total_revenue'],
+        'today_orders': orders['today_orders'],
+        'today_revenue': orders['today_revenue'],
+        'pending_orders': orders['pending_orders'],
+        'in_progress_orders': orders['in_progress_orders'],
+        'ready_for_pickup': orders['ready_orders'],
+        'total_outstanding': orders['total_outstanding'],
+        'recent_orders': get_recent_orders(Order.objects.all())
+    }
+
+
+def get_admin_metrics(user, today):
+    """Get metrics for admin"""
+    orders = aggregate_order_metrics(Order.objects.all(), today)
+    users = aggregate_user_metrics()
+
+    return {
+        'total_customers': users['total_customers'],
+        'total_orders': orders['total_orders'],
+        'total_revenue': orders['total_revenue'],
+        'today_orders': orders['today_orders'],
+        'today_revenue': orders['today_revenue'],
+        'pending_orders': orders['pending_orders'],
+        'ready_for_pickup': orders['ready_orders'],
+        'recent_orders': get_recent_orders(Order.objects.all())
+    }
+
+
+def get_employee_metrics(user, today):
+    """Get metrics for employee - scoped to orders assigned to them"""
+    scope = Order.objects.filter(assigned_to=user)
+    orders = aggregate_order_metrics(scope, today)
+
+    my_assigned_orders = []
+    for order in scope.select_related('customer__user').order_by('-created_at')[:10]:
+        my_assigned_orders.append({
+            'id': order.id,
+            'order_number': order.order_number,
+            'customer_name': _customer_name(order),
+            'total_amount': order.total_amount,
+            'status': order.order_status,
+            'estimated_completion': order.estimated_completion_date
+        })
+
+    return {
+        'my_orders': orders['total_orders'],
+        'my_pending': orders['pending_orders'],
+        'my_in_progress': orders['in_progress_orders'],
+        'my_today_orders': orders['today_orders'],
+        'my_revenue': orders['total_billed'],
+        'my_assigned_orders': my_assigned_orders
+    }
+
+
+def get_client_metrics(customer, today):
+    """Get metrics for client - scoped to the customer's own orders"""
+    scope = Order.objects.filter(customer=customer)
+    orders = aggregate_order_metrics(scope, today)
+
+    recent_orders = []
+    for order in scope.with_balance().order_by('-created_at')[:10]:
+        recent_orders.append({
+            'id': order.id,
+            'order_number': order.order_number,
+            'total_amount': order.total_amount,
+            'balance': order.balance,
+            'status': order.order_status,
+            'created_at': order.created_at.date() if order.created_at else None
+        })
+
+    return {
+        'total_orders': orders['total_orders'],
+        # Total spent is the sum of amount_paid (actual payments made)
+        'total_spent': orders['total_revenue'],
+        'pending_orders': orders['pending_orders'],
+        'ready_for_pickup': orders['ready_orders'],
+        'recent_orders': recent_orders
+    }
+
+
+def get_recent_orders(queryset, limit=10):
+    """Get the most recent orders in a scope as dashboard rows"""
+    recent_orders = []
+    for order in queryset.select_related('customer__user').order_by('-created_at')[:limit]:
+        recent_orders.append({
+            'id': order.id,
+            'order_number': order.order_number,
+            'customer_name': _customer_name(order),
+            'total_amount': order.total_amount,
+            'status': order.order_status
+        })
+    return recent_orders
+
+
+def _customer_name(order):
+    """Full name of the order's customer, or None if the order has no linked user"""
+    if order.customer and order.customer.user:
+        return f"{order.customer.user.first_name} {order.customer.user.last_name}".strip()
+    return None
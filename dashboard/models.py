@@ -1,3 +1,28 @@
 from django.db import models
 
 # Create your models here.
+class DailyRollup(models.Model):
+    """Pre-aggregated daily counters for reports.
+
+    Rows with an empty payment_method hold the order intake count for the day;
+    rows per payment method hold successful transaction totals.
+    """
+    date = models.DateField(db_column='date')
+    payment_method = models.CharField(max_length=20, blank=True, default='', db_column='payment_method')
+    order_count = models.IntegerField(default=0, db_column='order_count')
+    transaction_count = models.IntegerField(default=0, db_column='transaction_count')
+    gross_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0, db_column='gross_amount')
+    fees_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0, db_column='fees_amount')
+    min_amount = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, db_column='min_amount')
+    max_amount = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, db_column='max_amount')
+    updated_at = models.DateTimeField(auto_now=True, db_column='updated_at')
+
+    def __str__(self):
+        return f"{self.date} {self.payment_method or 'orders'}"
+
+    class Meta:
+        db_table = 'daily_rollups'
+        verbose_name = 'Daily Rollup'
+        verbose_name_plural = 'Daily Rollups'
+        ordering = ['-date', 'payment_method']
+        unique_together = [('date', 'payment_method')]
@@ -0,0 +1,223 @@
+"""
+Incremental maintenance of the daily_rollups table.
+
+Order creation bumps the day's intake row; successful payments add to the
+row for their (date, payment_method). Changes that cannot be applied as a
+simple increment (a payment leaving the success state, or a successful
+payment being edited) recompute the affected day from source instead.
+The ProcessPayment procedure updates its day's row itself. Other writes
+made outside Django are picked up by the rebuild_daily_rollup management
+command; until then, revenue_rows() reads the current day live from the
+payments table so today's figures are never behind.
+"""
+import logging
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import F, Sum, Count, Min, Max, Value
+from django.db.models.functions import Coalesce, Greatest, Least, TruncDate
+from django.utils import timezone
+from .models import DailyRollup
+from .dates import day_start, date_range_bounds
+
+logger = logging.getLogger(__name__)
+
+# payment_method value for the order intake row
+ORDERS_ROW = ''
+
+
+def rollup_date(value):
+    """Calendar date a timestamp is counted under"""
+    if timezone.is_aware(value):
+        return timezone.localdate(value)
+    return value.date()
+
+
+def record_order_created(order):
+    """Count a new order on its creation day"""
+    _increment(rollup_date(order.created_at), ORDERS_ROW, order_count=F('order_count') + 1)
+
+
+def record_order_deleted(order):
+    """Remove a deleted order from its creation day"""
+    _increment(rollup_date(order.created_at), ORDERS_ROW, order_count=Greatest(F('order_count') - 1, Value(0)))
+
+
+def record_payment_saved(payment, previous=None):
+    """Apply a saved payment to the rollup.
+
+    ``previous`` is the payment's stored state before the save (a dict with
+    status, amount, fees, payment_method and created_at), or None for new rows.
+    """
+    was_success = previous is not None and previous['status'] == 'success'
+    is_success = payment.status == 'success'
+
+    if not was_success and not is_success:
+        return
+
+    if not was_success and is_success:
+        # Common case: a payment was just confirmed
+        amount = payment.amount
+        _increment(
+            rollup_date(payment.created_at),
+            payment.payment_method,
+            transaction_count=F('transaction_count') + 1,
+            gross_amount=F('gross_amount') + amount,
+            fees_amount=F('fees_amount') + (payment.fees or Decimal('0')),
+            min_amount=Least(Coalesce(F('min_amount'), Value(amount)), Value(amount)),
+            max_amount=Greatest(Coalesce(F('max_amount'), Value(amount)), Value(amount)),
+        )
+        return
+
+    unchanged = (
+        is_success
+        and previous['amount'] == payment.amount
+        and previous['fees'] == payment.fees
+        and previous['payment_method'] == payment.payment_method
+    )
+    if unchanged:
+        return
+
+    # Payment left the success state or was edited: recompute the affected days
+    try:
+        with transaction.atomic():
+            rebuild_day(rollup_date(previous['created_at']), previous['payment_method'])
+            if is_success:
+                rebuild_day(rollup_date(payment.created_at), payment.payment_method)
+    except Exception as e:
+        logger.error(f'Daily rollup rebuild failed for payment {payment.pk}: {str(e)}', exc_info=True)
+
+
+def rebuild_day(day, payment_method):
+    """Recompute one (date, payment_method) rollup row from the payments table"""
+    from payments.models import Payment
+
+    start, end = date_range_bounds(day)
+    totals = Payment.objects.filter(
+        status='success',
+        payment_method=payment_method,
+        created_at__gte=start,
+        created_at__lt=end
+    ).aggregate(
+        transaction_count=Count('id'),
+        gross_amount=Sum('amount'),
+        fees_amount=Sum('fees'),
+        min_amount=Min('amount'),
+        max_amount=Max('amount')
+    )
+    DailyRollup.objects.update_or_create(
+        date=day,
+        payment_method=payment_method,
+        defaults={
+            'transaction_count': totals['transaction_count'],
+            'gross_amount': totals['gross_amount'] or Decimal('0'),
+            'fees_amount': totals['fees_amount'] or Decimal('0'),
+            'min_amount': totals['min_amount'],
+            'max_amount': totals['max_amount'],
+        }
+    )
+
+
+def revenue_rows(start_date, end_date):
+    """
+    Successful payment totals per (date, payment_method) for a date range,
+    as dicts with date, payment_method, transaction_count, gross_amount,
+    min_amount and max_amount. Past days come from the rollup; today is
+    aggregated live over its created_at range.
+    """
+    from payments.models import Payment
+
+    fields = ('date', 'payment_method', 'transaction_count', 'gross_amount', 'min_amount', 'max_amount')
+    today = timezone.localdate()
+    includes_today = start_date <= today <= end_date
+
+    rollups = DailyRollup.objects.filter(
+        date__gte=start_date,
+        date__lte=end_date,
+        transaction_count__gt=0
+    ).exclude(payment_method=ORDERS_ROW)
+    if includes_today:
+        rollups = rollups.exclude(date=today)
+    rows = list(rollups.order_by('-date', 'payment_method').values(*fields))
+
+    if includes_today:
+        start, end = date_range_bounds(today)
+        live = Payment.objects.filter(
+            status='success',
+            created_at__gte=start,
+            created_at__lt=end
+        ).values('payment_method').annotate(
+            transaction_count=Count('id'),
+            gross_amount=Sum('amount'),
+            min_amount=Min('amount'),
+            max_amount=Max('amount')
+        ).order_by('payment_method')
+        # Today sorts first, matching the -date ordering of the rollup rows
+        rows[:0] = [{'date': today, **group} for group in live]
+    return rows
+
+
+def rebuild_range(start_date=None, end_date=None):
+    """Rebuild rollup rows from orders and payments; returns the number of rows written"""
+    from orders.models import Order
+    from payments.models import Payment
+
+    orders = Order.objects.order_by()
+    payments = Payment.objects.filter(status='success').order_by()
+    rollups = DailyRollup.objects.all()
+    if start_date:
+        start = day_start(start_date)
+        orders = orders.filter(created_at__gte=start)
+        payments = payments.filter(created_at__gte=start)
+        rollups = rollups.filter(date__gte=start_date)
+    if end_date:
+        _, end = date_range_bounds(end_date)
+        orders = orders.filter(created_at__lt=end)
+        payments = payments.filter(created_at__lt=end)
+        rollups = rollups.filter(date__lte=end_date)
+
+    rows = {}
+    for group in orders.values(day=TruncDate('created_at')).annotate(order_count=Count('id')):
+        rows[(group['day'], ORDERS_ROW)] = DailyRollup(
+            date=group['day'],
+            payment_method=ORDERS_ROW,
+            order_count=group['order_count']
+        )
+
+    payment_groups = payments.values(
+        day=TruncDate('created_at'),
+        method=F('payment_method')
+    ).annotate(
+        transaction_count=Count('id'),
+        gross_amount=Sum('amount'),
+        fees_amount=Sum('fees'),
+        min_amount=Min('amount'),
+        max_amount=Max('amount')
+    )
+    for group in payment_groups:
+        rows[(group['day'], group['method'])] = DailyRollup(
+            date=group['day'],
+            payment_method=group['method'],
+            transaction_count=group['transaction_count'],
+            gross_amount=group['gross_amount'] or Decimal('0'),
+            fees_amount=group['fees_amount'] or Decimal('0'),
+            min_amount=group['min_amount'],
+            max_amount=group['max_amount']
+        )
+
+    with transaction.atomic():
+        rollups.delete()
+        DailyRollup.objects.bulk_create(rows.values(), batch_size=500)
+
+    return len(rows)
+
+
+def _increment(day, payment_method, **updates):
+    """Apply F() updates to a rollup row, creating it first if needed"""
+    try:
+        with transaction.atomic():
+            row, _ = DailyRollup.objects.get_or_create(date=day, payment_method=payment_method)
+            DailyRollup.objects.filter(pk=row.pk).update(**updates)
+    except Exception as e:
+        # Reports can be repaired with rebuild_daily_rollup; never fail the write itself
+        logger.error(f'Daily rollup update failed for {day} {payment_method!r}: {str(e)}', exc_info=True)
+
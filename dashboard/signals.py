@@ -0,0 +1,77 @@
+from django.db import transaction
+from django.db.models.signals import post_init, pre_save, post_save, post_delete
+from django.dispatch import receiver
+from orders.models import Order
+from payments.models import Payment
+from accounts.models import User
+from . import cache as dashboard_cache
+from . import rollups
+
+# Payment fields the daily rollup depends on
+ROLLUP_FIELDS = ('status', 'amount', 'fees', 'payment_method', 'created_at')
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+@receiver(post_save, sender=Payment)
+def invalidate_dashboard_on_write(sender, **kwargs):
+    """Order and payment writes change dashboard metrics"""
+    # After commit, so a concurrent request cannot re-cache the old numbers
+    transaction.on_commit(dashboard_cache.invalidate)
+
+
+@receiver(post_save, sender=User)
+def invalidate_dashboard_on_user_save(sender, instance, created, update_fields=None, **kwargs):
+    """User writes change customer/staff counts; skip saves that only touch login bookkeeping"""
+    if not created and update_fields and set(update_fields) <= {'last_login', 'updated_at'}:
+        return
+    transaction.on_commit(dashboard_cache.invalidate)
+
+
+@receiver(post_save, sender=Order)
+def rollup_order_created(sender, instance, created, **kwargs):
+    """Count new orders in the daily rollup"""
+    if created:
+        rollups.record_order_created(instance)
+
+
+@receiver(post_delete, sender=Order)
+def rollup_order_deleted(sender, instance, **kwargs):
+    """Remove deleted orders from the daily rollup"""
+    rollups.record_order_deleted(instance)
+
+
+@receiver(post_init, sender=Payment)
+def snapshot_payment_state(sender, instance, **kwargs):
+    """Remember the rollup fields as loaded, to tell whether a save changed them"""
+    # Deferred fields would cost a query each; those saves fetch the state instead
+    if instance.pk and not instance.get_deferred_fields() & set(ROLLUP_FIELDS):
+        instance._rollup_loaded = tuple(getattr(instance, field) for field in ROLLUP_FIELDS)
+
+
+@receiver(pre_save, sender=Payment)
+def remember_payment_state(sender, instance, update_fields=None, **kwargs):
+    """Keep the stored payment state so post_save can apply the difference"""
+    instance._rollup_previous = None
+    instance._rollup_unchanged = False
+    if not instance.pk:
+        return
+    if update_fields is not None and not set(update_fields) & set(ROLLUP_FIELDS):
+        instance._rollup_unchanged = True
+        return
+    loaded = getattr(instance, '_rollup_loaded', None)
+    if loaded is not None and loaded == tuple(getattr(instance, field) for field in ROLLUP_FIELDS):
+        instance._rollup_unchanged = True
+        return
+    instance._rollup_previous = Payment.objects.filter(pk=instance.pk).values(*ROLLUP_FIELDS).first()
+
+
+@receiver(post_save, sender=Payment)
+def rollup_payment_saved(sender, instance, created, **kwargs):
+    """Apply successful payments to the daily rollup"""
+    if not created and getattr(instance, '_rollup_unchanged', False):
+        return
+    previous = None if created else getattr(instance, '_rollup_previous', None)
+    rollups.record_payment_saved(instance, previous)
+    # The saved values are the baseline for the next save of this instance
+    instance._rollup_loaded = tuple(getattr(instance, field) for field in ROLLUP_FIELDS)
@@ -1,3 +1,31 @@
+import re
+from datetime import date
 from django.test import TestCase
+from orders.models import Order
+from .dates import date_range_q
 
-# Create your tests here.
+
+class DateRangeFilterTests(TestCase):
+    """Date filters must compare created_at directly so its indexes stay usable"""
+
+    def assert_sargable(self, queryset):
+        sql = str(queryset.query)
+        where = sql[sql.index(' WHERE '):]
+        # The column is compared as-is, with a half-open range
+        self.assertRegex(where, r'"orders"\."created_at" >= ')
+        self.assertRegex(where, r'"orders"\."created_at" < ')
+        # ...and never wrapped in a function such as DATE() or a timezone cast
+        self.assertIsNone(re.search(r'\w+\(\s*"orders"\."created_at"', where), where)
+
+    def test_today_filter(self):
+        today = date(2026, 3, 15)
+        self.assert_sargable(Order.objects.filter(date_range_q(today)))
+
+    def test_this_month_filter(self):
+        today = date(2026, 3, 15)
+        self.assert_sargable(Order.objects.filter(date_range_q(today.replace(day=1), today)))
+
+    def test_date_lookup_is_rejected_by_the_check(self):
+        # Guard the assertion itself: created_at__date wraps the column
+        with self.assertRaises(AssertionError):
+            self.assert_sargable(Order.objects.filter(created_at__date=date(2026, 3, 15)))
@@ -1,8 +1,9 @@
 from django.urls import path
-from .views import DashboardMetricsView, RevenueReportView
+from .views import DashboardMetricsView, DashboardCacheStatsView, RevenueReportView
 
 urlpatterns = [
     path('', DashboardMetricsView.as_view(), name='dashboard_home'),
     path('metrics/', DashboardMetricsView.as_view(), name='dashboard_metrics'),
+    path('metrics/cache/', DashboardCacheStatsView.as_view(), name='dashboard_cache_stats'),
     path('revenue-report/', RevenueReportView.as_view(), name='revenue_report'),
 ]
@@ -1,5 +1,5 @@
 import logging
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 from decimal import Decimal
 from django.db.models import Q, Sum, Count, Min, Max, Avg
 from django.db import connection
@@ -11,11 +11,15 @@ from rest_framework import status
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.exceptions import ValidationError
 from accounts.mixins import AutoRefreshTokenMixin
-from accounts.permissions import IsAdminOrSuperadmin
+from accounts.permissions import IsAdminOrSuperadmin, IsSuperadmin
+from accounts.policy import get_policy
 from orders.models import Order
-from customers.models import Customer
 from payments.models import Payment
 from accounts.models import User
+from . import metrics
+from .rollups import revenue_rows
+from .dates import date_range_q
+from . import cache as dashboard_cache
 from .serializers import (
     SuperadminDashboardSerializer,
     AdminDashboardSerializer,
@@ -73,20 +77,33 @@ class DashboardMetricsView(AutoRefreshTokenMixin, APIView):
                 }, status=status.HTTP_401_UNAUTHORIZED)
             
             user = request.user
-            today = timezone.now().date()
+            today = timezone.localdate()
+            
+            # Serve cached metrics unless the request opts out
+            bypass_cache = dashboard_cache.is_bypassed(request)
+            if not bypass_cache:
+                cached = dashboard_cache.get_metrics(user)
+                if cached is not None:
+                    response = Response({
+                        'status': 'success',
+                        'data': cached
+                    }, status=status.HTTP_200_OK)
+                    response['X-Dashboard-Cache'] = 'HIT'
+                    return response
             
             # Get metrics based on role
-            if user.role == 'superadmin':
+            policy = get_policy(request)
+            if policy.is_superadmin:
                 data = self._get_superadmin_metrics(user, today)
                 serializer = SuperadminDashboardSerializer(data=data)
-            elif user.role == 'admin':
+            elif policy.is_admin:
                 data = self._get_admin_metrics(user, today)
                 serializer = AdminDashboardSerializer(data=data)
-            elif user.role == 'employee':
+            elif policy.is_employee:
                 data = self._get_employee_metrics(user, today)
                 serializer = EmployeeDashboardSerializer(data=data)
-            elif user.role == 'client':
-                data = self._get_client_metrics(user, today)
+            elif policy.is_client:
+                data = self._get_client_metrics(policy, today)
                 serializer = ClientDashboardSerializer(data=data)
             else:
                 return Response({
@@ -97,10 +114,16 @@ class DashboardMetricsView(AutoRefreshTokenMixin, APIView):
             
             # Validate the data
             serializer.is_valid(raise_exception=True)
-            return Response({
+            
+            if not bypass_cache:
+                dashboard_cache.set_metrics(user, serializer.validated_data)
+            
+            response = Response({
                 'status': 'success',
                 'data': serializer.validated_data
             }, status=status.HTTP_200_OK)
+            response['X-Dashboard-Cache'] = 'BYPASS' if bypass_cache else 'MISS'
+            return response
             
         except Exception as e:
             logger.error(f'Dashboard metrics error: {str(e)}', exc_info=True)
@@ -112,142 +135,20 @@ class DashboardMetricsView(AutoRefreshTokenMixin, APIView):
     
     def _get_superadmin_metrics(self, user, today):
         """Get metrics for superadmin"""
-        total_customers = User.objects.filter(role='client').count()
-        total_staff = User.objects.filter(role__in=['admin', 'employee']).count()
-        total_orders = Order.objects.count()
-        # Total revenue should be sum of amount_paid (actual payments received)
-        total_revenue = Order.objects.aggregate(total=Sum('amount_paid'))['total'] or Decimal('0')
-        today_orders = Order.objects.filter(created_at__date=today).count()
-        # Today's revenue should be sum of amount_paid for today's orders
-        today_revenue = Order.objects.filter(created_at__date=today).aggregate(total=Sum('amount_paid'))['total'] or Decimal('0')
-        pending_orders = Order.objects.filter(order_status='pending').count()
-        in_progress_orders = Order.objects.filter(order_status='in_progress').count()
-        ready_for_pickup = Order.objects.filter(order_status='ready').count()
-        
-        # Calculate total outstanding (sum of (total_amount - amount_paid) for unpaid orders)
-        unpaid_orders = Order.objects.filter(~Q(payment_status='paid'))
-        total_outstanding = Decimal('0')
-        for order in unpaid_orders:
-            total_outstanding += (order.total_amount - order.amount_paid)
-        
-        # Get recent orders (last 10)
-        recent_orders_qs = Order.objects.select_related(
-            'customer__user'
-        ).order_by('-created_at')[:10]
-        
-        recent_orders = []
-        for order in recent_orders_qs:
-            customer_name = None
-            if order.customer and order.customer.user:
-                customer_name = f"{order.customer.user.first_name} {order.customer.user.last_name}".strip()
-            
-            recent_orders.append({
-                'id': order.id,
-                'order_number': order.order_number,
-                'customer_name': customer_name,
-                'total_amount': order.total_amount,
-                'status': order.order_status
-            })
-        
-        return {
-            'total_customers': total_customers,
-            'total_staff': total_staff,
-            'total_orders': total_orders,
-            'total_revenue': total_revenue,
-            'today_orders': today_orders,
-            'today_revenue': today_revenue,
-            'pending_orders': pending_orders,
-            'in_progress_orders': in_progress_orders,
-            'ready_for_pickup': ready_for_pickup,
-            'total_outstanding': total_outstanding,
-            'recent_orders': recent_orders
-        }
+        return metrics.get_superadmin_metrics(user, today)
     
     def _get_admin_metrics(self, user, today):
         """Get metrics for admin"""
-        total_customers = User.objects.filter(role='client').count()
-        total_orders = Order.objects.count()
-        # Total revenue should be sum of amount_paid (actual payments received)
-        total_revenue = Order.objects.aggregate(total=Sum('amount_paid'))['total'] or Decimal('0')
-        today_orders = Order.objects.filter(created_at__date=today).count()
-        # Today's revenue should be sum of amount_paid for today's orders
-        today_revenue = Order.objects.filter(created_at__date=today).aggregate(total=Sum('amount_paid'))['total'] or Decimal('0')
-        pending_orders = Order.objects.filter(order_status='pending').count()
-        ready_for_pickup = Order.objects.filter(order_status='ready').count()
-        
-        # Get recent orders (last 10)
-        recent_orders_qs = Order.objects.select_related(
-            'customer__user'
-        ).order_by('-created_at')[:10]
-        
-        recent_orders = []
-        for order in recent_orders_qs:
-            customer_name = None
-            if order.customer and order.customer.user:
-                customer_name = f"{order.customer.user.first_name} {order.customer.user.last_name}".strip()
-            
-            recent_orders.append({
-                'id': order.id,
-                'order_number': order.order_number,
-                'customer_name': customer_name,
-                'total_amount': order.total_amount,
-                'status': order.order_status
-            })
-        
-        return {
-            'total_customers': total_customers,
-            'total_orders': total_orders,
-            'total_revenue': total_revenue,
-            'today_orders': today_orders,
-            'today_revenue': today_revenue,
-            'pending_orders': pending_orders,
-            'ready_for_pickup': ready_for_pickup,
-            'recent_orders': recent_orders
-        }
+        return metrics.get_admin_metrics(user, today)
     
     def _get_employee_metrics(self, user, today):
         """Get metrics for employee"""
-        my_orders = Order.objects.filter(assigned_to=user).count()
-        my_pending = Order.objects.filter(assigned_to=user, order_status='pending').count()
-        my_in_progress = Order.objects.filter(assigned_to=user, order_status='in_progress').count()
-        my_today_orders = Order.objects.filter(assigned_to=user, created_at__date=today).count()
-        my_revenue = Order.objects.filter(assigned_to=user).aggregate(total=Sum('total_amount'))['total'] or Decimal('0')
-        
-        # Get assigned orders
-        assigned_orders_qs = Order.objects.filter(
-            assigned_to=user
-        ).select_related(
-            'customer__user'
-        ).order_by('-created_at')[:10]
-        
-        my_assigned_orders = []
-        for order in assigned_orders_qs:
-            customer_name = None
-            if order.customer and order.customer.user:
-                customer_name = f"{order.customer.user.first_name} {order.customer.user.last_name}".strip()
-            
-            my_assigned_orders.append({
-                'id': order.id,
-                'order_number': order.order_number,
-                'customer_name': customer_name,
-                'status': order.order_status,
-                'estimated_completion': order.estimated_completion_date
-            })
-        
-        return {
-            'my_orders': my_orders,
-            'my_pending': my_pending,
-            'my_in_progress': my_in_progress,
-            'my_today_orders': my_today_orders,
-            'my_revenue': my_revenue,
-            'my_assigned_orders': my_assigned_orders
-        }
+        return metrics.get_employee_metrics(user, today)
     
-    def _get_client_metrics(self, user, today):
+    def _get_client_metrics(self, policy, today):
         """Get metrics for client"""
-        try:
-            customer = Customer.objects.get(user=user)
-        except Customer.DoesNotExist:
+        customer = policy.customer
+        if customer is None:
             return {
                 'total_orders': 0,
                 'total_spent': Decimal('0'),
@@ -256,36 +157,27 @@ class DashboardMetricsView(AutoRefreshTokenMixin, APIView):
                 'recent_orders': []
             }
         
-        total_orders = Order.objects.filter(customer=customer).count()
-        # Total spent should be sum of amount_paid (actual payments made)
-        total_spent = Order.objects.filter(customer=customer).aggregate(total=Sum('amount_paid'))['total'] or Decimal('0')
-        pending_orders = Order.objects.filter(customer=customer, order_status='pending').count()
-        ready_for_pickup = Order.objects.filter(customer=customer, order_status='ready').count()
-        
-        # Get recent orders (last 10)
-        recent_orders_qs = Order.objects.filter(
-            customer=customer
-        ).order_by('-created_at')[:10]
-        
-        recent_orders = []
-        for order in recent_orders_qs:
-            balance = order.total_amount - order.amount_paid
-            recent_orders.append({
-                'id': order.id,
-                'order_number': order.order_number,
-                'total_amount': order.total_amount,
-                'balance': balance,
-                'status': order.order_status,
-                'created_at': order.created_at.date() if order.created_at else None
-            })
-        
-        return {
-            'total_orders': total_orders,
-            'total_spent': total_spent,
-            'pending_orders': pending_orders,
-            'ready_for_pickup': ready_for_pickup,
-            'recent_orders': recent_orders
-        }
+        return metrics.get_client_metrics(customer, today)
+
+
+class DashboardCacheStatsView(AutoRefreshTokenMixin, APIView):
+    """Get dashboard cache hit/miss counters"""
+    permission_classes = [IsAuthenticated, IsSuperadmin]
+    
+    def get(self, request, *args, **kwargs):
+        """Get cache statistics"""
+        return Response({
+            'status': 'success',
+            'data': dashboard_cache.get_stats()
+        }, status=status.HTTP_200_OK)
+    
+    def delete(self, request, *args, **kwargs):
+        """Invalidate all cached dashboard metrics"""
+        dashboard_cache.invalidate()
+        return Response({
+            'status': 'success',
+            'message': 'Dashboard cache cleared'
+        }, status=status.HTTP_200_OK)
 
 
 class RevenueReportView(AutoRefreshTokenMixin, APIView):
@@ -296,7 +188,7 @@ class RevenueReportView(AutoRefreshTokenMixin, APIView):
         """Get revenue report"""
         try:
             # Validate permissions
-            if request.user.role not in ['admin', 'superadmin']:
+            if not get_policy(request).can('view_revenue'):
                 return Response({
                     'error_code': 'INSUFFICIENT_PERMISSIONS',
                     'message': 'Only admins and superadmins can view revenue reports',
@@ -335,78 +227,59 @@ class RevenueReportView(AutoRefreshTokenMixin, APIView):
                     'status_code': 400
                 }, status=status.HTTP_400_BAD_REQUEST)
             
-            # Get revenue data
-            payments = Payment.objects.filter(
-                status='success',
-                created_at__date__gte=start_date,
-                created_at__date__lte=end_date
-            ).select_related('created_by', 'order')
+            # Revenue totals come from the daily rollup, with today read live
+            rows = revenue_rows(start_date, end_date)
             
             # Calculate summary
-            summary = payments.aggregate(
-                unique_orders=Count('order_id', distinct=True),
-                total_transactions=Count('id'),
-                grand_total=Sum('amount'),
-                min_transaction=Min('amount'),
-                max_transaction=Max('amount'),
-                average_transaction=Avg('amount')
-            )
+            amounts = [row['min_amount'] for row in rows] + [row['max_amount'] for row in rows]
+            amounts = [amount for amount in amounts if amount is not None]
+            summary = {
+                'total_transactions': sum(row['transaction_count'] for row in rows),
+                'grand_total': sum((row['gross_amount'] or Decimal('0') for row in rows), Decimal('0')),
+                'min_transaction': min(amounts, default=None),
+                'max_transaction': max(amounts, default=None),
+            }
+            # Distinct orders cannot be summed across days; this is answered
+            # from the (status, created_at, order_id) index without reading rows
+            summary['unique_orders'] = Payment.objects.filter(
+                date_range_q(start_date, end_date),
+                status='success'
+            ).aggregate(unique_orders=Count('order_id', distinct=True))['unique_orders']
+            summary['average_transaction'] = None
+            if summary['total_transactions']:
+                summary['average_transaction'] = (
+                    summary['grand_total'] / summary['total_transactions']
+                ).quantize(Decimal('0.01'))
             
             # Get daily breakdown
             daily_breakdown = []
             if group_by == 'day':
-                # Group by date and payment method
-                from django.db.models.functions import TruncDate
-                from django.db.models import F
-                
-                payment_groups = payments.values(
-                    date=TruncDate('created_at'),
-                    payment_method=F('payment_method')
-                ).annotate(
-                    transaction_count=Count('id'),
-                    total_amount=Sum('amount')
-                ).order_by('-date', 'payment_method')
-                
-                for group in payment_groups:
+                # One row per date and payment method
+                for row in rows:
                     daily_breakdown.append({
-                        'date': group['date'].strftime('%Y-%m-%d'),
-                        'payment_method': group['payment_method'],
-                        'transaction_count': group['transaction_count'],
-                        'total_amount': group['total_amount']
-                    })
-            elif group_by == 'week':
-                # Group by week
-                from django.db.models.functions import TruncWeek
-                payment_groups = payments.values(
-                    week=TruncWeek('created_at')
-                ).annotate(
-                    transaction_count=Count('id'),
-                    total_amount=Sum('amount')
-                ).order_by('-week')
-                
-                for group in payment_groups:
-                    daily_breakdown.append({
-                        'date': group['week'].strftime('%Y-%m-%d'),
-                        'payment_method': 'all',
-                        'transaction_count': group['transaction_count'],
-                        'total_amount': group['total_amount']
+                        'date': row['date'].strftime('%Y-%m-%d'),
+                        'payment_method': row['payment_method'],
+                        'transaction_count': row['transaction_count'],
+                        'total_amount': row['gross_amount']
                     })
-            elif group_by == 'month':
-                # Group by month
-                from django.db.models.functions import TruncMonth
-                payment_groups = payments.values(
-                    month=TruncMonth('created_at')
-                ).annotate(
-                    transaction_count=Count('id'),
-                    total_amount=Sum('amount')
-                ).order_by('-month')
+            elif group_by in ('week', 'month'):
+                # Group by week (starting Monday) or month
+                periods = {}
+                for row in rows:
+                    if group_by == 'week':
+                        period = row['date'] - timedelta(days=row['date'].weekday())
+                    else:
+                        period = row['date'].replace(day=1)
+                    totals = periods.setdefault(period, {'transaction_count': 0, 'total_amount': Decimal('0')})
+                    totals['transaction_count'] += row['transaction_count']
+                    totals['total_amount'] += row['gross_amount'] or Decimal('0')
                 
-                for group in payment_groups:
+                for period in sorted(periods, reverse=True):
                     daily_breakdown.append({
-                        'date': group['month'].strftime('%Y-%m-%d'),
+                        'date': period.strftime('%Y-%m-%d'),
                         'payment_method': 'all',
-                        'transaction_count': group['transaction_count'],
-                        'total_amount': group['total_amount']
+                        'transaction_count': periods[period]['transaction_count'],
+                        'total_amount': periods[period]['total_amount']
                     })
             
             return Response({
@@ -27,6 +27,8 @@ CREATE TABLE users (
     date_joined TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     updated_by BIGINT NULL,
+    must_change_password BOOLEAN DEFAULT FALSE,
+    token_version INT UNSIGNED NOT NULL DEFAULT 0,
     
     -- Foreign key for self-reference (who updated this user)
     CONSTRAINT fk_users_updated_by 
@@ -38,7 +40,10 @@ CREATE TABLE users (
     INDEX idx_users_role (role),
     INDEX idx_users_email (email),
     INDEX idx_users_is_active (is_active),
-    INDEX idx_users_date_joined (date_joined)
+    INDEX idx_users_date_joined (date_joined),
+    
+    -- Full-text (ngram) index for partial name/username/email search
+    FULLTEXT INDEX ft_users_search (username, email, first_name, last_name) WITH PARSER ngram
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- =====================================================
@@ -50,6 +55,9 @@ CREATE TABLE customers (
     user_id BIGINT UNIQUE NOT NULL,
     phone_number VARCHAR(20) NOT NULL,
     whatsapp_number VARCHAR(20),
+    -- Digits-only copies of the numbers above, for phone search
+    phone_digits VARCHAR(20) NOT NULL DEFAULT '',
+    whatsapp_digits VARCHAR(20) NOT NULL DEFAULT '',
     address TEXT NOT NULL,
     preferred_contact_method VARCHAR(20) DEFAULT 'phone',
     notes TEXT,
@@ -86,7 +94,10 @@ CREATE TABLE customers (
     INDEX idx_customers_user_id (user_id),
     INDEX idx_customers_phone (phone_number),
     INDEX idx_customers_created_by (created_by),
-    INDEX idx_customers_total_orders (total_orders DESC)
+    INDEX idx_customers_total_orders (total_orders DESC),
+    
+    -- Full-text (ngram) index for partial phone/WhatsApp number search (digits only)
+    FULLTEXT INDEX ft_customers_contact (phone_digits, whatsapp_digits) WITH PARSER ngram
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- =====================================================
@@ -125,7 +136,10 @@ CREATE TABLE services (
     -- Indexes for services
     INDEX idx_services_is_active (is_active),
     INDEX idx_services_category (category),
-    INDEX idx_services_price (price)
+    INDEX idx_services_price (price),
+    
+    -- Full-text (ngram) index for service search
+    FULLTEXT INDEX ft_services_search (name, description) WITH PARSER ngram
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- =====================================================
@@ -287,6 +301,8 @@ CREATE TABLE payments (
     INDEX idx_payments_status (status),
     INDEX idx_payments_method (payment_method),
     INDEX idx_payments_created_at (created_at),
+    -- Covers distinct-order counts over a date range (revenue report)
+    INDEX idx_payments_status_created_order (status, created_at, order_id),
     INDEX idx_payments_created_by (created_by),
     INDEX idx_payments_verified_at (verified_at),
     
@@ -394,6 +410,53 @@ CREATE TABLE notifications (
     INDEX idx_notifications_created_by (created_by)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
+-- =====================================================
+-- Table: daily_rollups
+-- Pre-aggregated daily order and revenue counters for reports
+-- (payment_method '' holds the order intake count for the day)
+-- =====================================================
+CREATE TABLE daily_rollups (
+    id BIGINT PRIMARY KEY AUTO_INCREMENT,
+    date DATE NOT NULL,
+    payment_method VARCHAR(20) NOT NULL DEFAULT '',
+    order_count INT NOT NULL DEFAULT 0,
+    transaction_count INT NOT NULL DEFAULT 0,
+    gross_amount DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    fees_amount DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    min_amount DECIMAL(12, 2) NULL,
+    max_amount DECIMAL(12, 2) NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    
+    -- One row per day and payment method
+    CONSTRAINT daily_rollups_date_method_key UNIQUE (date, payment_method),
+    
+    CONSTRAINT daily_rollups_counts_non_negative CHECK (order_count >= 0 AND transaction_count >= 0)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- =====================================================
+-- Table: payment_webhook_events
+-- Raw Paystack webhook events, one row per event id
+-- (rows are never deleted; only the processing columns change)
+-- =====================================================
+CREATE TABLE payment_webhook_events (
+    id BIGINT PRIMARY KEY AUTO_INCREMENT,
+    event_id VARCHAR(150) NOT NULL,
+    event_type VARCHAR(50) NOT NULL,
+    reference VARCHAR(100) NULL,
+    payload JSON NOT NULL,
+    status ENUM('received', 'processed', 'ignored', 'failed') NOT NULL DEFAULT 'received',
+    attempts INT NOT NULL DEFAULT 0,
+    error TEXT NULL,
+    received_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    processed_at TIMESTAMP NULL,
+    
+    -- Paystack retries deliveries; the same event is stored once
+    CONSTRAINT payment_webhook_events_event_id_key UNIQUE (event_id),
+    
+    INDEX idx_webhook_events_status (status, id),
+    INDEX idx_webhook_events_reference (reference)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
 -- =====================================================
 -- Functions and Triggers for Business Logic
 -- =====================================================
@@ -480,34 +543,27 @@ BEGIN
 END$$
 
 -- Trigger to update order payment status after payment insert
+-- Adds the new payment to amount_paid instead of re-summing every payment
+-- of the order. payment_status is set first because MySQL applies SET
+-- assignments left to right, so it still reads the old amount_paid.
+-- amount_paid is held at total_amount (as in ProcessPayment and
+-- payments/balances.py), so an overpayment marks the order paid instead of
+-- failing orders_amount_paid_valid.
+-- Payments inserted as pending are credited by the application when they
+-- are verified (see payments/balances.py).
 CREATE TRIGGER update_order_payment_status
     AFTER INSERT ON payments
     FOR EACH ROW
 BEGIN
-    DECLARE order_total DECIMAL(12, 2);
-    DECLARE total_paid DECIMAL(12, 2);
-    
     IF NEW.status = 'success' THEN
-        -- Get order total
-        SELECT total_amount INTO order_total
-        FROM orders
-        WHERE id = NEW.order_id;
-        
-        -- Calculate total paid for this order
-        SELECT COALESCE(SUM(amount), 0) INTO total_paid
-        FROM payments
-        WHERE order_id = NEW.order_id AND status = 'success';
-        
-        -- Update order amount_paid and payment_status
         UPDATE orders
         SET 
-            amount_paid = total_paid,
             payment_status = CASE 
-                WHEN total_paid <= 0 THEN 'pending'
-                WHEN total_paid < order_total THEN 'partially_paid'
-                WHEN total_paid >= order_total THEN 'paid'
-                ELSE payment_status
-            END
+                WHEN amount_paid + NEW.amount <= 0 THEN 'pending'
+                WHEN amount_paid + NEW.amount < total_amount THEN 'partially_paid'
+                ELSE 'paid'
+            END,
+            amount_paid = LEAST(amount_paid + NEW.amount, total_amount)
         WHERE id = NEW.order_id;
     END IF;
 END$$
@@ -703,8 +759,9 @@ BEGIN
     WHERE id = p_order_id
     FOR UPDATE;
     
-    -- Calculate new paid amount
-    SET v_new_paid = v_current_paid + p_amount;
+    -- Calculate new paid amount, held at the order total like the
+    -- update_order_payment_status trigger and payments/balances.py
+    SET v_new_paid = LEAST(v_current_paid + p_amount, v_order_total);
     
     -- Insert payment record
     INSERT INTO payments (
@@ -717,6 +774,18 @@ BEGIN
     
     SET v_payment_id = LAST_INSERT_ID();
     
+    -- Count the payment in today's revenue rollup (dates are UTC, as in Django)
+    INSERT INTO daily_rollups (
+        date, payment_method, transaction_count, gross_amount, min_amount, max_amount
+    ) VALUES (
+        UTC_DATE(), p_method, 1, p_amount, p_amount, p_amount
+    )
+    ON DUPLICATE KEY UPDATE
+        transaction_count = transaction_count + 1,
+        gross_amount = gross_amount + p_amount,
+        min_amount = LEAST(COALESCE(min_amount, p_amount), p_amount),
+        max_amount = GREATEST(COALESCE(max_amount, p_amount), p_amount);
+    
     -- Update order
     UPDATE orders
     SET 
@@ -1,9 +1,38 @@
+from decimal import Decimal
 from django.db import models
+from django.db.models import F, Q, Sum, ExpressionWrapper
 from customers.models import Customer
 from accounts.models import User
 from services.models import Service
 
 # Create your models here.
+def balance_expression():
+    """Database expression for what is still owed on an order (total_amount - amount_paid)"""
+    return ExpressionWrapper(
+        F('total_amount') - F('amount_paid'),
+        output_field=models.DecimalField(max_digits=12, decimal_places=2)
+    )
+
+
+class OrderQuerySet(models.QuerySet):
+    """Reusable order filters and balance calculations done in the database"""
+
+    def with_balance(self):
+        """Annotate each order with its outstanding balance"""
+        return self.annotate(balance=balance_expression())
+
+    def outstanding(self):
+        """Orders that are not fully paid"""
+        return self.filter(~Q(payment_status='paid'))
+
+    def outstanding_total(self):
+        """Sum of balances across orders that are not fully paid"""
+        total = self.outstanding().order_by().aggregate(
+            total=Sum(balance_expression())
+        )['total']
+        return total or Decimal('0')
+
+
 class Order(models.Model):
     order_number = models.CharField(max_length=50, unique=True, db_column='order_number')
     customer = models.ForeignKey(Customer, on_delete=models.RESTRICT, db_column='customer_id')
@@ -44,6 +73,8 @@ class Order(models.Model):
     updated_at = models.DateTimeField(auto_now=True, db_column='updated_at')
     updated_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='orders_updated', db_column='updated_by')
 
+    objects = OrderQuerySet.as_manager()
+
     def __str__(self):
         return f"Order {self.order_number} - {self.customer.user.username}"
 
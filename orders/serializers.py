@@ -1,3 +1,4 @@
+from django.db import transaction
 from rest_framework import serializers
 from .models import Order, OrderItem
 from customers.models import Customer
@@ -53,6 +54,18 @@ class OrderSerializer(serializers.ModelSerializer):
             return f"{obj.customer.user.first_name} {obj.customer.user.last_name}"
         return None
     
+    def validate_order_items_data(self, value):
+        """Coerce each service_id to int, so it matches the keys in_bulk returns"""
+        items = []
+        for item_data in value:
+            service_id = item_data.get('service_id')
+            try:
+                service_id = int(service_id)
+            except (ValueError, TypeError):
+                raise serializers.ValidationError(f'Invalid service ID: {service_id}')
+            items.append({**item_data, 'service_id': service_id})
+        return items
+    
     def validate(self, data):
         # Only validate order items if this is a create operation (order_items_data provided)
         order_items_data = data.get('order_items_data', [])
@@ -102,16 +115,16 @@ class OrderSerializer(serializers.ModelSerializer):
         if user:
             validated_data['created_by'] = user
         
-        # Create order
-        order = Order.objects.create(**validated_data)
+        # Look up every service in one query (ids are ints after validation)
+        service_ids = [item_data['service_id'] for item_data in order_items_data]
+        services = Service.objects.in_bulk(set(service_ids))
         
-        # Create order items
+        # Build order items before touching the database
         total_amount = Decimal('0.00')
-        for item_data in order_items_data:
-            service_id = item_data.get('service_id')
-            try:
-                service = Service.objects.get(id=service_id)
-            except Service.DoesNotExist:
+        order_items = []
+        for item_data, service_id in zip(order_items_data, service_ids):
+            service = services.get(service_id)
+            if service is None:
                 raise serializers.ValidationError({'order_items_data': f'Service with id {service_id} not found'})
             
             quantity = item_data.get('quantity', 1)
@@ -119,8 +132,7 @@ class OrderSerializer(serializers.ModelSerializer):
             subtotal = quantity * unit_price
             total_amount += subtotal
             
-            OrderItem.objects.create(
-                order=order,
+            order_items.append(OrderItem(
                 service=service,
                 item_name=item_data.get('item_name', service.name),
                 description=item_data.get('description', service.description),
@@ -128,12 +140,25 @@ class OrderSerializer(serializers.ModelSerializer):
                 unit_price=unit_price,
                 subtotal=subtotal,
                 notes=item_data.get('notes', '')
-            )
+            ))
         
-        # Update order total (subtract discount if any)
+        # Order total (subtract discount if any)
         discount = Decimal(str(validated_data.get('discount_amount', 0)))
-        order.total_amount = total_amount - discount
-        order.save()
+        total_amount = total_amount - discount
+        
+        with transaction.atomic():
+            # Create order
+            order = Order.objects.create(**validated_data)
+            
+            # Create all order items in a single insert
+            for order_item in order_items:
+                order_item.order = order
+            OrderItem.objects.bulk_create(order_items)
+            
+            # Write the final total once; this also overrides the item triggers'
+            # recalculated total, which does not account for the discount
+            Order.objects.filter(pk=order.pk).update(total_amount=total_amount)
+            order.total_amount = total_amount
         
         return order
     
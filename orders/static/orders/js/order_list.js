@@ -1,6 +1,8 @@
 // Orders list functionality
 let orderStatusFilter = '';
 let paymentStatusFilter = '';
+let nextCursor = null;
+let loadedOrders = [];
 
 document.addEventListener('DOMContentLoaded', function() {
     loadOrders();
@@ -43,13 +45,22 @@ function setupEventListeners() {
         paymentStatusFilter = this.value;
         loadOrders();
     });
+    
+    const loadMoreBtn = document.getElementById('loadMoreBtn');
+    if (loadMoreBtn) {
+        loadMoreBtn.addEventListener('click', function() {
+            loadOrders(true);
+        });
+    }
 }
 
-async function loadOrders() {
+async function loadOrders(append = false) {
     try {
         const params = new URLSearchParams();
         if (orderStatusFilter) params.append('order_status', orderStatusFilter);
         if (paymentStatusFilter) params.append('payment_status', paymentStatusFilter);
+        // Continue from the last loaded order when loading more
+        if (append && nextCursor) params.append('cursor', nextCursor);
         
         const response = await fetch(`/api/orders/list/?${params}`, {
             method: 'GET',
@@ -81,7 +92,12 @@ async function loadOrders() {
             }
         }
         
-        renderOrders(data.data || []);
+        const pageOrders = data.data || [];
+        loadedOrders = append ? loadedOrders.concat(pageOrders) : pageOrders;
+        nextCursor = data.next_cursor || null;
+        
+        renderOrders(loadedOrders);
+        updateLoadMore();
     } catch (error) {
         console.error('Error loading orders:', error);
         document.getElementById('ordersTableBody').innerHTML = `
@@ -157,6 +173,13 @@ function renderOrders(orders) {
     }).join('');
 }
 
+function updateLoadMore() {
+    const loadMoreBtn = document.getElementById('loadMoreBtn');
+    if (loadMoreBtn) {
+        loadMoreBtn.style.display = nextCursor ? 'inline-block' : 'none';
+    }
+}
+
 function formatStatus(status) {
     const statusMap = {
         'pending': 'Pending',
@@ -1,3 +1,26 @@
-from django.test import TestCase
+from django.test import SimpleTestCase
+from .serializers import OrderSerializer
 
-# Create your tests here.
+
+class OrderItemsValidationTests(SimpleTestCase):
+    """service_id must reach the in_bulk lookup as an int"""
+
+    def validate_items(self, *service_ids):
+        serializer = OrderSerializer(data={
+            'customer_id': 1,
+            'order_items_data': [{'service_id': service_id, 'quantity': 1} for service_id in service_ids]
+        })
+        return serializer, serializer.is_valid()
+
+    def test_numeric_strings_are_coerced(self):
+        serializer, valid = self.validate_items('3', 4, ' 5 ')
+        self.assertTrue(valid, serializer.errors)
+        self.assertEqual(
+            [item['service_id'] for item in serializer.validated_data['order_items_data']], [3, 4, 5]
+        )
+
+    def test_non_numeric_ids_are_rejected(self):
+        for service_id in ('abc', None, '1.5'):
+            serializer, valid = self.validate_items(service_id)
+            self.assertFalse(valid)
+            self.assertIn('order_items_data', serializer.errors)
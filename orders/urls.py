@@ -4,6 +4,7 @@ from . import views
 urlpatterns = [
     path('list/', views.OrderListView.as_view(), name='orders_list'),
     path('create/', views.OrderCreateView.as_view(), name='order_create'),
+    path('import/', views.OrderImportView.as_view(), name='order_import'),
     path('<int:id>/update/', views.OrderUpdateView.as_view(), name='order_update'),
     path('<int:id>/', views.OrderDetailView.as_view(), name='order_detail'),
 ]
@@ -8,9 +8,11 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.exceptions import AuthenticationFailed, NotAuthenticated, PermissionDenied, ValidationError, NotFound
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from accounts.permissions import IsAdminOrSuperadmin, IsStaff
+from accounts.policy import get_policy
+from accounts.pagination import KeysetPaginator, InvalidCursorError
 from .models import Order
 from .serializers import OrderSerializer
-from customers.models import Customer
+from .importer import OrderImporter, ImportFormatError, detect_format
 import logging
 
 logger = logging.getLogger(__name__)
@@ -18,6 +20,7 @@ logger = logging.getLogger(__name__)
 class OrderListView(APIView):
     permission_classes = [IsAuthenticated]
     serializer_class = OrderSerializer
+    paginator = KeysetPaginator(ordering=('-created_at', 'id'))
 
     def get(self, request, *args, **kwargs):
         """Render order list template or return JSON data"""
@@ -32,18 +35,14 @@ class OrderListView(APIView):
     def _get_orders_json(self, request):
         """Get list of orders with role-based filtering"""
         try:
-            user = request.user
+            policy = get_policy(request)
             
             # Staff (admin, superadmin, employee) can see all orders
-            if user.role in ['admin', 'superadmin', 'employee']:
+            if policy.can('view_all_orders'):
                 queryset = Order.objects.all().select_related('customer__user', 'assigned_to', 'created_by')
             # Clients can only see their own orders
-            elif user.role == 'client':
-                try:
-                    customer = Customer.objects.get(user=user)
-                    queryset = Order.objects.filter(customer=customer).select_related('customer__user', 'assigned_to', 'created_by')
-                except Customer.DoesNotExist:
-                    queryset = Order.objects.none()
+            elif policy.is_client and policy.customer_id:
+                queryset = Order.objects.filter(customer_id=policy.customer_id).select_related('customer__user', 'assigned_to', 'created_by')
             else:
                 queryset = Order.objects.none()
             
@@ -56,13 +55,24 @@ class OrderListView(APIView):
             if payment_status:
                 queryset = queryset.filter(payment_status=payment_status)
             
-            # Order by most recent first
-            queryset = queryset.order_by('-created_at')
+            # Most recent first, one page at a time
+            queryset = queryset.prefetch_related('order_items__service')
+            try:
+                orders, next_cursor, page_size = self.paginator.paginate(queryset, request)
+            except InvalidCursorError:
+                return Response({
+                    'error_code': 'INVALID_CURSOR',
+                    'message': 'Invalid pagination cursor',
+                    'status_code': 400
+                }, status=status.HTTP_400_BAD_REQUEST)
             
-            serializer = self.serializer_class(queryset, many=True)
+            serializer = self.serializer_class(orders, many=True)
             return Response({
                 'status': 'success',
-                'data': serializer.data
+                'data': serializer.data,
+                'page_size': page_size,
+                'next_cursor': next_cursor,
+                'has_more': next_cursor is not None
             }, status=status.HTTP_200_OK)
             
         except Exception as e:
@@ -73,6 +83,45 @@ class OrderListView(APIView):
                 'status_code': 500
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+class OrderImportView(APIView):
+    """Bulk import orders from a JSON-lines or CSV upload - staff only"""
+    permission_classes = [IsAuthenticated, IsStaff]
+    
+    def post(self, request, *args, **kwargs):
+        """Import orders; invalid rows are reported without aborting the file"""
+        try:
+            upload = request.FILES.get('file')
+            if upload is None:
+                return Response({
+                    'error_code': 'MISSING_FILE',
+                    'message': 'Upload a JSON-lines or CSV file in the "file" field',
+                    'status_code': 400
+                }, status=status.HTTP_400_BAD_REQUEST)
+            
+            try:
+                file_format = detect_format(upload, request.query_params.get('format') or request.data.get('format'))
+                summary = OrderImporter(request.user).run(upload, file_format)
+            except ImportFormatError as e:
+                return Response({
+                    'error_code': 'INVALID_FILE',
+                    'message': str(e),
+                    'status_code': 400
+                }, status=status.HTTP_400_BAD_REQUEST)
+            
+            return Response({
+                'status': 'success',
+                'message': f"Imported {summary['created']} of {summary['total_rows']} orders",
+                'data': summary
+            }, status=status.HTTP_200_OK)
+            
+        except Exception as e:
+            logger.error(f'Failed to import orders: {str(e)}', exc_info=True)
+            return Response({
+                'error_code': 'SERVER_ERROR',
+                'message': 'Failed to import orders',
+                'status_code': 500
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 class OrderCreateView(APIView):
     permission_classes = [IsAuthenticated]
     serializer_class = OrderSerializer
@@ -80,7 +129,7 @@ class OrderCreateView(APIView):
     def get(self, request, *args, **kwargs):
         """Render order creation form"""
         # Check if user has permission to create orders
-        if request.user.role not in ['admin', 'superadmin', 'employee']:
+        if not get_policy(request).can('manage_orders'):
             return Response({
                 'error_code': 'INSUFFICIENT_PERMISSIONS',
                 'message': 'Only admins, superadmins, and staff can create orders',
@@ -95,7 +144,7 @@ class OrderCreateView(APIView):
             user = request.user
             
             # Check if user has permission to create orders
-            if user.role not in ['admin', 'superadmin', 'employee']:
+            if not get_policy(request).can('manage_orders'):
                 return Response({
                     'error_code': 'INSUFFICIENT_PERMISSIONS',
                     'message': 'Only admins, superadmins, and staff can create orders',
@@ -104,7 +153,7 @@ class OrderCreateView(APIView):
             
             # For employees: automatically set assigned_to to the employee creating the order
             # if not already set
-            if user.role == 'employee':
+            if get_policy(request).is_employee:
                 if 'assigned_to' not in request.data or not request.data.get('assigned_to'):
                     request.data['assigned_to'] = user.id
             
@@ -208,10 +257,9 @@ class OrderUpdateView(APIView):
     def get(self, request, *args, **kwargs):
         """Render order update form"""
         order_id = kwargs.get('id')
-        user = request.user
         
         # Check if user has permission to update orders (staff only)
-        if user.role not in ['admin', 'superadmin', 'employee']:
+        if not get_policy(request).can('manage_orders'):
             return Response({
                 'error_code': 'INSUFFICIENT_PERMISSIONS',
                 'message': 'Only staff can update orders',
@@ -237,7 +285,7 @@ class OrderUpdateView(APIView):
             user = request.user
             
             # Check if user has permission to update orders
-            if user.role not in ['admin', 'superadmin', 'employee']:
+            if not get_policy(request).can('manage_orders'):
                 return Response({
                     'error_code': 'INSUFFICIENT_PERMISSIONS',
                     'message': 'Only staff can update orders',
@@ -396,28 +444,26 @@ class OrderDetailView(APIView):
         try:
             # Use prefetch_related to include order items
             order = Order.objects.prefetch_related('order_items__service').select_related('customer__user', 'assigned_to', 'created_by').get(id=order_id)
-            user = request.user
+            policy = get_policy(request)
             
             # Check access permissions
             # Staff can see all orders
-            if user.role in ['admin', 'superadmin', 'employee']:
+            if policy.can('view_all_orders'):
                 pass  # Allow access
             # Clients can only see their own orders
-            elif user.role == 'client':
-                try:
-                    customer = Customer.objects.get(user=user)
-                    if order.customer != customer:
-                        return Response({
-                            'error_code': 'PERMISSION_DENIED',
-                            'message': 'You can only view your own orders',
-                            'status_code': 403
-                        }, status=status.HTTP_403_FORBIDDEN)
-                except Customer.DoesNotExist:
+            elif policy.is_client:
+                if policy.customer_id is None:
                     return Response({
                         'error_code': 'PERMISSION_DENIED',
                         'message': 'Customer profile not found',
                         'status_code': 403
                     }, status=status.HTTP_403_FORBIDDEN)
+                if order.customer_id != policy.customer_id:
+                    return Response({
+                        'error_code': 'PERMISSION_DENIED',
+                        'message': 'You can only view your own orders',
+                        'status_code': 403
+                    }, status=status.HTTP_403_FORBIDDEN)
             else:
                 return Response({
                     'error_code': 'PERMISSION_DENIED',
@@ -0,0 +1,89 @@
+"""
+Order balance bookkeeping for payments.
+
+A successful payment used to re-sum every successful payment of its
+order to set amount_paid, so each write cost O(payments) for the order.
+credit_order adds the one payment to amount_paid in a single UPDATE and
+derives payment_status in the same statement. The payment row (and its
+order, joined in the same SELECT ... FOR UPDATE) is locked by the
+caller, so each payment is credited exactly once.
+
+find_balance_drift compares amount_paid with the payments table in
+batches and reports orders that disagree; the reconcile_order_balances
+command prints them and can repair them with --fix.
+"""
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Case, F, Sum, Value, When
+from django.db.models.functions import Least
+from orders.models import Order
+from .models import Payment
+
+
+def credit_order(order_id, amount):
+    """Add a successful payment to its order's amount_paid and payment_status"""
+    new_paid = F('amount_paid') + amount
+    # payment_status goes first: MySQL applies SET clauses left to right, so
+    # both expressions must read the amount_paid from before this payment
+    return Order.objects.filter(pk=order_id).update(
+        payment_status=Case(
+            When(total_amount__lte=new_paid, then=Value('paid')),
+            default=Value('partially_paid')
+        ),
+        amount_paid=Least(new_paid, F('total_amount'))
+    )
+
+
+def expected_balance(total_amount, total_paid):
+    """(amount_paid, payment_status) implied by the sum of successful payments"""
+    # Ensure amount_paid never exceeds total_amount (to satisfy constraint)
+    amount_paid = min(total_paid, total_amount)
+    if amount_paid <= 0:
+        return amount_paid, 'pending'
+    if amount_paid < total_amount:
+        return amount_paid, 'partially_paid'
+    return amount_paid, 'paid'
+
+
+def find_balance_drift(batch_size=1000):
+    """Yield one dict per order whose stored balance disagrees with its payments"""
+    last_id = 0
+    while True:
+        orders = list(
+            Order.objects.filter(id__gt=last_id).order_by('id')
+            .values('id', 'order_number', 'total_amount', 'amount_paid', 'payment_status')[:batch_size]
+        )
+        if not orders:
+            return
+        totals = dict(
+            Payment.objects.filter(order_id__in=[order['id'] for order in orders], status='success')
+            .values('order_id').order_by().annotate(total=Sum('amount')).values_list('order_id', 'total')
+        )
+        for order in orders:
+            amount_paid, payment_status = expected_balance(
+                order['total_amount'], totals.get(order['id']) or Decimal('0.00')
+            )
+            if amount_paid != order['amount_paid'] or payment_status != order['payment_status']:
+                yield {
+                    'id': order['id'],
+                    'order_number': order['order_number'],
+                    'stored_amount_paid': order['amount_paid'],
+                    'expected_amount_paid': amount_paid,
+                    'stored_payment_status': order['payment_status'],
+                    'expected_payment_status': payment_status,
+                }
+        last_id = orders[-1]['id']
+
+
+def fix_drift(order_id):
+    """Recompute one order's balance from its payments under a row lock"""
+    with transaction.atomic():
+        order = Order.objects.select_for_update().filter(pk=order_id).values('total_amount').first()
+        if order is None:
+            return False
+        total_paid = Payment.objects.filter(order_id=order_id, status='success').aggregate(
+            total=Sum('amount')
+        )['total'] or Decimal('0.00')
+        amount_paid, payment_status = expected_balance(order['total_amount'], total_paid)
+        Order.objects.filter(pk=order_id).update(amount_paid=amount_paid, payment_status=payment_status)
+        return True
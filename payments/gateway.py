@@ -0,0 +1,233 @@
+"""
+HTTP client for the Paystack API.
+
+All Paystack calls go through one PaystackClient per process. It keeps a
+requests.Session so TLS connections are pooled and reused, applies
+separate connect and read timeouts instead of a single 30 second wait,
+retries transaction verification (a read, so safe to repeat) with
+exponential backoff and jitter, and stops calling Paystack for a while
+after repeated failures so requests fail fast instead of tying up
+workers. Per-endpoint latency histograms are available from get_stats().
+"""
+import logging
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open
+LATENCY_BUCKETS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Responses worth retrying on an idempotent call
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+class GatewayError(Exception):
+    """Raised when Paystack could not be reached or returned an unusable response"""
+    pass
+
+
+class CircuitOpenError(GatewayError):
+    """Raised without calling Paystack while the circuit breaker is open"""
+    pass
+
+
+class LatencyHistogram:
+    """Bucketed request latencies for one endpoint"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, elapsed_ms, error=False):
+        index = len(self.buckets)
+        for position, bound in enumerate(self.buckets):
+            if elapsed_ms <= bound:
+                index = position
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        if error:
+            self.errors += 1
+
+    def as_dict(self):
+        labels = [f'le_{bound}ms' for bound in self.buckets] + [f'gt_{self.buckets[-1]}ms']
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'avg_ms': round(self.total_ms / self.count, 2) if self.count else 0.0,
+            'max_ms': round(self.max_ms, 2),
+            'buckets': dict(zip(labels, self.counts)),
+        }
+
+
+class CircuitBreaker:
+    """Open after `failure_threshold` consecutive failures, retry after `reset_timeout` seconds"""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def allow(self):
+        """Whether a call may go out; in half-open state one trial call is let through"""
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                # Push the window forward so concurrent callers keep failing fast
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logger.warning(f'Paystack circuit opened after {self.failures} consecutive failures')
+                self.opened_at = time.monotonic()
+
+
+class PaystackClient:
+    """Pooled Paystack API client with timeouts, retries and a circuit breaker"""
+
+    def __init__(self, secret_key, base_url='https://api.paystack.co', connect_timeout=3.05,
+                 read_timeout=15, max_retries=2, backoff=0.5, pool_size=10, breaker=None):
+        self.secret_key = secret_key
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'Authorization': f'Bearer {secret_key}',
+            'Content-Type': 'application/json',
+        })
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def initialize_transaction(self, payload):
+        """POST /transaction/initialize; not retried since it creates a transaction"""
+        return self._request('initialize', 'POST', '/transaction/initialize', json=payload)
+
+    def verify_transaction(self, reference):
+        """GET /transaction/verify/<reference>, retried on timeouts and 5xx/429 responses"""
+        return self._request(
+            'verify', 'GET', f'/transaction/verify/{reference}', retries=self.max_retries
+        )
+
+    def _request(self, endpoint, method, path, retries=0, **kwargs):
+        """
+        Send the request and return the decoded JSON body. Paystack reports
+        business failures in the body ('status': False), so 4xx responses
+        are returned like successes; callers check data['status'].
+        """
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                raise CircuitOpenError('Payment gateway is temporarily unavailable')
+
+            started = time.monotonic()
+            try:
+                response = self.session.request(method, self.base_url + path, timeout=self.timeout, **kwargs)
+            except requests.RequestException as e:
+                self._observe(endpoint, started, error=True)
+                self.breaker.record_failure()
+                error = GatewayError(f'Paystack {endpoint} request failed: {e}')
+            else:
+                failed = response.status_code >= 500
+                self._observe(endpoint, started, error=failed)
+                if failed:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= retries:
+                    try:
+                        return response.json()
+                    except ValueError:
+                        raise GatewayError(f'Paystack {endpoint} returned a non-JSON response ({response.status_code})')
+                error = GatewayError(f'Paystack {endpoint} returned {response.status_code}')
+
+            if attempt >= retries:
+                raise error
+            attempt += 1
+            delay = self.backoff * (2 ** (attempt - 1))
+            # Full jitter keeps retries from many workers from lining up
+            delay = random.uniform(0, delay)
+            logger.warning(f'{error}; retrying in {delay:.2f}s (attempt {attempt} of {retries})')
+            time.sleep(delay)
+
+    def _observe(self, endpoint, started, error=False):
+        elapsed_ms = (time.monotonic() - started) * 1000
+        with self._lock:
+            histogram = self._histograms.get(endpoint)
+            if histogram is None:
+                histogram = self._histograms[endpoint] = LatencyHistogram()
+            histogram.observe(elapsed_ms, error=error)
+
+    def get_stats(self):
+        """Circuit breaker state and per-endpoint latency histograms"""
+        with self._lock:
+            endpoints = {name: histogram.as_dict() for name, histogram in self._histograms.items()}
+        return {
+            'circuit': {
+                'state': self.breaker.state,
+                'consecutive_failures': self.breaker.failures,
+            },
+            'endpoints': endpoints,
+        }
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Return the process-wide PaystackClient, creating it on first use"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = PaystackClient(
+                settings.PAYSTACK_SECRET_KEY,
+                base_url=getattr(settings, 'PAYSTACK_BASE_URL', 'https://api.paystack.co'),
+                connect_timeout=getattr(settings, 'PAYSTACK_CONNECT_TIMEOUT', 3.05),
+                read_timeout=getattr(settings, 'PAYSTACK_READ_TIMEOUT', 15),
+                max_retries=getattr(settings, 'PAYSTACK_MAX_RETRIES', 2),
+                pool_size=getattr(settings, 'PAYSTACK_POOL_SIZE', 10),
+                breaker=CircuitBreaker(
+                    failure_threshold=getattr(settings, 'PAYSTACK_CIRCUIT_THRESHOLD', 5),
+                    reset_timeout=getattr(settings, 'PAYSTACK_CIRCUIT_RESET', 30),
+                ),
+            )
+        return _client
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from payments.webhooks import process_pending_events
+
+
+class Command(BaseCommand):
+    help = 'Process stored Paystack webhook events in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Events claimed per batch')
+        parser.add_argument('--max-batches', type=int, help='Stop after this many batches')
+        parser.add_argument('--max-attempts', type=int, default=5, help='Skip failed events tried this many times')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        stats = process_pending_events(
+            batch_size=options['batch_size'],
+            max_batches=options.get('max_batches'),
+            max_attempts=options['max_attempts']
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {stats['processed']} events, ignored {stats['ignored']}, "
+            f"failed {stats['failed']} in {stats['batches']} batches"
+        ))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from payments.balances import find_balance_drift, fix_drift
+
+
+class Command(BaseCommand):
+    help = 'Compare order amount_paid/payment_status with successful payments and report drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Orders checked per query')
+        parser.add_argument('--fix', action='store_true', help='Recompute drifted orders from their payments')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        drifted = 0
+        fixed = 0
+        for drift in find_balance_drift(batch_size=options['batch_size']):
+            drifted += 1
+            self.stdout.write(
+                f"Order {drift['order_number']} (id {drift['id']}): "
+                f"amount_paid {drift['stored_amount_paid']} -> {drift['expected_amount_paid']}, "
+                f"payment_status {drift['stored_payment_status']} -> {drift['expected_payment_status']}"
+            )
+            if options['fix'] and fix_drift(drift['id']):
+                fixed += 1
+
+        if fixed:
+            # Queryset updates skip post_save, so refresh the dashboard counts here
+            from dashboard import cache as dashboard_cache
+            dashboard_cache.invalidate()
+
+        if options['fix']:
+            self.stdout.write(self.style.SUCCESS(f'{drifted} orders drifted, {fixed} fixed'))
+        elif drifted:
+            self.stdout.write(self.style.WARNING(f'{drifted} orders drifted; run with --fix to repair them'))
+        else:
+            self.stdout.write(self.style.SUCCESS('No drift found'))
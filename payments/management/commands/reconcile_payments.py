@@ -0,0 +1,62 @@
+import csv
+import sys
+import time
+from django.core.management.base import BaseCommand, CommandError
+from payments.reconciliation import PaymentReconciler, ReconcileFormatError, REPORT_FIELDS, detect_format
+
+
+class Command(BaseCommand):
+    help = 'Reconcile payments against a Paystack transaction export (CSV, JSON-lines or JSON array)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('export', help='Path to the Paystack export file')
+        parser.add_argument('--format', choices=['csv', 'jsonl', 'ndjson', 'json'], help='Export format; detected from the file name by default')
+        parser.add_argument('--output', help='Write the CSV report here instead of stdout')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Export rows matched per query')
+        parser.add_argument('--amount-unit', choices=['auto', 'major', 'minor'], default='auto',
+                            help='Export amounts in cedis (major) or pesewas (minor); auto uses major for CSV')
+        parser.add_argument('--stale-hours', type=int, default=24, help='Report Paystack payments pending longer than this')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1')
+
+        try:
+            export = open(options['export'], encoding='utf-8-sig', newline='')
+        except OSError as e:
+            raise CommandError(f'Cannot open export: {e}')
+
+        output = open(options['output'], 'w', encoding='utf-8', newline='') if options.get('output') else sys.stdout
+        # With the report on stdout the summary goes to stderr
+        summary = self.stdout if options.get('output') else self.stderr
+        try:
+            file_format = detect_format(options['export'], export, options.get('format'))
+            writer = csv.DictWriter(output, fieldnames=REPORT_FIELDS)
+            writer.writeheader()
+
+            started = time.monotonic()
+            counts = PaymentReconciler(
+                writer,
+                chunk_size=options['chunk_size'],
+                amount_unit=options['amount_unit'],
+                stale_hours=options['stale_hours']
+            ).run(export, file_format)
+            elapsed = time.monotonic() - started
+        except ReconcileFormatError as e:
+            raise CommandError(str(e))
+        finally:
+            export.close()
+            if output is not sys.stdout:
+                output.close()
+
+        findings = sum(count for name, count in counts.items() if name not in ('rows', 'matched'))
+        summary.write(
+            f"Read {counts['rows']} export rows in {elapsed:.2f}s: {counts['matched']} matched, "
+            f"{counts['missing_payment']} missing, {counts['amount_mismatch']} amount mismatches, "
+            f"{counts['status_mismatch']} status mismatches, {counts['pending_on_gateway']} pending on gateway, "
+            f"{counts['stale_pending']} stale pending, {counts['invalid_row']} invalid rows"
+        )
+        if findings:
+            summary.write(self.style.WARNING(f'{findings} findings written to the report'))
+        else:
+            summary.write(self.style.SUCCESS('No discrepancies found'))
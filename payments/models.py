@@ -37,4 +37,30 @@ class Payment(models.Model):
         db_table = 'payments'
         verbose_name = 'Payment'
         verbose_name_plural = 'Payments'
-        ordering = ['-created_at']
\ No newline at end of file
+        ordering = ['-created_at']
+
+class PaymentWebhookEvent(models.Model):
+    """Raw Paystack webhook event, stored once per event id before processing"""
+    event_id = models.CharField(max_length=150, unique=True, db_column='event_id')
+    event_type = models.CharField(max_length=50, db_column='event_type')
+    reference = models.CharField(max_length=100, null=True, blank=True, db_column='reference')
+    payload = models.JSONField(db_column='payload')
+    status = models.CharField(
+        max_length=20,
+        choices=[('received', 'Received'), ('processed', 'Processed'), ('ignored', 'Ignored'), ('failed', 'Failed')],
+        default='received',
+        db_column='status'
+    )
+    attempts = models.IntegerField(default=0, db_column='attempts')
+    error = models.TextField(null=True, blank=True, db_column='error')
+    received_at = models.DateTimeField(auto_now_add=True, db_column='received_at')
+    processed_at = models.DateTimeField(null=True, blank=True, db_column='processed_at')
+
+    def __str__(self):
+        return f"{self.event_type} {self.event_id}"
+
+    class Meta:
+        db_table = 'payment_webhook_events'
+        verbose_name = 'Payment Webhook Event'
+        verbose_name_plural = 'Payment Webhook Events'
+        ordering = ['id']
@@ -0,0 +1,293 @@
+"""
+Reconciliation of payments against a Paystack transaction export.
+
+The export is read as a stream (CSV, JSON-lines or a JSON array) and
+matched against payments.reference in chunks: each chunk costs one
+indexed IN query, and only the current chunk (plus the references of
+pending payments it contained) is held in memory, so a month of
+transactions is processed without loading the export. Every discrepancy
+is written to the report as soon as it is found:
+
+    missing_payment    the gateway has a transaction we have no payment for
+    amount_mismatch    the amounts differ by more than one pesewa
+    status_mismatch    the gateway and the payment disagree on the outcome
+    pending_on_gateway the payment is pending but the gateway has settled it
+    stale_pending      a Paystack payment has been pending longer than the cutoff
+                       and does not appear in the export
+    invalid_row        the export row has no reference or an unreadable amount
+
+CSV exports from the dashboard give amounts in cedis; API-shaped JSON
+gives them in pesewas. amount_unit='auto' picks accordingly.
+"""
+import csv
+import json
+import logging
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+from django.utils import timezone
+from .models import Payment
+
+logger = logging.getLogger(__name__)
+
+REPORT_FIELDS = (
+    'row', 'reference', 'finding', 'gateway_status', 'payment_status',
+    'gateway_amount', 'payment_amount', 'order_id', 'message'
+)
+
+# Column names seen in Paystack exports, normalized to lower case
+REFERENCE_KEYS = ('reference', 'transaction reference', 'transaction_reference', 'ref')
+AMOUNT_KEYS = ('amount', 'amount paid', 'amount_paid', 'transaction amount')
+STATUS_KEYS = ('status', 'transaction status', 'transaction_status')
+
+GATEWAY_SETTLED = ('success',)
+GATEWAY_UNSUCCESSFUL = ('failed', 'abandoned', 'reversed')
+
+
+class ReconcileFormatError(Exception):
+    """Raised when an export cannot be read as the requested format"""
+    pass
+
+
+def detect_format(path, stream, requested=None):
+    """Pick 'csv', 'jsonl' or 'json' (a top-level array) for an export file"""
+    if requested:
+        requested = requested.lower()
+        if requested in ('csv', 'jsonl', 'json'):
+            return requested
+        if requested == 'ndjson':
+            return 'jsonl'
+        raise ReconcileFormatError(f'Unsupported format: {requested}')
+
+    name = str(path).lower()
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    if name.endswith('.json'):
+        # A .json export may be an array or one object per line
+        return 'json' if _peek_char(stream) == '[' else 'jsonl'
+    raise ReconcileFormatError('Could not detect file format; pass --format csv, jsonl or json')
+
+
+def _peek_char(stream):
+    """First non-whitespace character of a seekable text stream, without consuming it"""
+    position = stream.tell()
+    while True:
+        char = stream.read(1)
+        if not char or not char.isspace():
+            stream.seek(position)
+            return char
+
+
+def iter_csv(stream):
+    """Yield (row_number, record, None) for each CSV row, with lower-cased keys"""
+    reader = csv.DictReader(stream)
+    if not reader.fieldnames:
+        raise ReconcileFormatError('CSV file has no header row')
+    # Row 1 is the header
+    for row_number, row in enumerate(reader, start=2):
+        yield row_number, {key.strip().lower(): (value or '').strip() for key, value in row.items() if key}, None
+
+
+def iter_jsonl(stream):
+    """Yield (row_number, record or None, error) for each non-blank line"""
+    for row_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError as e:
+            yield row_number, None, f'Invalid JSON: {e}'
+            continue
+        if not isinstance(data, dict):
+            yield row_number, None, 'Each line must be a JSON object'
+            continue
+        yield row_number, _lower_keys(data), None
+
+
+def iter_json_array(stream, read_size=65536):
+    """Yield (index, record or None, error) from a top-level JSON array without loading it whole"""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = False
+    index = 0
+    eof = False
+
+    while True:
+        # Skip whitespace and separators, reading more when the buffer runs out
+        while True:
+            while position < len(buffer) and (buffer[position].isspace() or (started and buffer[position] == ',')):
+                position += 1
+            if position < len(buffer) or eof:
+                break
+            chunk = stream.read(read_size)
+            buffer, position = buffer[position:] + chunk, 0
+            eof = not chunk
+
+        if position >= len(buffer):
+            raise ReconcileFormatError('JSON array is not terminated')
+        if not started:
+            if buffer[position] != '[':
+                raise ReconcileFormatError('JSON export must be an array of transactions')
+            started = True
+            position += 1
+            continue
+        if buffer[position] == ']':
+            return
+
+        try:
+            value, end = decoder.raw_decode(buffer, position)
+        except ValueError:
+            if eof:
+                raise ReconcileFormatError(f'Invalid JSON in element {index + 1}')
+            # The element continues past the buffer; read more and retry
+            chunk = stream.read(read_size)
+            buffer, position = buffer[position:] + chunk, 0
+            eof = not chunk
+            continue
+
+        index += 1
+        position = end
+        if isinstance(value, dict):
+            yield index, _lower_keys(value), None
+        else:
+            yield index, None, 'Each element must be a JSON object'
+
+        # Drop consumed text so the buffer stays around one read in size
+        if position > read_size:
+            buffer, position = buffer[position:], 0
+
+
+def _lower_keys(data):
+    return {str(key).strip().lower(): value for key, value in data.items()}
+
+
+def _first(record, keys):
+    for key in keys:
+        value = record.get(key)
+        if value not in (None, ''):
+            return value
+    return None
+
+
+class PaymentReconciler:
+    """Stream an export, match it against payments in chunks and write findings"""
+
+    def __init__(self, writer, chunk_size=1000, amount_unit='auto', stale_hours=24):
+        self.writer = writer
+        self.chunk_size = chunk_size
+        self.amount_unit = amount_unit
+        self.stale_hours = stale_hours
+        self.counts = {
+            'rows': 0, 'matched': 0, 'missing_payment': 0, 'amount_mismatch': 0,
+            'status_mismatch': 0, 'pending_on_gateway': 0, 'stale_pending': 0, 'invalid_row': 0,
+        }
+        # Pending payments found in the export were already judged against it
+        self._pending_in_export = set()
+
+    def run(self, stream, file_format):
+        """Reconcile the whole export, then list stale pending payments; returns the counters"""
+        if file_format == 'csv':
+            rows = iter_csv(stream)
+        elif file_format == 'json':
+            rows = iter_json_array(stream)
+        else:
+            rows = iter_jsonl(stream)
+        # Dashboard CSV exports are in cedis, API JSON in pesewas
+        minor_units = self.amount_unit == 'minor' or (self.amount_unit == 'auto' and file_format != 'csv')
+
+        chunk = []
+        for row_number, record, error in rows:
+            self.counts['rows'] += 1
+            if error:
+                self._report('invalid_row', row=row_number, message=error)
+                continue
+            parsed = self._parse(row_number, record, minor_units)
+            if parsed is None:
+                continue
+            chunk.append(parsed)
+            if len(chunk) >= self.chunk_size:
+                self._match(chunk)
+                chunk = []
+        if chunk:
+            self._match(chunk)
+
+        self._report_stale_pending()
+        return dict(self.counts)
+
+    def _parse(self, row_number, record, minor_units):
+        reference = _first(record, REFERENCE_KEYS)
+        if reference is None:
+            self._report('invalid_row', row=row_number, message='Row has no reference')
+            return None
+        raw_amount = _first(record, AMOUNT_KEYS)
+        try:
+            amount = Decimal(str(raw_amount).replace(',', '')) if raw_amount is not None else None
+        except InvalidOperation:
+            self._report('invalid_row', row=row_number, reference=reference, message=f'Unreadable amount: {raw_amount}')
+            return None
+        if amount is not None and minor_units:
+            amount = amount / 100
+        status = _first(record, STATUS_KEYS)
+        return {
+            'row': row_number,
+            'reference': str(reference).strip(),
+            'amount': amount,
+            'status': str(status).strip().lower() if status is not None else None,
+        }
+
+    def _match(self, chunk):
+        """Compare one chunk of export rows with their payments (one indexed query)"""
+        payments = {
+            payment['reference']: payment
+            for payment in Payment.objects.filter(reference__in={row['reference'] for row in chunk})
+            .values('reference', 'amount', 'status', 'order_id')
+        }
+        for row in chunk:
+            payment = payments.get(row['reference'])
+            if payment is None:
+                self._report('missing_payment', gateway=row, message='No payment with this reference')
+                continue
+            if payment['status'] == 'pending':
+                self._pending_in_export.add(payment['reference'])
+
+            if row['amount'] is not None and abs(row['amount'] - payment['amount']) > Decimal('0.01'):
+                self._report('amount_mismatch', gateway=row, payment=payment, message='Amounts differ')
+            elif payment['status'] == 'pending' and row['status'] in GATEWAY_SETTLED + GATEWAY_UNSUCCESSFUL:
+                self._report('pending_on_gateway', gateway=row, payment=payment, message='Payment still pending')
+            elif (row['status'] in GATEWAY_SETTLED and payment['status'] != 'success') or (
+                    row['status'] in GATEWAY_UNSUCCESSFUL and payment['status'] == 'success'):
+                self._report('status_mismatch', gateway=row, payment=payment, message='Outcomes differ')
+            else:
+                self.counts['matched'] += 1
+
+    def _report_stale_pending(self):
+        """List Paystack payments pending for longer than stale_hours that the export did not cover"""
+        cutoff = timezone.now() - timedelta(hours=self.stale_hours)
+        stale = Payment.objects.filter(
+            status='pending', payment_method='paystack', created_at__lt=cutoff
+        ).order_by('id').values('reference', 'amount', 'status', 'order_id')
+        for payment in stale.iterator(chunk_size=self.chunk_size):
+            if payment['reference'] in self._pending_in_export:
+                continue
+            self._report('stale_pending', payment=payment, message=f'Pending for more than {self.stale_hours} hours')
+
+    def _report(self, finding, row=None, reference=None, gateway=None, payment=None, message=''):
+        self.counts[finding] += 1
+        self.writer.writerow({
+            'row': row if row is not None else (gateway or {}).get('row', ''),
+            'reference': reference or (gateway or payment or {}).get('reference', ''),
+            'finding': finding,
+            'gateway_status': (gateway or {}).get('status') or '',
+            'payment_status': (payment or {}).get('status', ''),
+            'gateway_amount': _format_amount((gateway or {}).get('amount')),
+            'payment_amount': _format_amount((payment or {}).get('amount')),
+            'order_id': (payment or {}).get('order_id', ''),
+            'message': message,
+        })
+
+
+def _format_amount(amount):
+    return f'{amount:.2f}' if amount is not None else ''
@@ -1,3 +1,261 @@
-from django.test import TestCase
+import hashlib
+import hmac
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from django.conf import settings
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from .gateway import PaystackClient, CircuitBreaker, CircuitOpenError, GatewayError
+from .verification import VerificationQueue, FINAL_STATUSES
 
-# Create your tests here.
+
+class FakePaystackHandler(BaseHTTPRequestHandler):
+    """Answers each request with the next (status, body, delay) queued on the server"""
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _respond(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+        self.server.requests.append((self.command, self.path, self.client_address[1]))
+        if self.server.plan:
+            status, body, delay = self.server.plan.pop(0)
+        else:
+            status, body, delay = 200, {'status': True, 'data': {'status': 'success'}}, 0
+        if delay:
+            # Not time.sleep: tests patch it to skip the client's backoff
+            threading.Event().wait(delay)
+        payload = json.dumps(body).encode()
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up waiting (read timeout)
+            pass
+
+    do_GET = _respond
+    do_POST = _respond
+
+
+class PaystackClientTests(SimpleTestCase):
+    """PaystackClient against a local fake Paystack server"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), FakePaystackHandler)
+        cls.server.daemon_threads = True
+        cls.server.plan = []
+        cls.server.requests = []
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f'http://127.0.0.1:{cls.server.server_port}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.plan.clear()
+        self.server.requests.clear()
+
+    def make_client(self, **kwargs):
+        options = {'read_timeout': 0.5, 'max_retries': 2, 'backoff': 0.1}
+        options.update(kwargs)
+        return PaystackClient('sk_test', base_url=self.base_url, **options)
+
+    def test_verify_retries_5xx_with_exponential_backoff_and_jitter(self):
+        self.server.plan[:] = [
+            (503, {'status': False}, 0),
+            (502, {'status': False}, 0),
+            (200, {'status': True, 'data': {'status': 'success'}}, 0),
+        ]
+        client = self.make_client()
+
+        with mock.patch('payments.gateway.time.sleep') as sleep, \
+                mock.patch('payments.gateway.random.uniform', side_effect=lambda low, high: high / 2) as uniform:
+            data = client.verify_transaction('REF-1')
+
+        self.assertTrue(data['status'])
+        self.assertEqual(len(self.server.requests), 3)
+        # Full jitter over backoff * 2^(attempt - 1)
+        self.assertEqual([call.args for call in uniform.call_args_list], [(0, 0.1), (0, 0.2)])
+        self.assertEqual([call.args[0] for call in sleep.call_args_list], [0.05, 0.1])
+
+    def test_verify_retries_read_timeouts_then_gives_up(self):
+        self.server.plan[:] = [(200, {'status': True}, 1)] * 3
+        client = self.make_client(read_timeout=0.2)
+
+        with mock.patch('payments.gateway.time.sleep'):
+            with self.assertRaises(GatewayError):
+                client.verify_transaction('REF-1')
+
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_initialize_is_not_retried(self):
+        self.server.plan[:] = [(503, {'status': False, 'message': 'down'}, 0)]
+        client = self.make_client()
+
+        with mock.patch('payments.gateway.time.sleep') as sleep:
+            data = client.initialize_transaction({'amount': '100'})
+
+        self.assertEqual(data, {'status': False, 'message': 'down'})
+        self.assertEqual(len(self.server.requests), 1)
+        sleep.assert_not_called()
+
+    def test_business_errors_are_returned_not_raised(self):
+        self.server.plan[:] = [(400, {'status': False, 'message': 'Invalid key'}, 0)]
+        data = self.make_client().initialize_transaction({})
+        self.assertEqual(data['message'], 'Invalid key')
+
+    def test_circuit_opens_after_consecutive_failures_and_half_opens(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.3)
+        client = self.make_client(max_retries=0, breaker=breaker)
+        self.server.plan[:] = [(500, {'status': False}, 0)] * 2
+
+        client.verify_transaction('REF-1')
+        client.verify_transaction('REF-1')
+        self.assertEqual(breaker.state, 'open')
+
+        # Open: fails fast without reaching the server
+        with self.assertRaises(CircuitOpenError):
+            client.verify_transaction('REF-1')
+        self.assertEqual(len(self.server.requests), 2)
+
+        # After the reset timeout one trial call goes through and closes it
+        time.sleep(0.35)
+        self.assertEqual(breaker.state, 'half_open')
+        self.assertTrue(client.verify_transaction('REF-1')['status'])
+        self.assertEqual(breaker.state, 'closed')
+
+    def test_failed_half_open_trial_reopens_circuit(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.2)
+        client = self.make_client(max_retries=0, breaker=breaker)
+        self.server.plan[:] = [(500, {'status': False}, 0)] * 2
+
+        client.verify_transaction('REF-1')
+        time.sleep(0.25)
+        client.verify_transaction('REF-1')
+
+        self.assertEqual(breaker.state, 'open')
+        with self.assertRaises(CircuitOpenError):
+            client.verify_transaction('REF-1')
+
+    def test_connect_and_read_timeouts_are_passed_separately(self):
+        client = self.make_client(connect_timeout=1.5, read_timeout=0.2)
+
+        with mock.patch.object(client.session, 'request', wraps=client.session.request) as request:
+            client.verify_transaction('REF-1')
+        self.assertEqual(request.call_args.kwargs['timeout'], (1.5, 0.2))
+
+        # A slow response is cut off by the read timeout, not the longer connect timeout
+        self.server.plan[:] = [(200, {'status': True}, 1)]
+        started = time.monotonic()
+        with self.assertRaises(GatewayError):
+            self.make_client(connect_timeout=1.5, read_timeout=0.2, max_retries=0).verify_transaction('REF-1')
+        self.assertLess(time.monotonic() - started, 1.0)
+
+    def test_connect_failure_is_a_gateway_error(self):
+        # Nothing listens on this port once the probe server is closed
+        probe = ThreadingHTTPServer(('127.0.0.1', 0), FakePaystackHandler)
+        port = probe.server_port
+        probe.server_close()
+        client = PaystackClient('sk_test', base_url=f'http://127.0.0.1:{port}', connect_timeout=0.2, max_retries=0)
+
+        with self.assertRaises(GatewayError):
+            client.verify_transaction('REF-1')
+        self.assertEqual(client.get_stats()['endpoints']['verify']['errors'], 1)
+
+    def test_connections_are_reused(self):
+        client = self.make_client()
+        for _ in range(3):
+            client.verify_transaction('REF-1')
+        stats = client.get_stats()['endpoints']['verify']
+        self.assertEqual(stats['count'], 3)
+        self.assertEqual(sum(stats['buckets'].values()), 3)
+        # Every call arrives on the same pooled connection
+        self.assertEqual(len({port for _, _, port in self.server.requests}), 1)
+
+
+class VerificationQueueTests(SimpleTestCase):
+    """Status polls must not trigger a Paystack verification on every request"""
+
+    def setUp(self):
+        cache.clear()
+        self.queue = VerificationQueue(retry_interval=60)
+        self.executor = mock.Mock()
+        self.queue._get_executor = lambda: self.executor
+
+    def test_repeated_polls_queue_one_verification(self):
+        self.assertTrue(self.queue.enqueue('REF-1'))
+        self.queue._in_flight.clear()  # The first attempt has finished
+
+        self.assertFalse(self.queue.enqueue('REF-1'))
+        self.assertTrue(self.queue.enqueue('REF-2'))
+        self.assertEqual(self.executor.submit.call_count, 2)
+
+    def test_throttle_is_shared_between_queues(self):
+        # Another worker whose PAYMENT_VERIFY_CACHE_ALIAS points at the same cache
+        other = VerificationQueue(retry_interval=60)
+        other._get_executor = lambda: self.executor
+
+        self.assertTrue(self.queue.enqueue('REF-1'))
+        self.assertFalse(other.enqueue('REF-1'))
+        self.assertEqual(self.executor.submit.call_count, 1)
+
+    def test_reference_is_queued_again_after_the_interval(self):
+        self.assertTrue(self.queue.enqueue('REF-1'))
+        self.queue._in_flight.clear()
+        cache.delete('payments:verify:REF-1')  # The interval has passed
+
+        self.assertTrue(self.queue.enqueue('REF-1'))
+
+    def test_abandoned_payments_are_verified_again(self):
+        self.assertNotIn('abandoned', FINAL_STATUSES)
+
+
+class PaymentStatusViewTests(SimpleTestCase):
+    """The status endpoint is not open to anonymous callers"""
+
+    def test_anonymous_poll_is_rejected_without_queueing(self):
+        with mock.patch('payments.views.enqueue_verification') as enqueue:
+            response = self.client.get('/api/payments/status/REF-1/', HTTP_ACCEPT='application/json')
+
+        self.assertEqual(response.status_code, 401)
+        self.assertNotIn('order_id', response.content.decode())
+        enqueue.assert_not_called()
+
+
+class PaystackWebhookViewTests(SimpleTestCase):
+    """Signed bodies that are not JSON objects are rejected, not retried forever"""
+
+    def post_signed(self, body):
+        signature = hmac.new(settings.PAYSTACK_SECRET_KEY.encode(), body, hashlib.sha512).hexdigest()
+        return self.client.post(
+            '/api/payments/webhook/', body, content_type='application/json',
+            HTTP_X_PAYSTACK_SIGNATURE=signature, HTTP_ACCEPT='application/json'
+        )
+
+    def test_non_object_payloads_are_rejected(self):
+        with mock.patch('payments.views.store_event') as store:
+            for body in (b'[]', b'"x"', b'1', b'not json'):
+                response = self.post_signed(body)
+                self.assertEqual(response.status_code, 400, body)
+                self.assertEqual(response.json()['error_code'], 'INVALID_PAYLOAD')
+        store.assert_not_called()
+
+    def test_unsigned_body_is_rejected(self):
+        response = self.client.post(
+            '/api/payments/webhook/', b'{}', content_type='application/json', HTTP_ACCEPT='application/json'
+        )
+        self.assertEqual(response.status_code, 401)
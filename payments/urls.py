@@ -1,8 +1,11 @@
 from django.urls import path
-from .views import PaymentInitializeView, PaymentCallbackView
+from .views import PaymentInitializeView, PaymentCallbackView, PaymentStatusView, PaystackWebhookView, PaymentGatewayStatsView
 
 urlpatterns = [
     path('initialize/', PaymentInitializeView.as_view(), name='payment_initialize'),
     path('callback/', PaymentCallbackView.as_view(), name='payment_callback'),
+    path('status/<str:reference>/', PaymentStatusView.as_view(), name='payment_status'),
+    path('webhook/', PaystackWebhookView.as_view(), name='payment_webhook'),
+    path('gateway-stats/', PaymentGatewayStatsView.as_view(), name='payment_gateway_stats'),
 ]
 
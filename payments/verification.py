@@ -0,0 +1,191 @@
+"""
+Background verification of Paystack payments.
+
+The callback used to verify the transaction with Paystack, update the
+payment and re-total the order before answering the customer's browser,
+so the page took as long as the gateway did. Now the callback only
+queues the reference here and renders a page that polls the status
+endpoint. A small thread pool does the verification; a reference that
+is already being verified is not queued twice, and one whose last
+attempt failed is retried at most every PAYMENT_VERIFY_RETRY_INTERVAL
+seconds when the status endpoint is polled again. The retry throttle is
+kept in the PAYMENT_VERIFY_CACHE_ALIAS cache. When that alias points at a
+cache shared by the workers, polls spread over several workers trigger at
+most one verification per reference per interval. With the default
+per-process locmem cache, the limit applies to each worker separately.
+
+'abandoned' is not final on Paystack: a customer can come back to the
+checkout and pay, so an abandoned payment is verified again and a later
+success (polled or from the webhook) replaces it.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import caches
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from .balances import credit_order
+from .gateway import get_client, GatewayError
+from .models import Payment
+
+logger = logging.getLogger(__name__)
+
+# Statuses no later verification can change; 'abandoned' can still turn into a success
+FINAL_STATUSES = ('success', 'failed')
+
+
+def verify_payment(reference):
+    """Verify one payment with Paystack and record the result; returns the payment status"""
+    try:
+        response_data = get_client().verify_transaction(reference)
+    except GatewayError as e:
+        # Leave the payment pending; a later poll queues it again
+        logger.warning(f'Paystack verification failed for {reference}: {str(e)}')
+        return 'pending'
+
+    if not response_data.get('status'):
+        logger.error(f'Paystack verification error: {response_data}')
+        return 'pending'
+
+    return record_verification(reference, response_data)
+
+
+def record_verification(reference, response_data):
+    """
+    Apply a verified transaction to its payment under a row lock, so the
+    callback worker and the webhook processor cannot both credit the
+    order. Returns the payment status, or None if there is no such payment.
+    """
+    with transaction.atomic():
+        # The join locks the order row as well as the payment
+        payment = Payment.objects.select_for_update().select_related('order').filter(reference=reference).first()
+        if payment is None:
+            logger.error(f'Payment not found for reference: {reference}')
+            return None
+
+        # Already settled by the other path
+        if payment.status in FINAL_STATUSES:
+            return payment.status
+
+        apply_verification(payment, response_data)
+        return payment.status
+
+
+def apply_verification(payment, response_data):
+    """Update the payment (and its order on success) from a Paystack transaction payload"""
+    transaction_data = response_data.get('data', {})
+    transaction_status = transaction_data.get('status')
+    transaction_amount = Decimal(str(transaction_data.get('amount', 0))) / 100  # Convert from pesewas
+
+    # Verify amount matches the payment record amount (customer-provided amount)
+    expected_amount = payment.amount
+    if abs(transaction_amount - expected_amount) > Decimal('0.01'):  # Allow 1 pesewa difference
+        logger.warning(f'Amount mismatch for payment {payment.reference}. Expected: {expected_amount}, Got: {transaction_amount}')
+        payment.status = 'failed'
+        payment.metadata = {
+            **payment.metadata,
+            'verification_error': 'Amount mismatch',
+            'expected_amount': str(expected_amount),
+            'received_amount': str(transaction_amount)
+        }
+        payment.save()
+        return
+
+    if transaction_status != 'success':
+        # Still on the Paystack checkout page; check again on the next poll
+        if transaction_status in ('ongoing', 'pending', 'processing', 'queued'):
+            return
+        payment.status = 'abandoned' if transaction_status == 'abandoned' else 'failed'
+        payment.metadata = {
+            **payment.metadata,
+            'verification_response': response_data,
+            'gateway_response': transaction_data.get('gateway_response', 'Payment failed')
+        }
+        payment.save()
+        return
+
+    with transaction.atomic():
+        payment.status = 'success'
+        payment.transaction_id = str(transaction_data.get('id', ''))
+        payment.fees = Decimal(str(transaction_data.get('fees', 0))) / 100
+        # Parse paid_at timestamp if available
+        paid_at_str = transaction_data.get('paid_at')
+        if paid_at_str:
+            try:
+                payment.verified_at = datetime.fromisoformat(paid_at_str.replace('Z', '+00:00'))
+            except (ValueError, AttributeError):
+                payment.verified_at = timezone.now()
+        else:
+            payment.verified_at = timezone.now()
+        payment.metadata = {
+            **payment.metadata,
+            'verification_response': response_data,
+            'channel': transaction_data.get('channel'),
+            'gateway_response': transaction_data.get('gateway_response')
+        }
+        payment.save()
+
+        # Add this payment to the order balance; the insert trigger only
+        # covers payments recorded as successful, not pending ones verified later
+        credit_order(payment.order_id, payment.amount)
+
+
+class VerificationQueue:
+    """Thread pool that verifies each reference at most once at a time"""
+
+    def __init__(self, workers=2, retry_interval=10):
+        self.workers = workers
+        self.retry_interval = retry_interval
+        self._executor = None
+        self._in_flight = set()
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='payment-verify')
+        return self._executor
+
+    def _throttle_key(self, reference):
+        return f'payments:verify:{reference}'
+
+    def enqueue(self, reference):
+        """Queue a verification; returns False if it is running or was tried too recently"""
+        with self._lock:
+            if reference in self._in_flight:
+                return False
+            # add() only succeeds for the first caller in each interval, in any process
+            try:
+                throttle = caches[getattr(settings, 'PAYMENT_VERIFY_CACHE_ALIAS', 'default')]
+                if not throttle.add(self._throttle_key(reference), 1, timeout=self.retry_interval):
+                    return False
+            except Exception as e:
+                # Without the throttle cache the in-flight check is the only guard
+                logger.warning(f'Verification throttle unavailable: {str(e)}')
+            self._in_flight.add(reference)
+            self._get_executor().submit(self._run, reference)
+        return True
+
+    def _run(self, reference):
+        close_old_connections()
+        try:
+            verify_payment(reference)
+        except Exception as e:
+            logger.error(f'Payment verification error for {reference}: {str(e)}', exc_info=True)
+        finally:
+            with self._lock:
+                self._in_flight.discard(reference)
+            close_old_connections()
+
+
+queue = VerificationQueue(
+    workers=getattr(settings, 'PAYMENT_VERIFY_WORKERS', 2),
+    retry_interval=getattr(settings, 'PAYMENT_VERIFY_RETRY_INTERVAL', 10)
+)
+
+
+def enqueue_verification(reference):
+    """Queue a payment reference for background verification"""
+    return queue.enqueue(reference)
@@ -1,20 +1,21 @@
-import requests
 import logging
 import uuid
 from decimal import Decimal
-from datetime import datetime
 from django.shortcuts import render, redirect
 from django.db import transaction
-from django.utils import timezone
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from django.conf import settings
 from accounts.mixins import AutoRefreshTokenMixin
+from accounts.permissions import IsSuperadmin
+from accounts.policy import get_policy
 from orders.models import Order
-from customers.models import Customer
 from .models import Payment
+from .gateway import get_client, GatewayError
+from .verification import enqueue_verification, FINAL_STATUSES
+from .webhooks import valid_signature, store_event, drainer as webhook_drainer
 from .serializers import PaymentInitializeSerializer
 import json
 
@@ -28,9 +29,10 @@ class PaymentInitializeView(AutoRefreshTokenMixin, APIView):
     def post(self, request, *args, **kwargs):
         try:
             user = request.user
+            policy = get_policy(request)
             
             # Only clients can make payments
-            if user.role != 'client':
+            if not policy.can('make_payments'):
                 return Response({
                     'error_code': 'PERMISSION_DENIED',
                     'message': 'Only clients can make payments',
@@ -41,22 +43,22 @@ class PaymentInitializeView(AutoRefreshTokenMixin, APIView):
             serializer.is_valid(raise_exception=True)
             order_id = serializer.validated_data['order_id']
             
+            if policy.customer_id is None:
+                return Response({
+                    'error_code': 'CUSTOMER_NOT_FOUND',
+                    'message': 'Customer profile not found',
+                    'status_code': 404
+                }, status=status.HTTP_404_NOT_FOUND)
+            
             # Get the order
             try:
-                customer = Customer.objects.get(user=user)
-                order = Order.objects.select_related('customer__user').get(id=order_id, customer=customer)
+                order = Order.objects.select_related('customer__user').get(id=order_id, customer_id=policy.customer_id)
             except Order.DoesNotExist:
                 return Response({
                     'error_code': 'ORDER_NOT_FOUND',
                     'message': 'Order not found or you do not have permission to pay for this order',
                     'status_code': 404
                 }, status=status.HTTP_404_NOT_FOUND)
-            except Customer.DoesNotExist:
-                return Response({
-                    'error_code': 'CUSTOMER_NOT_FOUND',
-                    'message': 'Customer profile not found',
-                    'status_code': 404
-                }, status=status.HTTP_404_NOT_FOUND)
             
             # Get payment amount from request
             payment_amount = Decimal(str(serializer.validated_data.get('amount', 0)))
@@ -116,18 +118,12 @@ class PaymentInitializeView(AutoRefreshTokenMixin, APIView):
                     metadata={
                         'order_id': order.id,
                         'order_number': order.order_number,
-                        'customer_id': customer.id
+                        'customer_id': policy.customer_id
                     },
                     created_by=user
                 )
             
             # Prepare Paystack API request
-            paystack_url = 'https://api.paystack.co/transaction/initialize'
-            headers = {
-                'Authorization': f'Bearer {settings.PAYSTACK_SECRET_KEY}',
-                'Content-Type': 'application/json'
-            }
-            
             payload = {
                 'email': customer_email,
                 'amount': str(amount_in_pesewas),
@@ -137,16 +133,29 @@ class PaymentInitializeView(AutoRefreshTokenMixin, APIView):
                 'metadata': {
                     'order_id': order.id,
                     'order_number': order.order_number,
-                    'customer_id': customer.id,
+                    'customer_id': policy.customer_id,
                     'payment_id': payment.id
                 }
             }
             
             # Make request to Paystack
-            response = requests.post(paystack_url, headers=headers, json=payload, timeout=30)
-            response_data = response.json()
+            try:
+                response_data = get_client().initialize_transaction(payload)
+            except GatewayError as e:
+                logger.error(f'Paystack initialize failed for {unique_ref}: {str(e)}')
+                payment.status = 'failed'
+                payment.metadata = {
+                    **payment.metadata,
+                    'error_message': str(e)
+                }
+                payment.save()
+                return Response({
+                    'error_code': 'PAYMENT_GATEWAY_UNAVAILABLE',
+                    'message': 'The payment gateway is unavailable. Please try again shortly.',
+                    'status_code': 503
+                }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
             
-            if not response.ok or not response_data.get('status'):
+            if not response_data.get('status'):
                 logger.error(f'Paystack API error: {response_data}')
                 # Update payment status to failed
                 payment.status = 'failed'
@@ -197,7 +206,7 @@ class PaymentInitializeView(AutoRefreshTokenMixin, APIView):
 
 
 class PaymentCallbackView(APIView):
-    """Handle Paystack payment callback and verify transaction"""
+    """Handle Paystack payment callback and queue the transaction for verification"""
     permission_classes = []  # No authentication required for callback
     
     def get(self, request, *args, **kwargs):
@@ -210,116 +219,25 @@ class PaymentCallbackView(APIView):
                     'message': 'Payment reference not provided'
                 })
             
-            # Verify transaction with Paystack
-            paystack_url = f'https://api.paystack.co/transaction/verify/{reference}'
-            headers = {
-                'Authorization': f'Bearer {settings.PAYSTACK_SECRET_KEY}'
-            }
-            
-            response = requests.get(paystack_url, headers=headers, timeout=30)
-            response_data = response.json()
-            
-            if not response.ok or not response_data.get('status'):
-                logger.error(f'Paystack verification error: {response_data}')
-                return render(request, 'payments/payment_callback.html', {
-                    'success': False,
-                    'message': response_data.get('message', 'Failed to verify payment')
-                })
-            
-            transaction_data = response_data.get('data', {})
-            transaction_status = transaction_data.get('status')
-            transaction_amount = Decimal(str(transaction_data.get('amount', 0))) / 100  # Convert from pesewas
-            
-            # Get payment record
-            try:
-                payment = Payment.objects.select_related('order').get(reference=reference)
-                order = payment.order
-            except Payment.DoesNotExist:
+            payment = Payment.objects.filter(reference=reference).values('status', 'order_id', 'metadata').first()
+            if payment is None:
                 logger.error(f'Payment not found for reference: {reference}')
                 return render(request, 'payments/payment_callback.html', {
                     'success': False,
                     'message': 'Payment record not found'
                 })
             
-            # Verify amount matches the payment record amount (customer-provided amount)
-            expected_amount = payment.amount
-            if abs(transaction_amount - expected_amount) > Decimal('0.01'):  # Allow 1 pesewa difference
-                logger.warning(f'Amount mismatch for payment {reference}. Expected: {expected_amount}, Got: {transaction_amount}')
-                payment.status = 'failed'
-                payment.metadata = {
-                    **payment.metadata,
-                    'verification_error': 'Amount mismatch',
-                    'expected_amount': str(expected_amount),
-                    'received_amount': str(transaction_amount)
-                }
-                payment.save()
-                return render(request, 'payments/payment_callback.html', {
-                    'success': False,
-                    'message': 'Payment amount mismatch. Please contact support.'
-                })
+            # Already verified (page refreshed): show the result straight away
+            if payment['status'] in FINAL_STATUSES:
+                return render(request, 'payments/payment_callback.html', _callback_context(payment))
             
-            # Update payment record
-            with transaction.atomic():
-                if transaction_status == 'success':
-                    payment.status = 'success'
-                    payment.transaction_id = str(transaction_data.get('id', ''))
-                    payment.fees = Decimal(str(transaction_data.get('fees', 0))) / 100
-                    # Parse paid_at timestamp if available
-                    paid_at_str = transaction_data.get('paid_at')
-                    if paid_at_str:
-                        try:
-                            payment.verified_at = datetime.fromisoformat(paid_at_str.replace('Z', '+00:00'))
-                        except (ValueError, AttributeError):
-                            payment.verified_at = timezone.now()
-                    else:
-                        payment.verified_at = timezone.now()
-                    payment.metadata = {
-                        **payment.metadata,
-                        'verification_response': response_data,
-                        'channel': transaction_data.get('channel'),
-                        'gateway_response': transaction_data.get('gateway_response')
-                    }
-                    payment.save()
-                    
-                    # Update order payment status
-                    # The database trigger will handle amount_paid and payment_status updates
-                    # But we'll also update it here to ensure consistency
-                    from django.db.models import Sum
-                    total_paid = Payment.objects.filter(
-                        order=order,
-                        status='success'
-                    ).aggregate(total=Sum('amount'))['total'] or Decimal('0')
-                    
-                    # Ensure amount_paid never exceeds total_amount (to satisfy constraint)
-                    order.amount_paid = min(total_paid, order.total_amount)
-                    if order.amount_paid >= order.total_amount:
-                        order.payment_status = 'paid'
-                    elif order.amount_paid > 0:
-                        order.payment_status = 'partially_paid'
-                    else:
-                        order.payment_status = 'pending'
-                    order.save()
-                    
-                    # Render callback template with order_id for client-side redirect
-                    # This allows the browser to use tokens from localStorage
-                    return render(request, 'payments/payment_callback.html', {
-                        'success': True,
-                        'message': 'Payment processed successfully',
-                        'order_id': order.id
-                    })
-                else:
-                    payment.status = 'failed'
-                    payment.metadata = {
-                        **payment.metadata,
-                        'verification_response': response_data,
-                        'gateway_response': transaction_data.get('gateway_response', 'Payment failed')
-                    }
-                    payment.save()
-                    
-                    return render(request, 'payments/payment_callback.html', {
-                        'success': False,
-                        'message': transaction_data.get('gateway_response', 'Payment failed')
-                    })
+            # Verify in the background; the page polls PaymentStatusView
+            enqueue_verification(reference)
+            return render(request, 'payments/payment_callback.html', {
+                'pending': True,
+                'reference': reference,
+                'order_id': payment['order_id']
+            })
                     
         except Exception as e:
             logger.error(f'Payment callback error: {str(e)}', exc_info=True)
@@ -327,3 +245,108 @@ class PaymentCallbackView(APIView):
                 'success': False,
                 'message': 'An error occurred while processing your payment. Please contact support.'
             })
+
+
+class PaymentStatusView(AutoRefreshTokenMixin, APIView):
+    """Lightweight payment status for the callback page to poll"""
+    # The callback page polls with the login cookies, like the order page it redirects to
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, *args, **kwargs):
+        reference = kwargs.get('reference')
+        policy = get_policy(request)
+        payments = Payment.objects.filter(reference=reference)
+        if not policy.can('view_all_orders'):
+            # Clients only see their own payments; others look like unknown references
+            payments = payments.filter(order__customer_id=policy.customer_id) if policy.customer_id else payments.none()
+        payment = payments.values('status', 'order_id', 'metadata').first()
+        if payment is None:
+            return Response({
+                'error_code': 'PAYMENT_NOT_FOUND',
+                'message': 'Payment record not found',
+                'status_code': 404
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        if payment['status'] not in FINAL_STATUSES:
+            # Re-queue if the last attempt finished without a result; the
+            # queue skips references verified within the retry interval
+            enqueue_verification(reference)
+        
+        context = _callback_context(payment)
+        return Response({
+            'status': 'success',
+            'data': {
+                'reference': reference,
+                'payment_status': payment['status'],
+                'order_id': payment['order_id'],
+                'message': context['message']
+            }
+        }, status=status.HTTP_200_OK)
+
+
+def _callback_context(payment):
+    """Template context for a payment row (status, order_id, metadata)"""
+    metadata = payment['metadata'] or {}
+    if payment['status'] == 'success':
+        return {'success': True, 'message': 'Payment processed successfully', 'order_id': payment['order_id']}
+    if payment['status'] in FINAL_STATUSES or payment['status'] == 'abandoned':
+        if metadata.get('verification_error') == 'Amount mismatch':
+            message = 'Payment amount mismatch. Please contact support.'
+        else:
+            message = metadata.get('gateway_response') or 'Payment failed'
+        return {'success': False, 'message': message}
+    return {'success': False, 'message': 'Payment is being verified'}
+
+
+class PaystackWebhookView(APIView):
+    """Receive Paystack webhook events; processing happens in the background"""
+    authentication_classes = []  # Authenticated by the HMAC signature instead
+    permission_classes = []
+    
+    def post(self, request, *args, **kwargs):
+        body = request.body
+        if not valid_signature(body, request.headers.get('X-Paystack-Signature')):
+            logger.warning('Paystack webhook rejected: invalid signature')
+            return Response({
+                'error_code': 'INVALID_SIGNATURE',
+                'message': 'Invalid webhook signature',
+                'status_code': 401
+            }, status=status.HTTP_401_UNAUTHORIZED)
+        
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            payload = None
+        # Anything but an object would be redelivered forever on a 500
+        if not isinstance(payload, dict):
+            return Response({
+                'error_code': 'INVALID_PAYLOAD',
+                'message': 'Webhook body is not a JSON object',
+                'status_code': 400
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            store_event(payload, body)
+        except Exception as e:
+            # Non-2xx makes Paystack deliver the event again later
+            logger.error(f'Paystack webhook storage error: {str(e)}', exc_info=True)
+            return Response({
+                'error_code': 'SERVER_ERROR',
+                'message': 'Failed to store webhook event',
+                'status_code': 500
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        
+        webhook_drainer.wake()
+        return Response({'status': 'success'}, status=status.HTTP_200_OK)
+
+
+class PaymentGatewayStatsView(AutoRefreshTokenMixin, APIView):
+    """Get Paystack client latency histograms and circuit breaker state"""
+    permission_classes = [IsAuthenticated, IsSuperadmin]
+    
+    def get(self, request, *args, **kwargs):
+        """Get gateway statistics"""
+        return Response({
+            'status': 'success',
+            'data': get_client().get_stats()
+        }, status=status.HTTP_200_OK)
@@ -0,0 +1,145 @@
+"""
+Paystack webhook ingestion.
+
+The webhook view only checks the signature and stores the raw event in
+payment_webhook_events; the unique event_id turns Paystack's retried
+deliveries into no-ops. Stored events are processed in batches, either
+by the in-process drainer the view wakes up or by
+`python manage.py process_webhook_events`. charge.success events go
+through record_verification, the same locked update the callback
+worker uses, so an order is credited once whichever path gets there
+first.
+"""
+import hashlib
+import hmac
+import logging
+import threading
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import PaymentWebhookEvent
+from .verification import record_verification
+
+logger = logging.getLogger(__name__)
+
+# Events that settle a payment; everything else is stored and ignored
+HANDLED_EVENTS = ('charge.success',)
+
+
+def valid_signature(body, signature):
+    """Check the X-Paystack-Signature header (HMAC-SHA512 of the raw body)"""
+    if not signature:
+        return False
+    expected = hmac.new(settings.PAYSTACK_SECRET_KEY.encode(), body, hashlib.sha512).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+def _event_data(payload):
+    """The event's data object, or {} when it is missing or not an object"""
+    data = payload.get('data')
+    return data if isinstance(data, dict) else {}
+
+
+def event_id_for(payload, body):
+    """Paystack has no event id; use the event type and transaction id, or a body hash"""
+    data = _event_data(payload)
+    if data.get('id') is not None:
+        return f"{payload.get('event')}:{data['id']}"
+    return f"{payload.get('event')}:sha256:{hashlib.sha256(body).hexdigest()}"
+
+
+def store_event(payload, body):
+    """Insert the event; a redelivery with the same event id is silently dropped"""
+    data = _event_data(payload)
+    reference = data.get('reference')
+    event = PaymentWebhookEvent(
+        event_id=event_id_for(payload, body),
+        event_type=str(payload.get('event', ''))[:50],
+        reference=str(reference)[:100] if reference else None,
+        payload=payload
+    )
+    # One INSERT IGNORE instead of a lookup then insert
+    PaymentWebhookEvent.objects.bulk_create([event], ignore_conflicts=True)
+
+
+def process_pending_events(batch_size=100, max_batches=None, max_attempts=5):
+    """Process received (and retryable failed) events in id order; returns counters"""
+    stats = {'batches': 0, 'processed': 0, 'ignored': 0, 'failed': 0}
+    pending = PaymentWebhookEvent.objects.filter(status__in=('received', 'failed'), attempts__lt=max_attempts)
+    last_id = 0
+    while max_batches is None or stats['batches'] < max_batches:
+        ids = list(pending.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            break
+        for event_id in ids:
+            # Lock by primary key only, so incoming deliveries are never blocked
+            # by a range lock; skip_locked lets several drainers share the backlog
+            with transaction.atomic():
+                event = pending.select_for_update(skip_locked=True).filter(pk=event_id).first()
+                if event is None:
+                    continue
+                stats[_process_event(event)] += 1
+        last_id = ids[-1]
+        stats['batches'] += 1
+    return stats
+
+
+def _process_event(event):
+    """Apply one event inside a savepoint and record the outcome on its row"""
+    status, error = 'processed', None
+    if event.event_type not in HANDLED_EVENTS or not event.reference:
+        status = 'ignored'
+    else:
+        try:
+            with transaction.atomic():
+                result = record_verification(event.reference, {'status': True, 'data': _event_data(event.payload)})
+            if result is None:
+                status, error = 'ignored', 'Payment not found'
+        except Exception as e:
+            logger.error(f'Webhook event {event.event_id} failed: {str(e)}', exc_info=True)
+            status, error = 'failed', str(e)
+
+    PaymentWebhookEvent.objects.filter(pk=event.pk).update(
+        status=status,
+        error=error,
+        attempts=F('attempts') + 1,
+        processed_at=timezone.now()
+    )
+    return status
+
+
+class WebhookDrainer:
+    """Single background thread that drains stored events after a delivery"""
+
+    def __init__(self, batch_size=100):
+        self.batch_size = batch_size
+        self._thread = None
+        self._pending = False
+        self._lock = threading.Lock()
+
+    def wake(self):
+        """Ask for a drain; deliveries arriving mid-drain get one more pass"""
+        with self._lock:
+            self._pending = True
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='webhook-drain', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._thread = None
+                    return
+                self._pending = False
+            close_old_connections()
+            try:
+                process_pending_events(batch_size=self.batch_size)
+            except Exception as e:
+                logger.error(f'Webhook drain error: {str(e)}', exc_info=True)
+            finally:
+                close_old_connections()
+
+
+drainer = WebhookDrainer(batch_size=getattr(settings, 'PAYMENT_WEBHOOK_BATCH_SIZE', 100))
@@ -1,4 +1,3 @@
-from django.db.models import Q
 from django.core.exceptions import ObjectDoesNotExist
 from django.shortcuts import render
 from rest_framework.views import APIView
@@ -8,6 +7,8 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.exceptions import AuthenticationFailed, NotAuthenticated, PermissionDenied, ValidationError, NotFound
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from accounts.permissions import IsAdminOrSuperadmin
+from accounts.policy import get_policy
+from accounts.search import search_services, RANKED_ORDERING
 from .models import Service
 from .serializers import ServiceSerializer
 import logging
@@ -25,7 +26,7 @@ class ServiceListView(APIView):
         accept_header = request.META.get('HTTP_ACCEPT', '')
         if 'text/html' in accept_header or not accept_header:
             # Check if user is admin or superadmin for template access
-            if request.user.is_authenticated and (request.user.role in ['admin', 'superadmin']):
+            if get_policy(request).can('manage_services'):
                 return render(request, 'services/services_list.html')
             # If not authenticated or not admin/superadmin, redirect to login or return 403
             return Response({
@@ -56,12 +57,10 @@ class ServiceListView(APIView):
             if category:
                 queryset = queryset.filter(category__icontains=category)
             
-            # Search in name and description
-            search = request.query_params.get('search')
+            # Search in name and description, best matches first
+            search = request.query_params.get('search', '').strip()
             if search:
-                queryset = queryset.filter(
-                    Q(name__icontains=search) | Q(description__icontains=search)
-                )
+                queryset = search_services(queryset, search).order_by(*RANKED_ORDERING)
             
             # Serialize the queryset
             serializer = self.serializer_class(queryset, many=True)
@@ -70,7 +69,7 @@ class ServiceListView(APIView):
             return Response({
                 'status': 'success',
                 'data': {
-                    'count': queryset.count(),
+                    'count': len(serializer.data),
                     'results': serializer.data
                 }
             }, status=status.HTTP_200_OK)